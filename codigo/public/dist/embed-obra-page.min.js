@@ -348,7 +348,7 @@
  </button>
  </div>
  </div>
- `,o.appendChild(a),document.body.appendChild(o),n=a.querySelector(".word-modal-content").innerHTML,Ms(o,a,e,t,n),document.body.style.overflow="hidden"}async function mm(e){let t=await fetch(`/api/jobs/status?id=${encodeURIComponent(e)}`),o=await t.json().catch(()=>({}));if(!t.ok||!o.success||!o.job)throw new Error(o.error||"N\xE3o foi poss\xEDvel consultar o processamento.");return o.job}function Ls(e){return new Promise(t=>window.setTimeout(t,e))}async function Cn(e,t={}){let{intervalMs:o=dm,timeoutMs:a=um,onProgress:n=null}=t,r=Date.now();for(;Date.now()-r<a;){let i=await mm(e);if(typeof n=="function"&&n(i),i.status==="completed")return i;if(i.status==="failed")throw new Error(i.error||"Falha ao processar a solicita\xE7\xE3o.");await Ls(o)}throw new Error("O processamento demorou mais do que o esperado.")}function pm(e){return Array.isArray(e?.download_ids)&&e.download_ids.length?e.download_ids.filter(Boolean):Array.isArray(e?.downloads)&&e.downloads.length?e.downloads.map(t=>t?.download_id).filter(Boolean):e?.download_id?[e.download_id]:[]}function fm(e,t){let o=e.querySelector(".word-modal-loading-text"),a=e.querySelector(".word-modal-loading p");if(!(!o||!a||!t)){if(t.stage==="preparing_download"){o.textContent="Preparando download...",a.textContent="Os arquivos j\xE1 foram gerados e o download ser\xE1 iniciado em instantes...";return}o.textContent="Gerando documento(s)...",a.textContent="Isso pode levar alguns instantes..."}}function Ms(e,t,o,a,n){let r=t.querySelector(".word-modal-close"),i=t.querySelector(".word-modal-btn-cancel"),s=t.querySelector(".word-modal-btn-download"),l=t.querySelectorAll(".model-option"),c=t.querySelector(".model-select-all"),d=t.querySelector("#select-all");e.addEventListener("click",u=>{u.target===e&&Po(e)}),r.addEventListener("click",()=>Po(e)),i.addEventListener("click",()=>Po(e)),l.forEach(u=>{let m=u.querySelector(".model-option-checkbox");u.addEventListener("click",p=>{p.target!==m&&(m.checked=!m.checked),$n(u,m.checked),xs(l,d),_o(l,s)}),m.addEventListener("click",p=>{p.stopPropagation(),$n(u,m.checked),xs(l,d),_o(l,s)})}),c.addEventListener("click",u=>{u.target!==d&&(d.checked=!d.checked),Rs(l,d.checked),_o(l,s),c.classList.toggle("selected",d.checked)}),d.addEventListener("click",u=>{u.stopPropagation(),Rs(l,d.checked),_o(l,s),c.classList.toggle("selected",d.checked)}),s.addEventListener("click",async()=>{let u=vm(l);if(u.length!==0){hm(t);try{let m,p;u.length===2?(m="/api/word/generate/ambos",p="ambos"):u.includes("pc")?(m="/api/word/generate/proposta-comercial",p="comercial"):(m="/api/word/generate/proposta-tecnica",p="tecnica");let g=await(await fetch(m,{method:"POST",headers:{"Content-Type":"application/json"},body:JSON.stringify({obra_id:o})})).json(),v=g.job_id?await Cn(g.job_id,{onProgress:w=>fm(t,w)}):g;if(!g.success)throw new Error(g.error||"Erro na gera\xE7\xE3o do documento");await An(pm(v)),v.notification_error&&$("Download conclu\xEDdo, mas o email ao ADM n\xE3o foi enviado.","warning"),wm(t,u.length),setTimeout(()=>{Po(e),$(v.notification_error?"Documento(s) gerado(s) com sucesso, mas o email ao ADM n\xE3o foi enviado.":"Documento(s) Word gerado(s) com sucesso!",v.notification_error?"warning":"success")},2e3)}catch(m){console.error(" Erro ao gerar documento(s):",m),bm(t,m.message),setTimeout(()=>{let p=t.querySelector(".word-modal-content");p&&(p.innerHTML=n,Ms(e,t,o,a,n))},3e3)}}})}async function gm(e){try{let t=await fetch(`/api/word/download?id=${e}`);if(!t.ok)throw new Error("Erro no download do documento");let o=await t.blob(),a=t.headers.get("Content-Disposition"),n="documento.docx";if(a){let s=a.match(/filename="(.+)"/);s&&(n=s[1])}let r=window.URL.createObjectURL(o),i=document.createElement("a");return i.href=r,i.download=n,document.body.appendChild(i),i.click(),document.body.removeChild(i),window.URL.revokeObjectURL(r),!0}catch(t){throw console.error(" Erro no download:",t),t}}async function An(e){let t=Array.isArray(e)?e.filter(Boolean):[e].filter(Boolean);if(!t.length)throw new Error("Nenhum arquivo foi disponibilizado para download.");for(let o of t)await gm(o),await Ls(180)}function Po(e){e.style.opacity="0",setTimeout(()=>{e.parentNode&&e.parentNode.removeChild(e),document.body.style.overflow=""},37)}function $n(e,t){e.classList.toggle("selected",t)}function xs(e,t){let o=Array.from(e).every(n=>n.querySelector(".model-option-checkbox").checked);t.checked=o,t.closest(".model-select-all").classList.toggle("selected",o)}function _o(e,t){let o=Array.from(e).some(a=>a.querySelector(".model-option-checkbox").checked);if(t.disabled=!o,o){let n=Array.from(e).filter(r=>r.querySelector(".model-option-checkbox").checked).length===2?"Baixar Ambos":"Baixar Documento";t.innerHTML=`<i></i> ${n}`}}function Rs(e,t){e.forEach(o=>{let a=o.querySelector(".model-option-checkbox");a.checked=t,$n(o,t)})}function vm(e){return Array.from(e).filter(t=>t.querySelector(".model-option-checkbox").checked).map(t=>t.dataset.model)}function hm(e){let t=e.querySelector(".word-modal-content");t.innerHTML=`
+ `,o.appendChild(a),document.body.appendChild(o),n=a.querySelector(".word-modal-content").innerHTML,Ms(o,a,e,t,n),document.body.style.overflow="hidden"}async function mm(e){let t=await fetch(`/api/jobs/status?id=${encodeURIComponent(e)}`),o=await t.json().catch(()=>({}));if(!t.ok||!o.success||!o.job)throw new Error(o.error||"N\xE3o foi poss\xEDvel consultar o processamento.");return o.job}function Ls(e){return new Promise(t=>window.setTimeout(t,e))}function Js$(e,{timeoutMs:t,onProgress:o}){return new Promise((a,n)=>{let r=new EventSource(`/api/jobs/stream?id=${encodeURIComponent(e)}`),i=!1,s=(d,c)=>{i||(i=!0,window.clearTimeout(l),r.close(),d(c))},l=window.setTimeout(()=>{s(n,new Error("O processamento demorou mais do que o esperado."))},t);r.addEventListener("job",d=>{let c=JSON.parse(d.data||"{}");typeof o=="function"&&o(c),c.status==="completed"?s(a,c):c.status==="failed"&&s(n,new Error(c.error||"Falha ao processar a solicita\xE7\xE3o."))}),r.addEventListener("expired",()=>{s(n,new Error("Job nao encontrado ou expirado."))}),r.addEventListener("end",()=>{s(a,null)}),r.onerror=()=>s(a,null)})}async function Cn(e,t={}){let{intervalMs:o=dm,timeoutMs:a=um,onProgress:n=null}=t,r=Date.now();if(typeof window.EventSource=="function"){let i=await Js$(e,{timeoutMs:a,onProgress:n});if(i)return i}for(;Date.now()-r<a;){let i=await mm(e);if(typeof n=="function"&&n(i),i.status==="completed")return i;if(i.status==="failed")throw new Error(i.error||"Falha ao processar a solicita\xE7\xE3o.");await Ls(o)}throw new Error("O processamento demorou mais do que o esperado.")}function pm(e){return Array.isArray(e?.download_ids)&&e.download_ids.length?e.download_ids.filter(Boolean):Array.isArray(e?.downloads)&&e.downloads.length?e.downloads.map(t=>t?.download_id).filter(Boolean):e?.download_id?[e.download_id]:[]}function fm(e,t){let o=e.querySelector(".word-modal-loading-text"),a=e.querySelector(".word-modal-loading p");if(!(!o||!a||!t)){if(t.stage==="preparing_download"){o.textContent="Preparando download...",a.textContent="Os arquivos j\xE1 foram gerados e o download ser\xE1 iniciado em instantes...";return}o.textContent="Gerando documento(s)...",a.textContent="Isso pode levar alguns instantes..."}}function Ms(e,t,o,a,n){let r=t.querySelector(".word-modal-close"),i=t.querySelector(".word-modal-btn-cancel"),s=t.querySelector(".word-modal-btn-download"),l=t.querySelectorAll(".model-option"),c=t.querySelector(".model-select-all"),d=t.querySelector("#select-all");e.addEventListener("click",u=>{u.target===e&&Po(e)}),r.addEventListener("click",()=>Po(e)),i.addEventListener("click",()=>Po(e)),l.forEach(u=>{let m=u.querySelector(".model-option-checkbox");u.addEventListener("click",p=>{p.target!==m&&(m.checked=!m.checked),$n(u,m.checked),xs(l,d),_o(l,s)}),m.addEventListener("click",p=>{p.stopPropagation(),$n(u,m.checked),xs(l,d),_o(l,s)})}),c.addEventListener("click",u=>{u.target!==d&&(d.checked=!d.checked),Rs(l,d.checked),_o(l,s),c.classList.toggle("selected",d.checked)}),d.addEventListener("click",u=>{u.stopPropagation(),Rs(l,d.checked),_o(l,s),c.classList.toggle("selected",d.checked)}),s.addEventListener("click",async()=>{let u=vm(l);if(u.length!==0){hm(t);try{let m,p;u.length===2?(m="/api/word/generate/ambos",p="ambos"):u.includes("pc")?(m="/api/word/generate/proposta-comercial",p="comercial"):(m="/api/word/generate/proposta-tecnica",p="tecnica");let g=await(await fetch(m,{method:"POST",headers:{"Content-Type":"application/json"},body:JSON.stringify({obra_id:o})})).json(),v=g.job_id?await Cn(g.job_id,{onProgress:w=>fm(t,w)}):g;if(!g.success)throw new Error(g.error||"Erro na gera\xE7\xE3o do documento");await An(pm(v)),v.notification_error&&$("Download conclu\xEDdo, mas o email ao ADM n\xE3o foi enviado.","warning"),wm(t,u.length),setTimeout(()=>{Po(e),$(v.notification_error?"Documento(s) gerado(s) com sucesso, mas o email ao ADM n\xE3o foi enviado.":"Documento(s) Word gerado(s) com sucesso!",v.notification_error?"warning":"success")},2e3)}catch(m){console.error(" Erro ao gerar documento(s):",m),bm(t,m.message),setTimeout(()=>{let p=t.querySelector(".word-modal-content");p&&(p.innerHTML=n,Ms(e,t,o,a,n))},3e3)}}})}async function gm(e){try{let t=await fetch(`/api/word/download?id=${e}`);if(!t.ok)throw new Error("Erro no download do documento");let o=await t.blob(),a=t.headers.get("Content-Disposition"),n="documento.docx";if(a){let s=a.match(/filename="(.+)"/);s&&(n=s[1])}let r=window.URL.createObjectURL(o),i=document.createElement("a");return i.href=r,i.download=n,document.body.appendChild(i),i.click(),document.body.removeChild(i),window.URL.revokeObjectURL(r),!0}catch(t){throw console.error(" Erro no download:",t),t}}async function An(e){let t=Array.isArray(e)?e.filter(Boolean):[e].filter(Boolean);if(!t.length)throw new Error("Nenhum arquivo foi disponibilizado para download.");for(let o of t)await gm(o),await Ls(180)}function Po(e){e.style.opacity="0",setTimeout(()=>{e.parentNode&&e.parentNode.removeChild(e),document.body.style.overflow=""},37)}function $n(e,t){e.classList.toggle("selected",t)}function xs(e,t){let o=Array.from(e).every(n=>n.querySelector(".model-option-checkbox").checked);t.checked=o,t.closest(".model-select-all").classList.toggle("selected",o)}function _o(e,t){let o=Array.from(e).some(a=>a.querySelector(".model-option-checkbox").checked);if(t.disabled=!o,o){let n=Array.from(e).filter(r=>r.querySelector(".model-option-checkbox").checked).length===2?"Baixar Ambos":"Baixar Documento";t.innerHTML=`<i></i> ${n}`}}function Rs(e,t){e.forEach(o=>{let a=o.querySelector(".model-option-checkbox");a.checked=t,$n(o,t)})}function vm(e){return Array.from(e).filter(t=>t.querySelector(".model-option-checkbox").checked).map(t=>t.dataset.model)}function hm(e){let t=e.querySelector(".word-modal-content");t.innerHTML=`
  <div class="word-modal-loading">
  <div class="word-modal-loading-spinner"></div>
  <div class="word-modal-loading-text">Gerando documento(s)...</div>
@@ -102,6 +102,51 @@ function wait(ms) {
   return new Promise((resolve) => window.setTimeout(resolve, ms));
 }
 
+function streamBackgroundJob(jobId, { timeoutMs, onProgress }) {
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(`/api/jobs/stream?id=${encodeURIComponent(jobId)}`);
+    let settled = false;
+
+    const finish = (callback, value) => {
+      if (settled) return;
+      settled = true;
+      window.clearTimeout(timer);
+      source.close();
+      callback(value);
+    };
+
+    const timer = window.setTimeout(() => {
+      finish(reject, new Error("O processamento demorou mais do que o esperado."));
+    }, timeoutMs);
+
+    source.addEventListener("job", (event) => {
+      const job = JSON.parse(event.data || "{}");
+
+      if (typeof onProgress === "function") {
+        onProgress(job);
+      }
+
+      if (job.status === "completed") {
+        finish(resolve, job);
+      } else if (job.status === "failed") {
+        finish(reject, new Error(job.error || "Falha ao processar a solicitação."));
+      }
+    });
+
+    source.addEventListener("expired", () => {
+      finish(reject, new Error("Job nao encontrado ou expirado."));
+    });
+
+    // O servidor encerrou o stream (prazo do stream) com o job ainda pendente: segue no polling.
+    source.addEventListener("end", () => {
+      finish(resolve, null);
+    });
+
+    // Sem SSE disponivel (proxy, erro de rede): volta para o polling.
+    source.onerror = () => finish(resolve, null);
+  });
+}
+
 export async function waitForBackgroundJob(jobId, options = {}) {
   const {
     intervalMs = BACKGROUND_JOB_POLL_INTERVAL_MS,
@@ -110,6 +155,13 @@ export async function waitForBackgroundJob(jobId, options = {}) {
   } = options;
   const startedAt = Date.now();
 
+  if (typeof window.EventSource === "function") {
+    const streamedJob = await streamBackgroundJob(jobId, { timeoutMs, onProgress });
+    if (streamedJob) {
+      return streamedJob;
+    }
+  }
+
   while (Date.now() - startedAt < timeoutMs) {
     const job = await fetchBackgroundJob(jobId);
 
@@ -10,14 +10,12 @@ import time
 import tempfile
 from pathlib import Path
 
-
-# Impede bytecode mesmo quando este arquivo for importado
-# ou executado sem passar por setup_environment().
-os.environ.setdefault('PYTHONDONTWRITEBYTECODE', '1')
-os.environ.setdefault('PYTHONPYCACHEPREFIX', str(Path(tempfile.gettempdir()) / 'esi_python_cache'))
+# Impede bytecode mesmo quando este arquivo for importado ou executado sem
+# passar por setup_environment(): nada e gravado antes de o pacote aplicar a
+# politica de cache, e o modo de inicio rapido volta a gravar em
+# setup_fast_start_environment().
 sys.dont_write_bytecode = True
-if hasattr(sys, 'pycache_prefix'):
-    sys.pycache_prefix = os.environ['PYTHONPYCACHEPREFIX']
+from servidor_modules import is_fast_start_enabled  # noqa: E402
 
 
 def cleanup_python_caches(base_dir):
@@ -34,10 +32,30 @@ def cleanup_python_caches(base_dir):
             except FileNotFoundError:
                 pass
 
+def setup_fast_start_environment():
+    """Mantem o cache de bytecode persistente (__pycache__ ou ESI_PYCACHE_DIR)."""
+    os.environ.pop('PYTHONDONTWRITEBYTECODE', None)
+    sys.dont_write_bytecode = False
+
+    pycache_dir = str(os.environ.get('ESI_PYCACHE_DIR', '') or '').strip()
+    if hasattr(sys, 'pycache_prefix'):
+        sys.pycache_prefix = pycache_dir or None
+    if pycache_dir:
+        os.environ['PYTHONPYCACHEPREFIX'] = pycache_dir
+    else:
+        os.environ.pop('PYTHONPYCACHEPREFIX', None)
+
+    print(f" Modo de inicio rapido ativo (cache de bytecode: {pycache_dir or '__pycache__'})")
+
+
 def setup_environment():
     """Configuração do ambiente """
     current_dir = Path(__file__).parent
     sys.path.insert(0, str(current_dir))
+
+    if is_fast_start_enabled():
+        setup_fast_start_environment()
+        return
     
     # DESATIVA CACHES DO PYTHON
     os.environ['PYTHONDONTWRITEBYTECODE'] = '1'  # Não gera .pyc
@@ -50,20 +68,56 @@ def setup_environment():
         sys.pycache_prefix = os.environ['PYTHONPYCACHEPREFIX']
     cleanup_python_caches(current_dir)
 
+def timed_import(report, module_name):
+    """Importa um modulo registrando tempo e quantidade de modulos novos."""
+    import importlib
+
+    modules_before = len(sys.modules)
+    started_at = time.perf_counter()
+    module = importlib.import_module(module_name)
+    report.append(
+        (
+            module_name,
+            (time.perf_counter() - started_at) * 1000,
+            len(sys.modules) - modules_before,
+        )
+    )
+    return module
+
+
+def print_import_report(report):
+    """Exibe o tempo de importacao dos modulos principais."""
+    total_ms = sum(elapsed_ms for _, elapsed_ms, _ in report)
+    print(f" Importacao dos modulos: {total_ms:.0f} ms")
+    for module_name, elapsed_ms, new_modules in report:
+        print(f"   - {module_name}: {elapsed_ms:.0f} ms ({new_modules} modulos novos)")
+
+    heavy_modules = [name for name in ('docxtpl', 'docx', 'jinja2') if name in sys.modules]
+    if heavy_modules:
+        print(f"   - Bibliotecas Word carregadas no inicio: {', '.join(heavy_modules)}")
+
+
 def load_modules_no_cache():
     """Carrega módulos """
     try:
         # Force reload para evitar cache de módulos
-        if 'servidor_modules.core.server_core' in sys.modules:
-            del sys.modules['servidor_modules.core.server_core']
-        if 'servidor_modules.handlers.http_handler' in sys.modules:
-            del sys.modules['servidor_modules.handlers.http_handler']
-        if 'servidor_modules.utils.browser_monitor' in sys.modules:
-            del sys.modules['servidor_modules.utils.browser_monitor']
+        if not is_fast_start_enabled():
+            if 'servidor_modules.core.server_core' in sys.modules:
+                del sys.modules['servidor_modules.core.server_core']
+            if 'servidor_modules.handlers.http_handler' in sys.modules:
+                del sys.modules['servidor_modules.handlers.http_handler']
+            if 'servidor_modules.utils.browser_monitor' in sys.modules:
+                del sys.modules['servidor_modules.utils.browser_monitor']
         
-        from servidor_modules.core.server_core import ServerCore
-        from servidor_modules.handlers.http_handler import UniversalHTTPRequestHandler
-        from servidor_modules.utils.browser_monitor import monitorar_navegador
+        import_report = []
+        ServerCore = timed_import(import_report, 'servidor_modules.core.server_core').ServerCore
+        UniversalHTTPRequestHandler = timed_import(
+            import_report, 'servidor_modules.handlers.http_handler'
+        ).UniversalHTTPRequestHandler
+        monitorar_navegador = timed_import(
+            import_report, 'servidor_modules.utils.browser_monitor'
+        ).monitorar_navegador
+        print_import_report(import_report)
         
         return ServerCore, UniversalHTTPRequestHandler, monitorar_navegador
     except ImportError as e:
@@ -91,6 +145,10 @@ def initialize_server():
 
     print(" Agendando validacao PostgreSQL em segundo plano...")
     start_connection_warmup(server_core.project_root)
+
+    from servidor_modules.utils.credential_expiry import credential_expiry_sweeper
+
+    credential_expiry_sweeper.start(server_core.project_root)
     
     # Configura porta
     print(" Configurando porta...")
@@ -10,11 +10,17 @@ import tempfile
 from pathlib import Path
 
 
-os.environ.setdefault('PYTHONDONTWRITEBYTECODE', '1')
-os.environ.setdefault('PYTHONPYCACHEPREFIX', str(Path(tempfile.gettempdir()) / 'esi_python_cache'))
-sys.dont_write_bytecode = True
-if hasattr(sys, 'pycache_prefix'):
-    sys.pycache_prefix = os.environ['PYTHONPYCACHEPREFIX']
+def is_fast_start_enabled():
+    """Modo de inicio rapido (ESI_FAST_START): mantem o bytecode entre reinicios."""
+    return str(os.environ.get('ESI_FAST_START', '') or '').strip().lower() in {'1', 'true', 'yes', 'on'}
+
+
+if not is_fast_start_enabled():
+    os.environ.setdefault('PYTHONDONTWRITEBYTECODE', '1')
+    os.environ.setdefault('PYTHONPYCACHEPREFIX', str(Path(tempfile.gettempdir()) / 'esi_python_cache'))
+    sys.dont_write_bytecode = True
+    if hasattr(sys, 'pycache_prefix'):
+        sys.pycache_prefix = os.environ['PYTHONPYCACHEPREFIX']
 
 __all__ = [
     'config',
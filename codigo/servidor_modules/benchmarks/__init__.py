@@ -0,0 +1 @@
+"""Benchmarks reprodutiveis de repositorios, bootstrap e endpoints."""
@@ -0,0 +1,315 @@
+"""Gerador de dados sinteticos para os benchmarks.
+
+Todos os registros usam prefixos proprios (empresas ``BCH``, obras ``bench-``)
+para que a limpeza remova apenas o que foi semeado.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+EMPRESA_PREFIX = "BCH"
+OBRA_PREFIX = "bench-"
+
+MACHINE_TYPES = (
+    ("Split Hi-Wall", "climatizacao"),
+    ("Split Piso Teto", "climatizacao"),
+    ("Split Cassete", "climatizacao"),
+    ("Fancoil", "climatizacao"),
+    ("Self Contained", "climatizacao"),
+    ("Ventilador Centrifugo", "ventilacao"),
+    ("Exaustor Axial", "ventilacao"),
+)
+CAPACITIES_BTU = (9000, 12000, 18000, 24000, 30000, 36000, 48000, 60000)
+VOLTAGES = ("220V/1F", "220V/3F", "380V/3F")
+DUTO_TYPES = ("Retangular", "Circular", "Flexivel")
+ACESSORIO_TYPES = ("Grelha", "Difusor", "Veneziana", "Registro", "Damper")
+CIDADES = (
+    ("Belo Horizonte", "MG"),
+    ("Sao Paulo", "SP"),
+    ("Rio de Janeiro", "RJ"),
+    ("Curitiba", "PR"),
+    ("Salvador", "BA"),
+)
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+    empresas: int
+    obras: int
+    projetos: int = 3
+    salas: int = 4
+    maquinas: int = 2
+
+    @property
+    def label(self):
+        return f"{self.empresas}x{self.obras}"
+
+    @classmethod
+    def parse(cls, value, projetos=3, salas=4, maquinas=2):
+        """Converte ``EMPRESASxOBRAS`` (ex.: ``20x200``) em um tamanho."""
+        try:
+            empresas, obras = (int(part) for part in str(value).lower().split("x", 1))
+        except ValueError:
+            raise ValueError(f"Tamanho invalido '{value}' (use EMPRESASxOBRAS, ex.: 20x200)")
+        if empresas < 1 or obras < 1:
+            raise ValueError(f"Tamanho invalido '{value}': use valores positivos")
+        return cls(empresas, obras, projetos, salas, maquinas)
+
+
+class SyntheticDataset:
+    """Gera empresas e obras deterministicas a partir de uma seed."""
+
+    def __init__(self, size, seed=42):
+        self.size = size
+        self.seed = seed
+
+    def empresa_codigo(self, index):
+        return f"{EMPRESA_PREFIX}{index:04d}"
+
+    def build_empresas(self):
+        rng = random.Random(f"{self.seed}:empresas")
+        empresas = []
+        for index in range(self.size.empresas):
+            codigo = self.empresa_codigo(index)
+            empresas.append(
+                {
+                    "codigo": codigo,
+                    "nome": f"Empresa Benchmark {index:04d} {rng.choice(['Ltda', 'S.A.', 'ME'])}",
+                    "credenciais": None,
+                    "numeroClienteAtual": 0,
+                }
+            )
+        return empresas
+
+    def iter_obras(self):
+        rng = random.Random(f"{self.seed}:obras")
+        numeros_cliente = {}
+        base_date = date(2025, 1, 1)
+
+        for index in range(self.size.obras):
+            empresa_index = index % self.size.empresas
+            codigo = self.empresa_codigo(empresa_index)
+            numero_cliente = numeros_cliente.get(codigo, 0) + 1
+            numeros_cliente[codigo] = numero_cliente
+            cidade, estado = rng.choice(CIDADES)
+            obra_id = f"{OBRA_PREFIX}{index:06d}"
+
+            projetos = [
+                self._build_projeto(rng, obra_id, projeto_index)
+                for projeto_index in range(self.size.projetos)
+            ]
+            yield {
+                "id": obra_id,
+                "nome": f"Obra Benchmark {index:06d}",
+                "empresaSigla": codigo,
+                "empresaCodigo": codigo,
+                "empresaNome": f"Empresa Benchmark {empresa_index:04d}",
+                "numeroClienteFinal": numero_cliente,
+                "clienteNumero": numero_cliente,
+                "clienteFinal": f"Cliente {index:06d}",
+                "cliente": {
+                    "nome": f"Cliente {index:06d}",
+                    "endereco": f"Rua {rng.randint(1, 999)}, {rng.randint(1, 3000)}",
+                    "bairro": "Centro",
+                    "cidade": cidade,
+                    "estado": estado,
+                    "cep": f"{rng.randint(10000, 99999)}-{rng.randint(100, 999)}",
+                },
+                "dataCadastro": (base_date + timedelta(days=index % 365)).strftime("%d/%m/%Y"),
+                "valorTotalObra": round(
+                    sum(projeto["valorTotalProjeto"] for projeto in projetos), 2
+                ),
+                "projetos": projetos,
+            }
+
+    def build_obras(self):
+        return list(self.iter_obras())
+
+    def build_dados(self):
+        """Catalogo minimo de ``dados.json`` coerente com as maquinas geradas."""
+        rng = random.Random(f"{self.seed}:dados")
+        machines = []
+        for tipo, aplicacao in MACHINE_TYPES:
+            machines.append(
+                {
+                    "type": tipo,
+                    "aplicacao": aplicacao,
+                    "especificacao": f"{tipo} com gabinete em aco galvanizado",
+                    "options": [
+                        {"name": nome, "value": round(rng.uniform(80, 1200), 2)}
+                        for nome in ("Controle remoto", "Filtro G4", "Bomba de dreno", "Kit instalacao", "Wi-Fi")
+                    ],
+                    "voltages": [{"name": voltage} for voltage in VOLTAGES],
+                    "impostos": {
+                        "PIS_COFINS": "9,25%",
+                        "IPI": f"{rng.choice([0, 5, 10, 15])}%",
+                        "ICMS": f"{rng.choice([7, 12, 18])}%",
+                        "FRETE": rng.choice(["CIF", "FOB"]),
+                        "PRAZO": f"{rng.randint(15, 90)} dias",
+                    },
+                }
+            )
+        return {
+            "ADM": [],
+            "empresas": self.build_empresas(),
+            "constants": {},
+            "machines": machines,
+            "materials": {},
+            "banco_acessorios": {},
+            "dutos": [],
+            "tubos": [],
+        }
+
+    def _build_projeto(self, rng, obra_id, projeto_index):
+        projeto_id = f"{obra_id}_p{projeto_index}"
+        salas = [
+            self._build_sala(rng, projeto_id, sala_index)
+            for sala_index in range(self.size.salas)
+        ]
+        valor_salas = sum(
+            maquina["precoTotal"] for sala in salas for maquina in sala["maquinas"]
+        ) + sum(
+            item["valor_total"] for sala in salas for item in sala["dutos"] + sala["acessorios"]
+        )
+        engenharia = round(valor_salas * 0.08, 2)
+        return {
+            "id": projeto_id,
+            "nome": f"Projeto {projeto_index + 1}",
+            "salas": salas,
+            "servicos": {
+                "engenharia": {"descricao": "Projeto executivo", "valor": engenharia},
+                "adicionais": [
+                    {"descricao": "Start-up e comissionamento", "valor": round(rng.uniform(500, 4000), 2)}
+                ],
+            },
+            "valorTotalProjeto": round(valor_salas + engenharia, 2),
+        }
+
+    def _build_sala(self, rng, projeto_id, sala_index):
+        sala_id = f"{projeto_id}_s{sala_index}"
+        area = round(rng.uniform(12, 180), 1)
+        return {
+            "id": sala_id,
+            "nome": f"Sala {sala_index + 1}",
+            "inputs": {
+                "area": area,
+                "peDireito": round(rng.uniform(2.6, 4.5), 2),
+                "pessoas": rng.randint(1, 40),
+                "iluminacao": round(area * rng.uniform(8, 15), 1),
+                "equipamentos": round(area * rng.uniform(5, 30), 1),
+                "backup": rng.choice(["n", "n+1"]),
+            },
+            "capacidade": {
+                "cargaTermica": round(area * rng.uniform(550, 900), 0),
+                "backup": rng.choice(["n", "n+1"]),
+            },
+            "maquinas": [
+                self._build_maquina(rng, sala_id, maquina_index)
+                for maquina_index in range(self.size.maquinas)
+            ],
+            "dutos": [self._build_item(rng, "duto", DUTO_TYPES) for _ in range(rng.randint(1, 3))],
+            "acessorios": [
+                self._build_item(rng, "acessorio", ACESSORIO_TYPES) for _ in range(rng.randint(1, 4))
+            ],
+        }
+
+    def _build_maquina(self, rng, sala_id, maquina_index):
+        tipo, aplicacao = rng.choice(MACHINE_TYPES)
+        quantidade = rng.randint(1, 4)
+        preco_unitario = round(rng.uniform(2500, 38000), 2)
+        opcoes = [
+            {"name": nome, "nome": nome, "originalName": nome, "value": round(rng.uniform(80, 1200), 2)}
+            for nome in rng.sample(
+                ["Controle remoto", "Filtro G4", "Bomba de dreno", "Kit instalacao", "Wi-Fi"],
+                rng.randint(0, 3),
+            )
+        ]
+        return {
+            "id": f"{sala_id}_m{maquina_index}",
+            "tipo": tipo,
+            "nome": f"{tipo} {rng.choice(CAPACITIES_BTU)} BTU/h",
+            "aplicacao_machines": aplicacao,
+            "potencia": f"{rng.choice(CAPACITIES_BTU)} BTU/h",
+            "tensao": rng.choice(VOLTAGES),
+            "voltage": rng.choice(VOLTAGES),
+            "tensao_comando": "24V",
+            "quantidade": quantidade,
+            "precoUnitario": preco_unitario,
+            "precoTotal": round(preco_unitario * quantidade, 2),
+            "opcoesSelecionadas": opcoes,
+            "configuracoesSelecionadas": [],
+        }
+
+    def _build_item(self, rng, kind, tipos):
+        quantidade = rng.randint(1, 20)
+        valor_unitario = round(rng.uniform(15, 900), 2)
+        tipo = rng.choice(tipos)
+        item = {
+            "tipo": tipo,
+            "descricao": f"{tipo} {kind}",
+            "dimensao": f"{rng.randint(100, 800)}x{rng.randint(100, 600)}",
+            "quantidade": quantidade,
+            "valor_unitario": valor_unitario,
+            "valor_total": round(valor_unitario * quantidade, 2),
+        }
+        if kind == "duto":
+            item["tipo_descricao"] = tipo
+            item["aplicacao_Dutos"] = "climatizacao"
+        else:
+            item["aplicacao_Acessorio"] = "climatizacao"
+        return item
+
+
+def seed_empresas(project_root, empresas):
+    from servidor_modules.database.repositories.empresa_repository import EmpresaRepository
+
+    repository = EmpresaRepository(project_root)
+    for sort_order, empresa in enumerate(empresas, start=100000):
+        repository._upsert_empresa(empresa, sort_order=sort_order)
+
+
+def clear_synthetic_data(project_root):
+    """Remove tudo o que foi semeado; retorna (obras, empresas) removidas.
+
+    As obras removidas ficam registradas no ``change_log``, como em ``ObraRepository``.
+    """
+    from servidor_modules.database.connection import get_connection
+    from servidor_modules.database.repositories.change_log_repository import (
+        ENTITY_OBRA,
+        OPERATION_DELETE,
+        ChangeLogRepository,
+        obra_empresa_scope,
+    )
+
+    conn = get_connection(project_root)
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    try:
+        deleted_rows = cursor.execute(
+            """
+            DELETE FROM obras WHERE id LIKE ?
+            RETURNING id, raw_json
+            """,
+            (f"{OBRA_PREFIX}%",),
+        ).fetchall()
+        for row in deleted_rows:
+            ChangeLogRepository.record(
+                cursor,
+                ENTITY_OBRA,
+                row["id"],
+                OPERATION_DELETE,
+                **obra_empresa_scope(json.loads(row["raw_json"])),
+            )
+        cursor.execute("DELETE FROM session_obras WHERE obra_id LIKE ?", (f"{OBRA_PREFIX}%",))
+        removed_obras = len(deleted_rows)
+        cursor.execute("DELETE FROM empresas WHERE codigo LIKE ?", (f"{EMPRESA_PREFIX}%",))
+        removed_empresas = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return removed_obras, removed_empresas
@@ -0,0 +1,288 @@
+"""Benchmark de geracao de documentos Word (PC, PT e exportacao 'ambos').
+
+Uso (a partir de ``codigo/``; nao precisa de banco, os dados vao em memoria):
+
+    python -m servidor_modules.benchmarks.documents
+    python -m servidor_modules.benchmarks.documents --baseline benchmark_results/docs_anterior.json
+
+Cada obra de teste e renderizada com os templates reais de ``word_templates/``.
+O processo termina com codigo 1 quando algum orcamento e ultrapassado.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from servidor_modules.benchmarks.dataset import DatasetSize, SyntheticDataset
+from servidor_modules.benchmarks.suite import git_revision, quiet_output, summarize
+
+FIXTURES = {
+    "pequena": DatasetSize(1, 1, projetos=1, salas=2, maquinas=1),
+    "media": DatasetSize(1, 1, projetos=3, salas=4, maquinas=2),
+    "grande": DatasetSize(1, 1, projetos=6, salas=8, maquinas=3),
+    "extra": DatasetSize(1, 1, projetos=8, salas=7, maquinas=4),
+}
+TARGETS = ("pc", "pt", "ambos")
+DOCS_PER_RUN = {"pc": 1, "pt": 1, "ambos": 2}
+DEFAULT_BUDGET_PATH = Path(__file__).with_name("document_budget.json")
+
+
+def build_fixture(size, seed=42):
+    dataset = SyntheticDataset(size, seed=seed)
+    obra = next(dataset.iter_obras())
+    shared_data = {"dados.json": dataset.build_dados(), "backup.json": {"obras": [obra]}}
+    return obra["id"], shared_data
+
+
+def _remove(path):
+    if path and os.path.exists(path):
+        os.unlink(path)
+
+
+def _run_generator(generate, obra_id, template_path):
+    """Chama o metodo publico do gerador e coleta as fases pelo phase_timer."""
+    phases = {}
+
+    def phase_timer(phase, elapsed_ms):
+        phases[f"{phase}_ms"] = elapsed_ms
+
+    output_path = generate(obra_id, template_path, phase_timer=phase_timer)
+    _remove(output_path)
+    if not output_path:
+        raise RuntimeError(f"Falha ao gerar {template_path.name}")
+    return phases
+
+
+def run_pc(project_root, obra_id, shared_data):
+    """WordPCGenerator.generate_proposta_comercial, por fase."""
+    from servidor_modules.generators.wordPC_generator import WordPCGenerator
+
+    generator = WordPCGenerator(project_root, None, shared_data)
+    template_path = project_root / "word_templates" / "proposta_comercial_template.docx"
+    return _run_generator(generator.generate_proposta_comercial, obra_id, template_path)
+
+
+def run_pt(project_root, obra_id, shared_data):
+    """WordPTGenerator.generate_proposta_tecnica, por fase."""
+    from servidor_modules.generators.wordPT_generator import WordPTGenerator
+
+    generator = WordPTGenerator(project_root, None, shared_data)
+    template_path = project_root / "word_templates" / "proposta_tecnica_template.docx"
+    return _run_generator(generator.generate_proposta_tecnica, obra_id, template_path)
+
+
+def run_ambos(project_root, obra_id, shared_data):
+    """Caminho real da exportacao: WordHandler.generate_selected_documents."""
+    from servidor_modules.handlers.word_handler import WordHandler
+    from servidor_modules.utils.file_utils import FileUtils
+
+    handler = WordHandler(project_root, FileUtils(), shared_data)
+    files, error = handler.generate_selected_documents(obra_id, "ambos")
+    for file_info in files:
+        _remove(file_info.get("path"))
+    if error:
+        raise RuntimeError(error)
+    return {}
+
+
+RUNNERS = {"pc": run_pc, "pt": run_pt, "ambos": run_ambos}
+
+
+def measure_target(project_root, target, obra_id, shared_data, repeat, warmup):
+    runner = RUNNERS[target]
+    for _ in range(max(warmup, 0)):
+        runner(project_root, obra_id, shared_data)
+
+    totals = []
+    phases = {}
+    for _ in range(max(repeat, 1)):
+        gc.collect()
+        started_at = time.perf_counter()
+        phase_times = runner(project_root, obra_id, shared_data)
+        totals.append((time.perf_counter() - started_at) * 1000)
+        for phase, elapsed_ms in phase_times.items():
+            phases.setdefault(phase, []).append(elapsed_ms)
+
+    # Pico de memoria em uma rodada separada: o tracemalloc distorce os tempos.
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    gc.collect()
+    tracemalloc.reset_peak()
+    baseline_bytes = tracemalloc.get_traced_memory()[0]
+    try:
+        runner(project_root, obra_id, shared_data)
+        peak_bytes = tracemalloc.get_traced_memory()[1] - baseline_bytes
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    summary = summarize(totals)
+    mean_ms = summary["mean_ms"]
+    summary["docs_per_sec"] = round(DOCS_PER_RUN[target] * 1000.0 / mean_ms, 2) if mean_ms else 0.0
+    summary["peak_mb"] = round(max(peak_bytes, 0) / 1024 / 1024, 2)
+    summary["phases"] = {phase: summarize(samples) for phase, samples in phases.items()}
+    return summary
+
+
+def check_regressions(report, budget=None, baseline=None, max_regression_pct=25.0, slack_ms=5.0):
+    """Lista violacoes de orcamento absoluto e de regressao contra um relatorio anterior."""
+    violations = []
+    baseline_results = (baseline or {}).get("results", {})
+
+    for fixture_name, targets in report["results"].items():
+        for target, stats in targets.items():
+            if "error" in stats:
+                violations.append(f"{fixture_name}/{target}: falhou ({stats['error']})")
+                continue
+            limits = ((budget or {}).get("fixtures", {}).get(fixture_name, {}) or {}).get(target, {})
+            for metric in ("p95_ms", "peak_mb"):
+                limit = limits.get(metric)
+                if limit is not None and stats[metric] > limit:
+                    violations.append(
+                        f"{fixture_name}/{target}: {metric} {stats[metric]:.2f} acima do orcamento {limit:.2f}"
+                    )
+
+            previous = baseline_results.get(fixture_name, {}).get(target)
+            if not previous or "error" in previous:
+                continue
+            for metric, slack in (("p95_ms", slack_ms), ("peak_mb", 1.0)):
+                allowed = previous[metric] * (1 + max_regression_pct / 100) + slack
+                if stats[metric] > allowed:
+                    violations.append(
+                        f"{fixture_name}/{target}: {metric} {stats[metric]:.2f} vs {previous[metric]:.2f} "
+                        f"anterior (limite {allowed:.2f}, +{max_regression_pct:.0f}%)"
+                    )
+    return violations
+
+
+def render_markdown(report, violations):
+    lines = [
+        f"# Benchmark de documentos ESI - {report['generated_at']}",
+        "",
+        f"- revisao: `{report['environment'].get('git_revision') or 'desconhecida'}`",
+        f"- repeticoes: {report['settings']['repeat']} (warmup {report['settings']['warmup']})",
+        "",
+        "| obra | alvo | docs/s | p50 (ms) | p95 (ms) | contexto p50 | render p50 | pos p50 | pico (MB) |",
+        "|---|---|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for fixture_name, targets in report["results"].items():
+        for target, stats in targets.items():
+            if "error" in stats:
+                lines.append(f"| {fixture_name} | {target} | falhou | - | - | - | - | - | - |")
+                continue
+            phases = stats["phases"]
+
+            def phase_median(name):
+                return f"{phases[name]['median_ms']:.1f}" if name in phases else "-"
+
+            lines.append(
+                f"| {fixture_name} | {target} | {stats['docs_per_sec']:.2f} | {stats['median_ms']:.1f} | "
+                f"{stats['p95_ms']:.1f} | {phase_median('context_ms')} | {phase_median('render_ms')} | "
+                f"{phase_median('post_ms')} | {stats['peak_mb']:.2f} |"
+            )
+
+    lines.append("")
+    if violations:
+        lines.append("## Regressoes")
+        lines.append("")
+        lines.extend(f"- {violation}" for violation in violations)
+    else:
+        lines.append("Nenhum orcamento ultrapassado.")
+    return "\n".join(lines) + "\n"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de geracao de documentos Word do ESI.")
+    parser.add_argument("--fixtures", default=",".join(FIXTURES), help="Obras de teste (virgula)")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="pc, pt e/ou ambos")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--budget", default=str(DEFAULT_BUDGET_PATH), help="JSON com limites absolutos")
+    parser.add_argument("--baseline", help="Relatorio anterior para detectar regressoes")
+    parser.add_argument("--max-regression-pct", type=float, default=None)
+    parser.add_argument("--output-dir", default="benchmark_results")
+    parser.add_argument("--verbose", action="store_true", help="Mostra os logs dos geradores")
+    args = parser.parse_args(argv)
+
+    args.fixtures = [name.strip() for name in args.fixtures.split(",") if name.strip()]
+    args.targets = [name.strip() for name in args.targets.split(",") if name.strip()]
+    unknown = [name for name in args.fixtures if name not in FIXTURES] + [
+        name for name in args.targets if name not in TARGETS
+    ]
+    if unknown:
+        parser.error(f"Valores desconhecidos: {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None):
+    from servidor_modules.utils.file_utils import FileUtils
+
+    args = parse_args(argv)
+    project_root = Path(FileUtils().find_project_root())
+
+    budget = {}
+    if args.budget and Path(args.budget).exists():
+        budget = json.loads(Path(args.budget).read_text(encoding="utf-8"))
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+    max_regression_pct = (
+        args.max_regression_pct
+        if args.max_regression_pct is not None
+        else float(budget.get("max_regression_pct", 25.0))
+    )
+
+    results = {}
+    for fixture_name in args.fixtures:
+        size = FIXTURES[fixture_name]
+        obra_id, shared_data = build_fixture(size, seed=args.seed)
+        results[fixture_name] = {}
+        for target in args.targets:
+            print(f" [{fixture_name}] {target} ({size.projetos}x{size.salas}x{size.maquinas})...")
+            try:
+                with quiet_output(not args.verbose):
+                    results[fixture_name][target] = measure_target(
+                        project_root, target, obra_id, shared_data, args.repeat, args.warmup
+                    )
+            except Exception as exc:
+                print(f" [{fixture_name}] {target} falhou: {exc}")
+                results[fixture_name][target] = {"error": str(exc)}
+
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": {"git_revision": git_revision(project_root), "python": sys.version.split()[0]},
+        "settings": {"repeat": args.repeat, "warmup": args.warmup, "seed": args.seed},
+        "fixtures": {
+            name: {"projetos": size.projetos, "salas": size.salas, "maquinas": size.maquinas}
+            for name, size in FIXTURES.items()
+            if name in args.fixtures
+        },
+        "results": results,
+    }
+    violations = check_regressions(report, budget, baseline, max_regression_pct)
+    report["violations"] = violations
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    json_path = output_dir / f"docs_{stamp}.json"
+    markdown = render_markdown(report, violations)
+    json_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    (output_dir / f"docs_{stamp}.md").write_text(markdown, encoding="utf-8")
+
+    print()
+    print(markdown)
+    print(f" Relatorio salvo em {json_path}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+"""Suite de benchmarks de repositorios, bootstrap e endpoints HTTP.
+
+Uso (a partir de ``codigo/``, com DATABASE_URL apontando para um PostgreSQL local):
+
+    python -m servidor_modules.benchmarks.suite --sizes 5x20,20x200,50x1000
+    python -m servidor_modules.benchmarks.suite --compare benchmark_results/anterior.json
+
+Cada tamanho semeia empresas/obras sinteticas, mede as operacoes e remove os
+dados ao final. O relatorio e gravado em JSON e markdown para comparacao.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from http.server import HTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+from servidor_modules.benchmarks.dataset import DatasetSize, SyntheticDataset
+
+DEFAULT_SIZES = "5x20,20x200,50x1000"
+LOCAL_HOSTS = {"", "localhost", "127.0.0.1", "::1"}
+HTTP_ENDPOINTS = (
+    ("http_obras_catalog", "/api/obras/catalog", "admin"),
+    ("http_backup_completo", "/api/backup-completo", "admin"),
+    ("http_runtime_bootstrap_admin", "/api/runtime/bootstrap", "admin"),
+    ("http_runtime_bootstrap_client", "/api/runtime/bootstrap", "client"),
+    ("http_system_bootstrap", "/api/runtime/system-bootstrap", "admin"),
+    ("http_dados_empresas", "/api/dados/empresas", "admin"),
+    ("http_session_obras", "/api/session-obras", "admin"),
+)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples_ms):
+    count = len(samples_ms)
+    mean = sum(samples_ms) / count if count else 0.0
+    return {
+        "runs": count,
+        "min_ms": round(min(samples_ms), 3) if count else 0.0,
+        "median_ms": round(percentile(samples_ms, 0.5), 3),
+        "p95_ms": round(percentile(samples_ms, 0.95), 3),
+        "mean_ms": round(mean, 3),
+        "max_ms": round(max(samples_ms), 3) if count else 0.0,
+        "ops_per_sec": round(1000.0 / mean, 2) if mean else 0.0,
+    }
+
+
+def measure(function, repeat, warmup=1):
+    for _ in range(max(warmup, 0)):
+        function()
+    samples = []
+    for _ in range(max(repeat, 1)):
+        # Coleta antes de cada rodada para o GC nao cair no meio da medicao.
+        gc.collect()
+        started_at = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started_at) * 1000)
+    return samples
+
+
+@contextlib.contextmanager
+def quiet_output(enabled=True):
+    """Silencia os prints dos handlers durante as medicoes."""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def ensure_local_database(project_root, allow_remote=False):
+    from servidor_modules.database.connection import get_database_url
+
+    database_url = get_database_url(project_root)
+    parts = urlsplit(database_url)
+    socket_host = dict(parse_qsl(parts.query)).get("host", "")
+    is_local = (parts.hostname or "") in LOCAL_HOSTS or socket_host.startswith("/")
+    if not is_local and not allow_remote:
+        raise SystemExit(
+            "DATABASE_URL nao aponta para um PostgreSQL local. "
+            "Os benchmarks escrevem dados sinteticos; use --allow-remote para forcar."
+        )
+
+
+def git_revision(project_root):
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=str(project_root),
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+class BenchmarkHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class BenchmarkClient:
+    """Servidor HTTP em processo com cookies assinados de admin e cliente."""
+
+    def __init__(self, project_root, empresa):
+        from servidor_modules.handlers.http_handler import UniversalHTTPRequestHandler
+        from servidor_modules.utils.security_utils import SessionSecurity
+
+        security = SessionSecurity(project_root)
+        self.cookies = {}
+        for role, payload in {
+            "admin": {"role": "admin", "usuario": "benchmark", "nome": "Benchmark", "nivel": "ADM"},
+            "client": {
+                "role": "client",
+                "usuario": "benchmark",
+                "empresaCodigo": empresa["codigo"],
+                "empresaNome": empresa["nome"],
+            },
+        }.items():
+            token, _ = security.create_signed_token(payload)
+            self.cookies[role] = f"{security.COOKIE_NAME}={token}"
+
+        self.server = BenchmarkHTTPServer(("127.0.0.1", 0), UniversalHTTPRequestHandler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="benchmark-http", daemon=True
+        )
+        self.thread.start()
+
+    def get(self, path, role):
+        request = urllib.request.Request(
+            self.base_url + path, headers={"Cookie": self.cookies[role]}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                return len(response.read())
+        except urllib.error.HTTPError as exc:
+            raise RuntimeError(f"GET {path} ({role}) retornou {exc.code}") from exc
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def build_bootstrap_handler(project_root, session):
+    """Instancia o handler sem socket para medir o bootstrap isoladamente."""
+    from servidor_modules.handlers.http_handler import UniversalHTTPRequestHandler
+    from servidor_modules.utils.file_utils import FileUtils
+    from servidor_modules.utils.security_utils import SessionSecurity
+
+    handler = UniversalHTTPRequestHandler.__new__(UniversalHTTPRequestHandler)
+    handler.file_utils = FileUtils()
+    handler.project_root = Path(project_root)
+    handler.session_security = SessionSecurity(project_root)
+    handler._pending_response_headers = []
+    handler._auth_session_cache = session
+    handler._auth_session_loaded = True
+    handler._routes_core = None
+    handler._route_handler = None
+    return handler
+
+
+def run_size(project_root, size, args):
+    from servidor_modules.benchmarks.dataset import clear_synthetic_data, seed_empresas
+    from servidor_modules.core.sessions_core import sessions_manager
+    from servidor_modules.database.repositories.obra_repository import ObraRepository
+    from servidor_modules.database.storage import get_storage
+
+    dataset = SyntheticDataset(size, seed=args.seed)
+    empresas = dataset.build_empresas()
+    repository = ObraRepository(project_root)
+    storage = get_storage(project_root)
+    results = {}
+
+    print(f" [{size.label}] Semeando {size.empresas} empresas e {size.obras} obras...")
+    with quiet_output(not args.verbose):
+        clear_synthetic_data(project_root)
+        seed_empresas(project_root, empresas)
+
+        save_samples = []
+        payload_bytes = 0
+        session_ids = []
+        for obra in dataset.iter_obras():
+            payload_bytes += len(json.dumps(obra, ensure_ascii=False))
+            started_at = time.perf_counter()
+            repository.save(obra)
+            save_samples.append((time.perf_counter() - started_at) * 1000)
+            if len(session_ids) < args.session_obras:
+                session_ids.append(obra["id"])
+        for obra_id in session_ids:
+            sessions_manager.add_obra_to_session(obra_id)
+
+    results["obra_repository_save"] = summarize(save_samples)
+
+    benchmarks = {
+        "obra_repository_get_catalog": repository.get_catalog,
+        "obra_repository_get_all": repository.get_all,
+        "storage_load_dados": lambda: storage.load_document(
+            "dados.json", storage.default_document("dados.json")
+        ),
+    }
+
+    admin_handler = build_bootstrap_handler(project_root, {"role": "admin", "usuario": "benchmark"})
+    client_handler = build_bootstrap_handler(
+        project_root,
+        {
+            "role": "client",
+            "usuario": "benchmark",
+            "empresaCodigo": empresas[0]["codigo"],
+            "empresaNome": empresas[0]["nome"],
+        },
+    )
+    benchmarks["runtime_bootstrap_admin"] = admin_handler._build_runtime_bootstrap_payload
+    benchmarks["runtime_bootstrap_client"] = client_handler._build_runtime_bootstrap_payload
+
+    client = None
+    if not args.skip_http:
+        client = BenchmarkClient(project_root, empresas[0])
+        for name, path, role in HTTP_ENDPOINTS:
+            benchmarks[name] = lambda path=path, role=role: client.get(path, role)
+
+    try:
+        for name, function in benchmarks.items():
+            if args.only and not any(token in name for token in args.only):
+                continue
+            print(f" [{size.label}] {name}...")
+            with quiet_output(not args.verbose):
+                results[name] = summarize(measure(function, args.repeat, args.warmup))
+    finally:
+        if client is not None:
+            client.close()
+        if not args.keep:
+            with quiet_output(not args.verbose):
+                for obra_id in session_ids:
+                    sessions_manager.remove_obra(obra_id)
+                clear_synthetic_data(project_root)
+
+    return {
+        "size": {
+            "label": size.label,
+            "empresas": size.empresas,
+            "obras": size.obras,
+            "projetos_por_obra": size.projetos,
+            "salas_por_projeto": size.salas,
+            "maquinas_por_sala": size.maquinas,
+            "payload_bytes": payload_bytes,
+        },
+        "results": results,
+    }
+
+
+def render_markdown(report, baseline=None):
+    baseline_index = {}
+    for entry in (baseline or {}).get("sizes", []):
+        for name, stats in entry.get("results", {}).items():
+            baseline_index[(entry["size"]["label"], name)] = stats
+
+    lines = [
+        f"# Benchmarks ESI - {report['generated_at']}",
+        "",
+        f"- revisao: `{report['environment'].get('git_revision') or 'desconhecida'}`",
+        f"- python: {report['environment']['python']} ({report['environment']['platform']})",
+        f"- repeticoes: {report['settings']['repeat']} (warmup {report['settings']['warmup']})",
+    ]
+    if baseline:
+        lines.append(
+            f"- comparado com: `{baseline.get('environment', {}).get('git_revision') or '?'}` "
+            f"de {baseline.get('generated_at', '?')}"
+        )
+
+    for entry in report["sizes"]:
+        size = entry["size"]
+        lines.extend(
+            [
+                "",
+                f"## {size['label']} ({size['empresas']} empresas, {size['obras']} obras, "
+                f"{size['payload_bytes'] / 1024 / 1024:.1f} MB de JSON)",
+                "",
+                "| benchmark | mediana (ms) | p95 (ms) | min (ms) | ops/s |"
+                + (" delta mediana |" if baseline else ""),
+                "|---|---:|---:|---:|---:|" + ("---:|" if baseline else ""),
+            ]
+        )
+        for name, stats in entry["results"].items():
+            row = (
+                f"| {name} | {stats['median_ms']:.2f} | {stats['p95_ms']:.2f} | "
+                f"{stats['min_ms']:.2f} | {stats['ops_per_sec']:.1f} |"
+            )
+            if baseline:
+                previous = baseline_index.get((size["label"], name))
+                if previous and previous.get("median_ms"):
+                    delta = (stats["median_ms"] / previous["median_ms"] - 1) * 100
+                    row += f" {delta:+.1f}% |"
+                else:
+                    row += " - |"
+            lines.append(row)
+
+    return "\n".join(lines) + "\n"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmarks de repositorios, bootstrap e endpoints do ESI."
+    )
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Lista EMPRESASxOBRAS separada por virgula")
+    parser.add_argument("--projetos", type=int, default=3, help="Projetos por obra")
+    parser.add_argument("--salas", type=int, default=4, help="Salas por projeto")
+    parser.add_argument("--maquinas", type=int, default=2, help="Maquinas por sala")
+    parser.add_argument("--session-obras", type=int, default=10, help="Obras adicionadas a sessao ativa")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", default="", help="Filtra benchmarks por trecho do nome (virgula)")
+    parser.add_argument("--skip-http", action="store_true", help="Nao mede os endpoints HTTP")
+    parser.add_argument("--output-dir", default="benchmark_results")
+    parser.add_argument("--compare", help="Relatorio JSON anterior para comparar")
+    parser.add_argument("--keep", action="store_true", help="Mantem os dados sinteticos ao final")
+    parser.add_argument("--allow-remote", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="Mostra os logs do servidor")
+    args = parser.parse_args(argv)
+    args.only = [token.strip() for token in args.only.split(",") if token.strip()]
+    args.sizes = [
+        DatasetSize.parse(value.strip(), args.projetos, args.salas, args.maquinas)
+        for value in args.sizes.split(",")
+        if value.strip()
+    ]
+    return args
+
+
+def main(argv=None):
+    from servidor_modules.utils.file_utils import FileUtils
+
+    args = parse_args(argv)
+    project_root = FileUtils().find_project_root()
+    ensure_local_database(project_root, args.allow_remote)
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "git_revision": git_revision(project_root),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": {
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "session_obras": args.session_obras,
+        },
+        "sizes": [run_size(project_root, size, args) for size in args.sizes],
+    }
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    json_path = output_dir / f"bench_{stamp}.json"
+    markdown_path = output_dir / f"bench_{stamp}.md"
+    markdown = render_markdown(report, baseline)
+    json_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    markdown_path.write_text(markdown, encoding="utf-8")
+
+    print()
+    print(markdown)
+    print(f" Relatorio salvo em {json_path} e {markdown_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,8 @@ import time
 import threading
 from pathlib import Path
 
+from servidor_modules import is_fast_start_enabled
+from servidor_modules.database.repositories.change_log_repository import ChangeLogRepository
 from servidor_modules.database.repositories.empresa_repository import EmpresaRepository
 from servidor_modules.database.repositories.machine_repository import MachineRepository
 from servidor_modules.database.repositories.obra_repository import ObraRepository
@@ -33,6 +35,7 @@ class RoutesCore:
         self.obra_repository = ObraRepository(self.project_root)
         self.machine_repository = MachineRepository(self.project_root)
         self.system_repository = SystemRepository(self.project_root)
+        self.change_log_repository = ChangeLogRepository(self.project_root)
 
     # ========== ROTAS DE OBRAS ==========
 
@@ -42,11 +45,7 @@ class RoutesCore:
             print(" [OBRAS] Obtendo obras da sessão")
 
             current_session_id = self.sessions_manager.get_current_session_id()
-            session_data = self.sessions_manager._load_sessions_data()
-            session_obra_ids = (
-                session_data["sessions"].get(current_session_id, {}).get("obras", [])
-            )
-            obras_da_sessao = self.obra_repository.get_by_session_ids(session_obra_ids)
+            obras_da_sessao = self.obra_repository.get_by_session(current_session_id)
 
             print(f" ENVIANDO: {len(obras_da_sessao)} obras da sessão")
             return obras_da_sessao
@@ -455,11 +454,13 @@ class RoutesCore:
             def shutdown_sequence():
                 print(" Iniciando sequência de encerramento...")
 
-                try:
-                    print("🧹 Executando limpeza de cache...")
-                    self.cache_cleaner.clean_pycache_async()
-                except Exception as cache_error:
-                    print(f"⚠️  Erro na limpeza de cache: {cache_error}")
+                # No modo de inicio rapido o bytecode fica para o proximo inicio.
+                if not is_fast_start_enabled():
+                    try:
+                        print("🧹 Executando limpeza de cache...")
+                        self.cache_cleaner.clean_pycache_async()
+                    except Exception as cache_error:
+                        print(f"⚠️  Erro na limpeza de cache: {cache_error}")
 
                 time.sleep(2)
                 print("💥 Forçando encerramento do processo Python...")
@@ -477,10 +478,11 @@ class RoutesCore:
         except Exception as e:
             print(f"❌ Erro no shutdown: {str(e)}")
 
-            try:
-                self.cache_cleaner.clean_pycache_async()
-            except:
-                pass
+            if not is_fast_start_enabled():
+                try:
+                    self.cache_cleaner.clean_pycache_async()
+                except:
+                    pass
 
             import os
 
@@ -571,7 +573,6 @@ class RoutesCore:
         """Salva DADOS.json"""
         try:
             new_data = json.loads(post_data)
-            new_data, _, _ = self.empresa_handler.limpar_credenciais_expiradas(new_data)
             self.system_repository.save_dados_payload(new_data)
             print(" DADOS.json salvo")
             return {"status": "success", "message": "Dados salvos"}
@@ -1049,13 +1050,7 @@ class RoutesCore:
                 self.system_repository.save_materials(payload.get("materials", {}))
 
             if "empresas" in changed_sections:
-                empresas_payload = {
-                    "empresas": payload.get("empresas", []),
-                }
-                empresas_payload, _, _ = self.empresa_handler.limpar_credenciais_expiradas(
-                    empresas_payload
-                )
-                self.empresa_repository.replace_all(empresas_payload.get("empresas", []))
+                self.empresa_repository.replace_all(payload.get("empresas", []))
 
             if "banco_acessorios" in changed_sections:
                 self.system_repository.save_acessorios(
@@ -8,6 +8,7 @@ import time
 import os
 from pathlib import Path
 
+from servidor_modules.database.repositories.session_repository import SessionRepository
 from servidor_modules.database.storage import get_storage
 
 class SessionsManager:
@@ -25,6 +26,7 @@ class SessionsManager:
         self.sessions_file = self.sessions_dir / "sessions.json"
         self.storage = get_storage(project_root)
         self.ensure_sessions_file()
+        self.session_repository = SessionRepository(project_root)
     
     def ensure_sessions_file(self):
         """Garante que o arquivo de sessões existe com estrutura vazia"""
@@ -57,58 +59,33 @@ class SessionsManager:
 
     def add_obra_to_session(self, obra_id: str) -> bool:
         """Adiciona uma obra à sessão ativa"""
-        data = self._load_sessions_data()
         current_session_id = self.get_current_session_id()
-        
-        # Garante que existe apenas a sessão ativa
-        data["sessions"] = {
-            current_session_id: data["sessions"].get(current_session_id, {"obras": []})
-        }
-        
-        # Adiciona ID da obra se não existir
         obra_id_str = str(obra_id)
-        if obra_id_str not in data["sessions"][current_session_id]["obras"]:
-            data["sessions"][current_session_id]["obras"].append(obra_id_str)
-            print(f" Obra {obra_id_str} adicionada à sessão {current_session_id}")
-        
-        return self._save_sessions_data(data)
+
+        try:
+            if self.session_repository.add_obra(current_session_id, obra_id_str):
+                print(f" Obra {obra_id_str} adicionada à sessão {current_session_id}")
+            return True
+        except Exception as e:
+            print(f"❌ ERRO ao adicionar obra {obra_id_str} à sessão: {e}")
+            return False
 
     def remove_obra(self, obra_id: str) -> bool:
         """Remove uma obra da sessão ativa"""
-        data = self._load_sessions_data()
         current_session_id = self.get_current_session_id()
         obra_id_str = str(obra_id)
-        
-        print(f"🔍 Tentando remover obra {obra_id_str} da sessão {current_session_id}")
-        print(f" Obras na sessão antes: {data['sessions'][current_session_id]['obras']}")
-        
-        if (current_session_id in data["sessions"] and 
-            obra_id_str in data["sessions"][current_session_id]["obras"]):
-            
-            # Remove o ID da obra
-            data["sessions"][current_session_id]["obras"].remove(obra_id_str)
+
+        try:
+            removed = self.session_repository.remove_obra(current_session_id, obra_id_str)
+        except Exception as e:
+            print(f"❌ ERRO ao remover obra {obra_id_str} da sessão: {e}")
+            return False
+
+        if removed:
             print(f"🗑️ Obra {obra_id_str} removida da sessão {current_session_id}")
-            
-            # Salva os dados atualizados
-            success = self._save_sessions_data(data)
-            
-            # Verifica se realmente foi removido
-            if success:
-                updated_data = self._load_sessions_data()
-                still_exists = obra_id_str in updated_data["sessions"][current_session_id]["obras"]
-                if still_exists:
-                    print(f"❌ ERRO: Obra {obra_id_str} ainda está na sessão após remoção!")
-                    return False
-                else:
-                    print(f" Obra {obra_id_str} removida com sucesso")
-                    print(f" Obras na sessão depois: {updated_data['sessions'][current_session_id]['obras']}")
-                    return True
-            else:
-                print(f"❌ ERRO: Falha ao salvar dados após remoção da obra {obra_id_str}")
-                return False
-        
-        print(f"⚠️ Obra {obra_id_str} não encontrada na sessão {current_session_id}")
-        print(f"🧹 Remoção de sessão tratada como idempotente para {obra_id_str}")
+        else:
+            print(f"⚠️ Obra {obra_id_str} não encontrada na sessão {current_session_id}")
+            print(f"🧹 Remoção de sessão tratada como idempotente para {obra_id_str}")
         return True
 
     def remove_obra_from_session(self, obra_id: str) -> dict:
@@ -116,51 +93,25 @@ class SessionsManager:
         try:
             obra_id_str = str(obra_id)
             print(f"🗑️ [MODAL] Tentando remover obra {obra_id_str} da sessão")
-            
-            # Carrega dados atuais
-            data = self._load_sessions_data()
-            current_session_id = self.get_current_session_id()
-            
-            # Verifica se a obra existe na sessão
-            if (current_session_id in data["sessions"] and 
-                obra_id_str in data["sessions"][current_session_id]["obras"]):
-                
-                # Remove a obra
-                data["sessions"][current_session_id]["obras"].remove(obra_id_str)
+
+            removed = self.session_repository.remove_obra(
+                self.get_current_session_id(), obra_id_str
+            )
+            if removed:
                 print(f" Obra {obra_id_str} removida da sessão")
-                
-                # Salva os dados
-                if self._save_sessions_data(data):
-                    # Verifica se realmente foi removido
-                    updated_data = self._load_sessions_data()
-                    still_exists = obra_id_str in updated_data["sessions"][current_session_id]["obras"]
-                    
-                    if not still_exists:
-                        return {
-                            'success': True, 
-                            'message': 'Obra removida da sessão',
-                            'reload_required': True
-                        }
-                    else:
-                        return {
-                            'success': False, 
-                            'error': 'Obra ainda está na sessão após remoção',
-                            'reload_required': True
-                        }
-                else:
-                    return {
-                        'success': False, 
-                        'error': 'Falha ao salvar sessão',
-                        'reload_required': True
-                    }
-            else:
-                print(f"⚠️ Obra {obra_id_str} não encontrada na sessão")
                 return {
                     'success': True, 
-                    'message': 'Obra não estava na sessão', 
+                    'message': 'Obra removida da sessão',
                     'reload_required': True
                 }
-                
+
+            print(f"⚠️ Obra {obra_id_str} não encontrada na sessão")
+            return {
+                'success': True, 
+                'message': 'Obra não estava na sessão', 
+                'reload_required': True
+            }
+
         except Exception as e:
             print(f"❌ Erro ao remover obra {obra_id} da sessão: {e}")
             return {
@@ -172,11 +123,9 @@ class SessionsManager:
     def check_obra_in_session(self, obra_id: str) -> dict:
         """Verifica se uma obra está na sessão ativa"""
         try:
-            data = self._load_sessions_data()
-            current_session_id = self.get_current_session_id()
-            
-            exists = (current_session_id in data["sessions"] and 
-                     str(obra_id) in data["sessions"][current_session_id]["obras"])
+            exists = self.session_repository.contains(
+                self.get_current_session_id(), str(obra_id)
+            )
             
             return {
                 'exists': exists,
@@ -188,10 +137,7 @@ class SessionsManager:
     
     def get_session_obras(self) -> list:
         """Retorna lista de IDs de obras da sessão ativa"""
-        data = self._load_sessions_data()
-        current_session_id = self.get_current_session_id()
-        
-        return data["sessions"].get(current_session_id, {"obras": []})["obras"]
+        return self.session_repository.list_obra_ids(self.get_current_session_id())
 
     def add_project_to_session(self, project_id: str) -> bool:
         """Método de compatibilidade: converte projetos para obras"""
@@ -223,25 +169,15 @@ class SessionsManager:
     def clear_session(self) -> bool:
         """Limpa completamente todas as sessões"""
         print("SHUTDOWN: Limpando sessão ativa")
-        
-        # Mantém estrutura mas limpa as obras
-        data = {
-            "sessions": {
-                "session_active": {
-                    "obras": []  # Sempre volta vazia
-                }
-            }
-        }
-        
-        success = self._save_sessions_data(data)
-        
-        if success:
-            # Confirmação
-            final_data = self._load_sessions_data()
-            print(f"sessions.json após limpeza: {final_data}")
+
+        try:
+            # Mantém apenas a sessão ativa, sempre vazia
+            self.session_repository.keep_only(self.get_current_session_id())
+            removed = self.session_repository.clear()
+            print(f"Sessão ativa limpa ({removed} obras desvinculadas)")
             return True
-        else:
-            print("ERRO: Não foi possível limpar sessão ativa")
+        except Exception as e:
+            print(f"ERRO: Não foi possível limpar sessão ativa: {e}")
             return False
    
     def force_clear_all_sessions(self) -> bool:
@@ -257,21 +193,11 @@ class SessionsManager:
 
     def ensure_single_session(self) -> bool:
         """Garante que apenas uma sessão ativa exista"""
-        data = self._load_sessions_data()
-        current_session_id = self.get_current_session_id()
-        
-        # Mantém apenas a sessão ativa
-        current_obras = data["sessions"].get(current_session_id, {"obras": []})["obras"]
-        
-        # Remove todas as outras sessões
-        data["sessions"] = {
-            current_session_id: {
-                "obras": current_obras
-            }
-        }
-        
-        # print(f" Sessão única garantida: {current_session_id} com {len(current_obras)} obras")
-        return self._save_sessions_data(data)
+        try:
+            return self.session_repository.keep_only(self.get_current_session_id())
+        except Exception as e:
+            print(f"❌ ERRO ao garantir sessão única: {e}")
+            return False
     
     def _load_sessions_data(self) -> dict:
         """Carrega os dados das sessões do arquivo"""
@@ -307,13 +233,12 @@ class SessionsManager:
 
     def get_current_session(self) -> dict:
         """Retorna a sessão atual completa"""
-        data = self._load_sessions_data()
         current_session_id = self.get_current_session_id()
         
         # Retorna apenas a sessão ativa
         return {
             "sessions": {
-                current_session_id: data["sessions"].get(current_session_id, {"obras": []})
+                current_session_id: {"obras": self.get_session_obras()}
             }
         }
 
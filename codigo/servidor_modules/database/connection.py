@@ -2,12 +2,17 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 import re
 import sqlite3
 import threading
+import time
+import traceback
+from contextlib import contextmanager
 from dataclasses import dataclass
+from functools import lru_cache, wraps
 from pathlib import Path
 from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
@@ -28,6 +33,7 @@ CREATE TABLE IF NOT EXISTS empresas (
     nome TEXT NOT NULL,
     ultimo_numero_cliente INTEGER NOT NULL DEFAULT 0,
     credenciais_json TEXT,
+    credenciais_expires_at TIMESTAMPTZ,
     raw_json TEXT NOT NULL,
     sort_order INTEGER NOT NULL
 );
@@ -117,6 +123,29 @@ CREATE TABLE IF NOT EXISTS sessions (
     payload_json TEXT NOT NULL
 );
 
+CREATE TABLE IF NOT EXISTS session_obras (
+    session_id TEXT NOT NULL,
+    obra_id TEXT NOT NULL,
+    position BIGINT NOT NULL,
+    PRIMARY KEY (session_id, obra_id)
+);
+
+CREATE SEQUENCE IF NOT EXISTS change_log_version_seq;
+
+CREATE TABLE IF NOT EXISTS change_log (
+    entity TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    version BIGINT NOT NULL DEFAULT nextval('change_log_version_seq'),
+    operation TEXT NOT NULL,
+    content_hash TEXT,
+    empresa_codigo TEXT,
+    empresa_nome TEXT,
+    previous_empresas TEXT[] NOT NULL DEFAULT '{}',
+    previous_empresa_nomes TEXT[] NOT NULL DEFAULT '{}',
+    changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (entity, entity_id)
+);
+
 CREATE TABLE IF NOT EXISTS admin_email_config (
     config_key TEXT PRIMARY KEY,
     email TEXT NOT NULL DEFAULT '',
@@ -136,17 +165,97 @@ CREATE TABLE IF NOT EXISTS obra_notifications (
     last_sent_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE OR REPLACE FUNCTION esi_fold_text(value TEXT) RETURNS TEXT
+LANGUAGE SQL IMMUTABLE PARALLEL SAFE
+AS $$ SELECT UPPER(translate(TRIM(COALESCE(value, '')), 'ÁÀÂÃÄÅÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑÝŸáàâãäåéèêëíìîïóòôõöúùûüçñýÿ', 'AAAAAAEEEEIIIIOOOOOUUUUCNYYaaaaaaeeeeiiiiooooouuuucnyy')) $$;
+
+CREATE OR REPLACE FUNCTION esi_json_scope_text(value JSONB) RETURNS TEXT
+LANGUAGE SQL IMMUTABLE PARALLEL SAFE
+AS $$ SELECT CASE
+    WHEN value IS NULL OR value IN ('null', '""', 'false', '0', '[]', '{}') THEN NULL
+    ELSE UPPER(BTRIM(value #>> '{}', E' \\t\\r\\n'))
+END $$;
+
+CREATE OR REPLACE FUNCTION esi_obra_empresa_codigo(raw_json TEXT) RETURNS TEXT
+LANGUAGE SQL IMMUTABLE PARALLEL SAFE
+AS $$ SELECT COALESCE(
+    esi_json_scope_text(obra -> 'empresaCodigo'),
+    esi_json_scope_text(obra -> 'empresaSigla'),
+    esi_json_scope_text(obra -> 'codigo'),
+    esi_json_scope_text(obra -> 'sigla'),
+    esi_json_scope_text(obra -> 'empresaAtual'),
+    ''
+) FROM (SELECT raw_json::jsonb AS obra) AS source $$;
+
+CREATE OR REPLACE FUNCTION esi_obra_empresa_nome(raw_json TEXT) RETURNS TEXT
+LANGUAGE SQL IMMUTABLE PARALLEL SAFE
+AS $$ SELECT COALESCE(
+    esi_json_scope_text(obra -> 'empresaNome'),
+    esi_json_scope_text(obra -> 'nomeEmpresa'),
+    esi_json_scope_text(obra -> 'empresa'),
+    ''
+) FROM (SELECT raw_json::jsonb AS obra) AS source $$;
+
+ALTER TABLE empresas ADD COLUMN IF NOT EXISTS credenciais_expires_at TIMESTAMPTZ;
+ALTER TABLE change_log ADD COLUMN IF NOT EXISTS previous_empresas TEXT[] NOT NULL DEFAULT '{}';
+ALTER TABLE change_log ADD COLUMN IF NOT EXISTS empresa_nome TEXT;
+ALTER TABLE change_log ADD COLUMN IF NOT EXISTS previous_empresa_nomes TEXT[] NOT NULL DEFAULT '{}';
+
 CREATE INDEX IF NOT EXISTS idx_empresas_sort_order ON empresas(sort_order);
+CREATE INDEX IF NOT EXISTS idx_empresas_credenciais_expires_at ON empresas(credenciais_expires_at) WHERE credenciais_expires_at IS NOT NULL;
+DROP INDEX IF EXISTS idx_empresas_codigo_fold;
+DROP INDEX IF EXISTS idx_empresas_nome_fold;
+DROP INDEX IF EXISTS idx_empresas_codigo_trgm;
+DROP INDEX IF EXISTS idx_empresas_nome_trgm;
+CREATE INDEX IF NOT EXISTS idx_empresas_codigo_fold ON empresas((esi_fold_text(codigo)) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_empresas_nome_fold ON empresas((esi_fold_text(nome)) text_pattern_ops);
 CREATE INDEX IF NOT EXISTS idx_machine_catalog_sort_order ON machine_catalog(sort_order);
 CREATE INDEX IF NOT EXISTS idx_obras_empresa_codigo ON obras(empresa_codigo);
 CREATE INDEX IF NOT EXISTS idx_obras_empresa_codigo_numero_cliente ON obras(empresa_codigo, numero_cliente_final DESC);
+DROP INDEX IF EXISTS idx_obras_empresa_nome_upper;
+CREATE INDEX IF NOT EXISTS idx_obras_scope_empresa_codigo ON obras((esi_obra_empresa_codigo(raw_json)));
+CREATE INDEX IF NOT EXISTS idx_obras_scope_empresa_nome ON obras((esi_obra_empresa_nome(raw_json)));
 CREATE INDEX IF NOT EXISTS idx_obras_sort_order ON obras(sort_order);
 CREATE INDEX IF NOT EXISTS idx_obra_notifications_sent_at ON obra_notifications(last_sent_at);
+CREATE INDEX IF NOT EXISTS idx_session_obras_session_position ON session_obras(session_id, position);
+CREATE INDEX IF NOT EXISTS idx_session_obras_obra_id ON session_obras(obra_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_change_log_version ON change_log(version);
 CREATE INDEX IF NOT EXISTS idx_projetos_obra_id_sort ON projetos(obra_id, sort_order);
 CREATE INDEX IF NOT EXISTS idx_salas_projeto_id_sort ON salas(projeto_id, sort_order);
 CREATE INDEX IF NOT EXISTS idx_sala_maquinas_sala_id_sort ON sala_maquinas(sala_id, sort_order);
 """
 
+# Qualquer alteracao em SCHEMA_SQL gera uma nova versao e reaplica o script.
+SCHEMA_VERSION = hashlib.sha256(SCHEMA_SQL.encode("utf-8")).hexdigest()[:16]
+
+# pg_trgm e opcional: sem a extensao (ou sem permissao para cria-la) a busca de
+# empresas usa os mesmos filtros LIKE, apenas sem os indices GIN.
+TRIGRAM_INDEX_STATEMENTS = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_empresas_codigo_trgm ON empresas USING GIN ((esi_fold_text(codigo)) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_empresas_nome_trgm ON empresas USING GIN ((esi_fold_text(nome)) gin_trgm_ops)",
+)
+
+# Mesmo mapeamento de esi_fold_text, para normalizar o termo antes da consulta.
+# Os acentos saem antes do UPPER: no banco, UPPER fora do ASCII depende do
+# LC_CTYPE (em C/POSIX 'ã' continua minusculo).
+_FOLD_TEXT_TABLE = str.maketrans(
+    "ÁÀÂÃÄÅÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑÝŸáàâãäåéèêëíìîïóòôõöúùûüçñýÿ",
+    "AAAAAAEEEEIIIIOOOOOUUUUCNYYaaaaaaeeeeiiiiooooouuuucnyy",
+)
+
+
+def fold_search_text(value) -> str:
+    return str(value or "").strip().translate(_FOLD_TEXT_TABLE).upper()
+
+SCHEMA_VERSION_SQL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    schema_key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
 
 IDENTITY_MARKERS = (
     "GENERATED BY DEFAULT AS IDENTITY",
@@ -166,6 +275,13 @@ _WARMUP_STARTED_ROOTS = set()
 _EMPRESAS_NUMERO_CLIENTE_COLUMN_CACHE = {}
 _DOTENV_LOCK = threading.Lock()
 _DOTENV_LOADED_PATHS = set()
+_SCOPE_STATE = threading.local()
+_LEAK_DETECTOR_LOCK = threading.Lock()
+_LEAK_DETECTOR_THREAD = None
+LEAK_THRESHOLD_SECONDS = max(float(os.environ.get("ESI_DB_LEAK_SECONDS", "120") or 120), 5.0)
+_QUERY_TRACKING = threading.local()
+SLOW_QUERY_MS = max(float(os.environ.get("ESI_SLOW_QUERY_MS", "250") or 250), 0.0)
+LEAK_CHECK_INTERVAL_SECONDS = max(float(os.environ.get("ESI_DB_LEAK_CHECK_SECONDS", "30") or 30), 1.0)
 
 
 @dataclass(frozen=True)
@@ -220,16 +336,57 @@ def get_database_url(project_root=None) -> str:
     return _enforce_ssl_mode(raw_url)
 
 
+def get_pool_settings() -> dict:
+    def read_number(name, default, cast=int):
+        try:
+            return cast(os.environ.get(name, default) or default)
+        except (TypeError, ValueError):
+            return cast(default)
+
+    prepare_threshold = str(os.environ.get("DATABASE_PREPARE_THRESHOLD", "5") or "5").strip().lower()
+    max_size = max(read_number("DATABASE_POOL_MAX_SIZE", 10), 1)
+    min_size = min(max(read_number("DATABASE_POOL_MIN_SIZE", 1), 0), max_size)
+    warm_size = min(max(read_number("DATABASE_POOL_WARM_SIZE", min_size), 0), max_size)
+    return {
+        "min_size": min_size,
+        "max_size": max_size,
+        "warm_size": warm_size,
+        "timeout": max(read_number("DATABASE_POOL_TIMEOUT", 30, float), 1.0),
+        "max_idle": max(read_number("DATABASE_POOL_MAX_IDLE", 300, float), 30.0),
+        "max_lifetime": max(read_number("DATABASE_POOL_MAX_LIFETIME", 3600, float), 60.0),
+        # "off" desativa prepared statements (pgbouncer/pooler em modo transacao).
+        "prepare_threshold": (
+            None
+            if prepare_threshold in {"off", "none", "0", "false"}
+            else max(read_number("DATABASE_PREPARE_THRESHOLD", 5), 1)
+        ),
+        "prepared_max": max(read_number("DATABASE_PREPARED_MAX", 100), 1),
+    }
+
+
+def _configure_pooled_connection(conn) -> None:
+    settings = get_pool_settings()
+    conn.prepare_threshold = settings["prepare_threshold"]
+    conn.prepared_max = settings["prepared_max"]
+
+
 def get_connection(project_root):
     root_key = str(Path(project_root).resolve())
     with _POOL_LOCK:
         proxy = _PROXIES.get(root_key)
         if proxy is None:
+            settings = get_pool_settings()
+            # Conexoes acima de min_size sao fechadas apos max_idle sem uso,
+            # entao o pool cresce sob carga e volta ao minimo quando ocioso.
             pool = ConnectionPool(
                 conninfo=get_database_url(project_root),
-                min_size=1,
-                max_size=int(os.environ.get("DATABASE_POOL_MAX_SIZE", "10")),
-                timeout=30,
+                min_size=settings["min_size"],
+                max_size=settings["max_size"],
+                timeout=settings["timeout"],
+                max_idle=settings["max_idle"],
+                max_lifetime=settings["max_lifetime"],
+                name=f"esi-{Path(root_key).name}",
+                configure=_configure_pooled_connection,
                 kwargs={
                     "autocommit": False,
                     "row_factory": dict_row,
@@ -288,6 +445,105 @@ def release_thread_connection(project_root=None) -> None:
         proxy.release()
 
 
+@contextmanager
+def connection_scope(project_root=None, label=None):
+    """Devolve ao pool as conexoes fixadas pela thread ao sair do escopo mais externo."""
+    depth = getattr(_SCOPE_STATE, "depth", 0)
+    previous_label = getattr(_SCOPE_STATE, "label", None)
+    _SCOPE_STATE.depth = depth + 1
+    if depth == 0:
+        _SCOPE_STATE.label = label or threading.current_thread().name
+
+    try:
+        yield
+    finally:
+        _SCOPE_STATE.depth = depth
+        if depth == 0:
+            _SCOPE_STATE.label = previous_label
+            release_thread_connection(project_root)
+
+
+def begin_query_tracking(label=None) -> None:
+    """Inicia a contagem de consultas da thread atual (uma requisicao HTTP)."""
+    _QUERY_TRACKING.stats = {
+        "label": label,
+        "started_at": time.perf_counter(),
+        "queries": 0,
+        "db_ms": 0.0,
+        "rows": 0,
+        "statements": {},
+    }
+
+
+def get_query_tracking():
+    return getattr(_QUERY_TRACKING, "stats", None)
+
+
+def end_query_tracking():
+    stats = getattr(_QUERY_TRACKING, "stats", None)
+    _QUERY_TRACKING.stats = None
+    return stats
+
+
+def _record_query(query: str, elapsed_ms: float, rowcount) -> None:
+    rows = max(int(rowcount or 0), 0)
+    stats = getattr(_QUERY_TRACKING, "stats", None)
+    if stats is not None:
+        stats["queries"] += 1
+        stats["db_ms"] += elapsed_ms
+        stats["rows"] += rows
+        stats["statements"][query] = stats["statements"].get(query, 0) + 1
+
+    if SLOW_QUERY_MS and elapsed_ms >= SLOW_QUERY_MS:
+        label = (stats or {}).get("label") or getattr(_SCOPE_STATE, "label", None)
+        print(
+            f" Consulta lenta ({elapsed_ms:.0f} ms, {rows} linha(s)) "
+            f"[{label or threading.current_thread().name}]: {_summarize_query(query)}"
+        )
+
+
+def _summarize_query(query: str, limit: int = 300) -> str:
+    summary = " ".join(str(query).split())
+    return summary if len(summary) <= limit else summary[:limit] + "..."
+
+
+def scoped_connection(func):
+    """Decorator para funcoes executadas em threads de jobs e workers."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with connection_scope(label=getattr(func, "__qualname__", None)):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def _ensure_leak_detector() -> None:
+    global _LEAK_DETECTOR_THREAD
+
+    if _LEAK_DETECTOR_THREAD is not None and _LEAK_DETECTOR_THREAD.is_alive():
+        return
+    with _LEAK_DETECTOR_LOCK:
+        if _LEAK_DETECTOR_THREAD is not None and _LEAK_DETECTOR_THREAD.is_alive():
+            return
+        _LEAK_DETECTOR_THREAD = threading.Thread(
+            target=_run_leak_detector,
+            daemon=True,
+            name="postgres-leak-detector",
+        )
+        _LEAK_DETECTOR_THREAD.start()
+
+
+def _run_leak_detector() -> None:
+    while True:
+        time.sleep(LEAK_CHECK_INTERVAL_SECONDS)
+        for proxy in list(_PROXIES.values()):
+            try:
+                proxy.check_leaks(LEAK_THRESHOLD_SECONDS)
+            except Exception as exc:
+                print(f" Erro no detector de vazamento de conexoes: {exc}")
+
+
 def start_connection_warmup(project_root) -> None:
     root_key = str(Path(project_root).resolve())
     warmup_lock = _WARMUP_LOCKS.setdefault(root_key, threading.Lock())
@@ -308,13 +564,126 @@ def start_connection_warmup(project_root) -> None:
 
 def _run_connection_warmup(project_root) -> None:
     try:
-        get_connection(project_root)
-        release_thread_connection(project_root)
-        print(" PostgreSQL pronto para uso.")
+        with connection_scope(project_root, label="postgres-warmup"):
+            get_connection(project_root)
+        warmed = _prewarm_pool(project_root, get_pool_settings()["warm_size"])
+        print(f" PostgreSQL pronto para uso ({warmed} conexao(oes) abertas).")
     except Exception as exc:
         print(f" Aviso no warmup do PostgreSQL: {exc}")
 
 
+POOL_METRIC_FIELDS = (
+    ("esi_db_pool_connections", "gauge", "Conexoes abertas no pool.", "size", 1),
+    ("esi_db_pool_connections_available", "gauge", "Conexoes livres no pool.", "available", 1),
+    ("esi_db_pool_connections_in_use", "gauge", "Conexoes emprestadas pelo pool.", "in_use", 1),
+    ("esi_db_pool_requests_waiting", "gauge", "Pedidos aguardando conexao.", "requests_waiting", 1),
+    ("esi_db_pool_requests_total", "counter", "Pedidos de conexao atendidos.", "requests_total", 1),
+    ("esi_db_pool_requests_queued_total", "counter", "Pedidos que precisaram esperar.", "requests_queued", 1),
+    ("esi_db_pool_requests_wait_seconds_total", "counter", "Tempo total de espera por conexao.", "requests_wait_ms", 0.001),
+    ("esi_db_pool_requests_errors_total", "counter", "Pedidos de conexao com erro.", "requests_errors", 1),
+    ("esi_db_pool_connections_lost_total", "counter", "Conexoes perdidas pelo pool.", "connections_lost", 1),
+)
+
+
+def collect_database_metrics() -> list:
+    """Familias de metricas do pool e do cache de traducao de SQL."""
+    pool_stats = [get_pool_stats_for_proxy(proxy) for proxy in list(_PROXIES.values())]
+    families = [
+        (
+            name,
+            metric_type,
+            help_text,
+            [({"pool": stats["name"]}, stats[field] * scale) for stats in pool_stats],
+        )
+        for name, metric_type, help_text, field, scale in POOL_METRIC_FIELDS
+    ]
+
+    cache_info = _translate_query.cache_info()
+    families.append(
+        (
+            "esi_cache_requests_total",
+            "counter",
+            "Consultas aos caches em memoria por resultado.",
+            [
+                ({"cache": "sql_translation", "result": "hit"}, cache_info.hits),
+                ({"cache": "sql_translation", "result": "miss"}, cache_info.misses),
+            ],
+        )
+    )
+    return families
+
+
+def _prewarm_pool(project_root, target_size: int) -> int:
+    root_key = str(Path(project_root).resolve())
+    pool = _POOLS[root_key]
+    connections = []
+    try:
+        # Segura as conexoes ao mesmo tempo para forcar o pool a abrir target_size.
+        while len(connections) < target_size:
+            connections.append(pool.getconn(timeout=10))
+    except Exception as exc:
+        print(f" Pre-aquecimento do pool interrompido: {exc}")
+    finally:
+        for conn in connections:
+            try:
+                pool.putconn(conn)
+            except Exception:
+                pass
+    return int(pool.get_stats().get("pool_size", 0))
+
+
+def get_pool_stats(project_root=None) -> dict | None:
+    if project_root is not None:
+        proxy = _PROXIES.get(str(Path(project_root).resolve()))
+    else:
+        proxy = next(iter(_PROXIES.values()), None)
+    if proxy is None:
+        return None
+    return get_pool_stats_for_proxy(proxy)
+
+
+def get_pool_stats_for_proxy(proxy) -> dict:
+    pool = proxy.pool
+
+    stats = pool.get_stats()
+    pool_size = int(stats.get("pool_size", 0))
+    pool_available = int(stats.get("pool_available", 0))
+    requests_queued = int(stats.get("requests_queued", 0))
+    requests_wait_ms = int(stats.get("requests_wait_ms", 0))
+    in_use = max(pool_size - pool_available, 0)
+    return {
+        "name": pool.name,
+        "min_size": pool.min_size,
+        "max_size": pool.max_size,
+        "max_idle": pool.max_idle,
+        "size": pool_size,
+        "available": pool_available,
+        "in_use": in_use,
+        "saturation": round(in_use / pool.max_size, 3) if pool.max_size else 0.0,
+        "requests_waiting": int(stats.get("requests_waiting", 0)),
+        "requests_total": int(stats.get("requests_num", 0)),
+        "requests_queued": requests_queued,
+        "requests_wait_ms": requests_wait_ms,
+        "requests_avg_wait_ms": round(requests_wait_ms / requests_queued, 1) if requests_queued else 0.0,
+        "requests_errors": int(stats.get("requests_errors", 0)),
+        "connections_opened": int(stats.get("connections_num", 0)),
+        "connections_errors": int(stats.get("connections_errors", 0)),
+        "connections_lost": int(stats.get("connections_lost", 0)),
+        "usage_ms": int(stats.get("usage_ms", 0)),
+        "leaks": proxy.leak_stats(),
+        "data_version": proxy.data_version,
+        "query_cache": _translate_query.cache_info()._asdict(),
+    }
+
+
+def get_cache_stats() -> dict:
+    return {
+        "pools": len(_POOLS),
+        "query_cache": _translate_query.cache_info()._asdict(),
+        "numero_cliente_column_cache": len(_EMPRESAS_NUMERO_CLIENTE_COLUMN_CACHE),
+    }
+
+
 def migrate_sqlite_to_postgres(project_root):
     conn = get_connection(project_root)
     summary = {
@@ -327,8 +696,9 @@ def migrate_sqlite_to_postgres(project_root):
 
 
 class DatabaseCursorProxy:
-    def __init__(self, cursor):
+    def __init__(self, cursor, owner=None):
         self._cursor = cursor
+        self._owner = owner
 
     def __enter__(self):
         self._cursor.__enter__()
@@ -337,12 +707,28 @@ class DatabaseCursorProxy:
     def __exit__(self, exc_type, exc, tb):
         return self._cursor.__exit__(exc_type, exc, tb)
 
-    def execute(self, query, params=None):
-        self._cursor.execute(_translate_query(query), params or ())
+    def execute(self, query, params=None, prepare=None):
+        if prepare and self._cursor.connection.prepare_threshold is None:
+            prepare = None
+        translated = _translate_query(query)
+        started_at = time.perf_counter()
+        try:
+            self._cursor.execute(translated, params or (), prepare=prepare)
+        finally:
+            _record_query(translated, (time.perf_counter() - started_at) * 1000, self._cursor.rowcount)
+        if self._owner is not None and _is_write_query(translated):
+            self._owner._mark_pending_write()
         return self
 
     def executemany(self, query, params_seq):
-        self._cursor.executemany(_translate_query(query), params_seq)
+        translated = _translate_query(query)
+        started_at = time.perf_counter()
+        try:
+            self._cursor.executemany(translated, params_seq)
+        finally:
+            _record_query(translated, (time.perf_counter() - started_at) * 1000, self._cursor.rowcount)
+        if self._owner is not None and _is_write_query(translated):
+            self._owner._mark_pending_write()
         return self
 
     def __iter__(self):
@@ -356,40 +742,133 @@ class DatabaseConnectionProxy:
     def __init__(self, pool: ConnectionPool):
         self.pool = pool
         self._local = threading.local()
+        self._checkouts = {}
+        self._checkouts_lock = threading.Lock()
+        self._leaks_reported = 0
+        self._orphans_reclaimed = 0
+        self._data_version = 0
+        self._data_version_lock = threading.Lock()
+
+    @property
+    def data_version(self):
+        """Contador de transacoes com escrita confirmadas neste processo.
+
+        Serve de versao barata dos dados para caches em memoria: muda a cada
+        commit que executou INSERT/UPDATE/DELETE por este proxy.
+        """
+        return self._data_version
+
+    def _mark_pending_write(self):
+        self._local.pending_write = True
 
     def _get_or_acquire(self):
         conn = getattr(self._local, "conn", None)
         if conn is None or conn.closed:
+            if conn is not None:
+                self._forget_checkout(conn)
             conn = self.pool.getconn()
             self._local.conn = conn
+            self._remember_checkout(conn)
         return conn
 
+    def _remember_checkout(self, conn):
+        with self._checkouts_lock:
+            self._checkouts[id(conn)] = {
+                "conn": conn,
+                "thread": threading.current_thread(),
+                "scope": getattr(_SCOPE_STATE, "label", None),
+                "since": time.monotonic(),
+                "stack": traceback.extract_stack(limit=16)[:-3],
+                "reported": False,
+            }
+        _ensure_leak_detector()
+
+    def _forget_checkout(self, conn):
+        with self._checkouts_lock:
+            self._checkouts.pop(id(conn), None)
+
+    def leak_stats(self):
+        now = time.monotonic()
+        with self._checkouts_lock:
+            checkouts = list(self._checkouts.values())
+            return {
+                "checked_out": len(checkouts),
+                "held_too_long": sum(
+                    1 for entry in checkouts if now - entry["since"] > LEAK_THRESHOLD_SECONDS
+                ),
+                "leaks_reported": self._leaks_reported,
+                "orphans_reclaimed": self._orphans_reclaimed,
+            }
+
+    def check_leaks(self, threshold_seconds):
+        now = time.monotonic()
+        orphans = []
+        with self._checkouts_lock:
+            for key, entry in list(self._checkouts.items()):
+                if not entry["thread"].is_alive():
+                    # A thread dona terminou sem liberar: a conexao volta ao pool.
+                    orphans.append(self._checkouts.pop(key))
+                elif not entry["reported"] and now - entry["since"] > threshold_seconds:
+                    entry["reported"] = True
+                    self._leaks_reported += 1
+                    print(
+                        f" Conexao PostgreSQL presa ha {now - entry['since']:.0f}s "
+                        f"pela thread {entry['thread'].name} (escopo: {entry['scope'] or '-'}). "
+                        "Checkout em:\n" + "".join(traceback.format_list(entry["stack"]))
+                    )
+            self._orphans_reclaimed += len(orphans)
+
+        for entry in orphans:
+            conn = entry["conn"]
+            print(
+                f" Conexao PostgreSQL devolvida ao pool apos termino da thread "
+                f"{entry['thread'].name} (escopo: {entry['scope'] or '-'}). Checkout em:\n"
+                + "".join(traceback.format_list(entry["stack"]))
+            )
+            try:
+                if not conn.closed:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+                self.pool.putconn(conn)
+            except Exception as exc:
+                print(f" Falha ao devolver conexao orfa ao pool: {exc}")
+
     def cursor(self, *args, **kwargs):
         row_factory = kwargs.pop("row_factory", dict_row)
         return DatabaseCursorProxy(
-            self._get_or_acquire().cursor(*args, row_factory=row_factory, **kwargs)
+            self._get_or_acquire().cursor(*args, row_factory=row_factory, **kwargs),
+            owner=self,
         )
 
-    def execute(self, query, params=None):
+    def execute(self, query, params=None, prepare=None):
         cursor = self.cursor()
-        cursor.execute(query, params)
+        cursor.execute(query, params, prepare=prepare)
         return cursor
 
     def commit(self):
         conn = getattr(self._local, "conn", None)
         if conn is not None and not conn.closed:
             conn.commit()
+            if getattr(self._local, "pending_write", False):
+                self._local.pending_write = False
+                with self._data_version_lock:
+                    self._data_version += 1
 
     def rollback(self):
+        self._local.pending_write = False
         conn = getattr(self._local, "conn", None)
         if conn is not None and not conn.closed:
             conn.rollback()
 
     def release(self):
+        self._local.pending_write = False
         conn = getattr(self._local, "conn", None)
         if conn is None:
             return
 
+        self._forget_checkout(conn)
         try:
             if not conn.closed:
                 try:
@@ -409,12 +888,60 @@ def _initialize_database(project_root, root_key: str) -> None:
 
         pool = _POOLS[root_key]
         with pool.connection() as conn:
-            _execute_statements(conn, SCHEMA_SQL)
+            if _load_schema_version(conn) != SCHEMA_VERSION:
+                _execute_statements(conn, SCHEMA_SQL)
+                _store_schema_version(conn, SCHEMA_VERSION)
+                print(f" Schema PostgreSQL aplicado (versao {SCHEMA_VERSION}).")
             conn.commit()
+            _ensure_trigram_indexes(conn)
 
         _INITIALIZED_ROOTS.add(root_key)
 
 
+def _ensure_trigram_indexes(conn) -> bool:
+    try:
+        with conn.transaction():
+            with conn.cursor() as cursor:
+                for statement in TRIGRAM_INDEX_STATEMENTS:
+                    cursor.execute(statement)
+        return True
+    except Exception as exc:
+        print(f" pg_trgm indisponivel, busca de empresas sem indice trigram: {exc}")
+        return False
+
+
+def _load_schema_version(conn):
+    with conn.cursor(row_factory=dict_row) as cursor:
+        cursor.execute(
+            "SELECT to_regclass(current_schema() || '.schema_version') IS NOT NULL AS has_table"
+        )
+        row = cursor.fetchone()
+        if not (row and row.get("has_table")):
+            return None
+
+        cursor.execute(
+            "SELECT version FROM schema_version WHERE schema_key = %s",
+            ("main",),
+        )
+        row = cursor.fetchone()
+    return row.get("version") if row else None
+
+
+def _store_schema_version(conn, version: str) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_VERSION_SQL)
+        cursor.execute(
+            """
+            INSERT INTO schema_version(schema_key, version, applied_at)
+            VALUES(%s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT(schema_key) DO UPDATE SET
+                version = EXCLUDED.version,
+                applied_at = EXCLUDED.applied_at
+            """,
+            ("main", version),
+        )
+
+
 def _execute_statements(conn, sql_script: str) -> None:
     statements = [statement.strip() for statement in sql_script.split(";") if statement.strip()]
     with conn.cursor() as cursor:
@@ -877,6 +1404,7 @@ def _quote_identifier(identifier: str) -> str:
     return '"' + str(identifier).replace('"', '""') + '"'
 
 
+@lru_cache(maxsize=int(os.environ.get("ESI_QUERY_CACHE_SIZE", "512") or 512))
 def _translate_query(query: str) -> str:
     translated = str(query)
     translated = translated.replace("?", "%s")
@@ -894,6 +1422,19 @@ def _translate_query(query: str) -> str:
     return translated
 
 
+_WRITE_QUERY_RE = re.compile(r"\b(?:INSERT|UPDATE|DELETE|TRUNCATE|MERGE)\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=int(os.environ.get("ESI_QUERY_CACHE_SIZE", "512") or 512))
+def _is_write_query(query: str) -> bool:
+    statement = str(query).lstrip()
+    keyword = statement.split(None, 1)[0].upper() if statement else ""
+    if keyword in {"INSERT", "UPDATE", "DELETE", "TRUNCATE", "MERGE"}:
+        return True
+    # CTEs podem esconder escritas (WITH ... DELETE ... RETURNING).
+    return keyword == "WITH" and bool(_WRITE_QUERY_RE.search(statement))
+
+
 def _enforce_ssl_mode(database_url: str) -> str:
     parsed = urlsplit(database_url)
     query = dict(parse_qsl(parsed.query, keep_blank_values=True))
@@ -0,0 +1,223 @@
+"""Registro de alteracoes de obras e do catalogo para sincronizacao incremental.
+
+Cada entidade tem uma unica linha em ``change_log``; toda escrita que altera o
+conteudo move a linha para uma versao nova da sequencia ``change_log_version_seq``.
+Assim ``version > since`` devolve exatamente o estado atual do que mudou, sem
+historico acumulado. Exclusoes ficam como linhas ``delete`` (tombstones); as
+siglas e nomes de empresa por onde a obra ja passou ficam em ``previous_empresas``
+e ``previous_empresa_nomes``, para que a empresa anterior tambem receba a
+exclusao quando a obra muda de empresa.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+
+from servidor_modules.database.storage import get_storage
+
+ENTITY_OBRA = "obra"
+ENTITY_CATALOG = "catalog"
+OPERATION_UPSERT = "upsert"
+OPERATION_DELETE = "delete"
+# Mesmas chaves, na mesma ordem, que ``_matches_empresa_context`` no handler.
+OBRA_EMPRESA_CODIGO_KEYS = ("empresaCodigo", "empresaSigla", "codigo", "sigla", "empresaAtual")
+OBRA_EMPRESA_NOME_KEYS = ("empresaNome", "nomeEmpresa", "empresa")
+CATALOG_SECTIONS = (
+    "constants",
+    "machines",
+    "materials",
+    "banco_acessorios",
+    "dutos",
+    "tubos",
+)
+
+
+def content_hash(content):
+    """Hash do conteudo; strings sao usadas como estao (ex.: ``raw_json``)."""
+    if not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False, sort_keys=True)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def scope_text(value):
+    """Sigla ou nome de empresa como ``_matches_empresa_context`` compara."""
+    return str(value or "").strip().upper() or None
+
+
+def obra_empresa_scope(obra):
+    """``{"empresa_codigo", "empresa_nome"}`` da obra, com os mesmos apelidos do escopo de cliente."""
+    obra = obra if isinstance(obra, dict) else {}
+    return {
+        "empresa_codigo": scope_text(
+            next((obra.get(key) for key in OBRA_EMPRESA_CODIGO_KEYS if obra.get(key)), None)
+        ),
+        "empresa_nome": scope_text(
+            next((obra.get(key) for key in OBRA_EMPRESA_NOME_KEYS if obra.get(key)), None)
+        ),
+    }
+
+
+def _moved_from(previous, old, new):
+    """Empresas anteriores, acrescidas de ``old`` quando a obra saiu dela."""
+    old = scope_text(old)
+    moved = [value for value in (previous or []) if value not in {old, new}]
+    if old and old != new:
+        moved.append(old)
+    return moved
+
+
+class ChangeLogRepository:
+    def __init__(self, project_root):
+        self.storage = get_storage(project_root)
+        self.conn = self.storage.conn
+        self.project_root = self.storage.project_root
+        self.ensure_seeded()
+
+    def ensure_seeded(self):
+        """Com o registro vazio, cadastra o estado atual para ``since=0`` devolver tudo."""
+        cursor = self.conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('esi_change_log'))")
+            row = cursor.execute(
+                "SELECT EXISTS(SELECT 1 FROM change_log) AS seeded"
+            ).fetchone()
+            if not (row and row["seeded"]):
+                cursor.execute(
+                    """
+                    INSERT INTO change_log(entity, entity_id, operation, empresa_codigo, empresa_nome)
+                    SELECT
+                        'obra',
+                        id,
+                        'upsert',
+                        NULLIF(esi_obra_empresa_codigo(raw_json), ''),
+                        NULLIF(esi_obra_empresa_nome(raw_json), '')
+                    FROM obras
+                    ORDER BY sort_order, id
+                    """
+                )
+                for section in CATALOG_SECTIONS:
+                    cursor.execute(
+                        """
+                        INSERT INTO change_log(entity, entity_id, operation)
+                        VALUES(?, ?, ?)
+                        """,
+                        (ENTITY_CATALOG, section, OPERATION_UPSERT),
+                    )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    @staticmethod
+    def record(
+        cursor,
+        entity,
+        entity_id,
+        operation,
+        content=None,
+        empresa_codigo=None,
+        empresa_nome=None,
+    ):
+        """Registra a alteracao dentro da transacao de ``cursor``.
+
+        Escritas que nao mudam o conteudo (mesmo hash e operacao) mantem a versao.
+        Se a obra muda de empresa (sigla ou nome), a anterior entra em
+        ``previous_empresas``/``previous_empresa_nomes``; exclusoes sem empresa
+        conhecida mantem a do registro.
+        O lock de transacao serializa os escritores ate o commit, entao a ordem das
+        versoes e a ordem de commit e um leitor nunca pula uma versao menor.
+        """
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext('esi_change_log'))")
+        empresa_codigo = scope_text(empresa_codigo)
+        empresa_nome = scope_text(empresa_nome)
+        current = cursor.execute(
+            """
+            SELECT empresa_codigo, empresa_nome, previous_empresas, previous_empresa_nomes
+            FROM change_log
+            WHERE entity = ? AND entity_id = ?
+            """,
+            (str(entity), str(entity_id)),
+        ).fetchone()
+
+        previous_empresas = []
+        previous_empresa_nomes = []
+        if current is not None:
+            if operation == OPERATION_DELETE:
+                empresa_codigo = empresa_codigo or scope_text(current["empresa_codigo"])
+                empresa_nome = empresa_nome or scope_text(current["empresa_nome"])
+            previous_empresas = _moved_from(
+                current["previous_empresas"], current["empresa_codigo"], empresa_codigo
+            )
+            previous_empresa_nomes = _moved_from(
+                current["previous_empresa_nomes"], current["empresa_nome"], empresa_nome
+            )
+
+        cursor.execute(
+            """
+            INSERT INTO change_log(
+                entity, entity_id, operation, content_hash,
+                empresa_codigo, empresa_nome, previous_empresas, previous_empresa_nomes
+            )
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(entity, entity_id) DO UPDATE SET
+                version = nextval('change_log_version_seq'),
+                operation = EXCLUDED.operation,
+                content_hash = EXCLUDED.content_hash,
+                empresa_codigo = EXCLUDED.empresa_codigo,
+                empresa_nome = EXCLUDED.empresa_nome,
+                previous_empresas = EXCLUDED.previous_empresas,
+                previous_empresa_nomes = EXCLUDED.previous_empresa_nomes,
+                changed_at = CURRENT_TIMESTAMP
+            WHERE change_log.operation <> EXCLUDED.operation
+                OR change_log.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            """,
+            (
+                str(entity),
+                str(entity_id),
+                str(operation),
+                content_hash(content) if content is not None else None,
+                empresa_codigo,
+                empresa_nome,
+                previous_empresas,
+                previous_empresa_nomes,
+            ),
+        )
+
+    @classmethod
+    def record_catalog_sections(cls, cursor, sections):
+        """Registra as secoes do catalogo informadas em ``{secao: conteudo}``."""
+        for section, content in sections.items():
+            if section in CATALOG_SECTIONS:
+                cls.record(cursor, ENTITY_CATALOG, section, OPERATION_UPSERT, content)
+
+    def get_current_version(self):
+        row = self.conn.execute(
+            "SELECT COALESCE(MAX(version), 0) AS version FROM change_log"
+        ).fetchone()
+        return int(row["version"]) if row else 0
+
+    def get_changes(self, since, limit):
+        """Alteracoes com versao maior que ``since``, ja com o ``raw_json`` atual das obras."""
+        return self.conn.execute(
+            """
+            SELECT
+                change_log.entity,
+                change_log.entity_id,
+                change_log.version,
+                change_log.operation,
+                change_log.empresa_codigo,
+                change_log.empresa_nome,
+                change_log.previous_empresas,
+                change_log.previous_empresa_nomes,
+                obras.raw_json
+            FROM change_log
+            LEFT JOIN obras
+                ON change_log.entity = 'obra' AND obras.id = change_log.entity_id
+            WHERE change_log.version > ?
+            ORDER BY change_log.version
+            LIMIT ?
+            """,
+            (int(since), int(limit)),
+        ).fetchall()
@@ -5,11 +5,20 @@ from __future__ import annotations
 import json
 from datetime import datetime, timedelta
 
-from servidor_modules.database.connection import has_empresas_numero_cliente_column
-from servidor_modules.database.storage import get_storage, normalize_empresa
+from servidor_modules.database.connection import (
+    fold_search_text,
+    has_empresas_numero_cliente_column,
+)
+from servidor_modules.database.storage import (
+    credential_expires_at,
+    get_storage,
+    normalize_empresa,
+)
 
 
 class EmpresaRepository:
+    SEARCH_LIMIT = 20
+
     def __init__(self, project_root):
         self.storage = get_storage(project_root)
         self.conn = self.storage.conn
@@ -216,13 +225,14 @@ class EmpresaRepository:
                     cursor.execute(
                         """
                         INSERT INTO empresas(
-                            codigo, nome, ultimo_numero_cliente, credenciais_json, raw_json, sort_order
+                            codigo, nome, ultimo_numero_cliente, credenciais_json, credenciais_expires_at, raw_json, sort_order
                         )
-                        VALUES(?, ?, ?, ?, ?, ?)
+                        VALUES(?, ?, ?, ?, ?, ?, ?)
                         ON CONFLICT(codigo) DO UPDATE SET
                             nome = EXCLUDED.nome,
                             ultimo_numero_cliente = EXCLUDED.ultimo_numero_cliente,
                             credenciais_json = EXCLUDED.credenciais_json,
+                            credenciais_expires_at = EXCLUDED.credenciais_expires_at,
                             raw_json = EXCLUDED.raw_json,
                             sort_order = EXCLUDED.sort_order
                         """,
@@ -235,6 +245,7 @@ class EmpresaRepository:
                             json.dumps(empresa.get("credenciais"), ensure_ascii=False)
                             if empresa.get("credenciais") is not None
                             else None,
+                            credential_expires_at(empresa.get("credenciais")),
                             json.dumps(empresa, ensure_ascii=False),
                             index,
                         ),
@@ -243,12 +254,13 @@ class EmpresaRepository:
                     cursor.execute(
                         """
                         INSERT INTO empresas(
-                            codigo, nome, credenciais_json, raw_json, sort_order
+                            codigo, nome, credenciais_json, credenciais_expires_at, raw_json, sort_order
                         )
-                        VALUES(?, ?, ?, ?, ?)
+                        VALUES(?, ?, ?, ?, ?, ?)
                         ON CONFLICT(codigo) DO UPDATE SET
                             nome = EXCLUDED.nome,
                             credenciais_json = EXCLUDED.credenciais_json,
+                            credenciais_expires_at = EXCLUDED.credenciais_expires_at,
                             raw_json = EXCLUDED.raw_json,
                             sort_order = EXCLUDED.sort_order
                         """,
@@ -258,6 +270,7 @@ class EmpresaRepository:
                             json.dumps(empresa.get("credenciais"), ensure_ascii=False)
                             if empresa.get("credenciais") is not None
                             else None,
+                            credential_expires_at(empresa.get("credenciais")),
                             json.dumps(empresa, ensure_ascii=False),
                             index,
                         ),
@@ -302,29 +315,67 @@ class EmpresaRepository:
         self.storage.save_document("dados.json", dados)
         return empresa_normalizada
 
-    def search(self, termo):
-        termo_normalizado = str(termo or "").strip().upper()
+    def search(self, termo, limit=None):
+        """Busca por sigla ou nome sem acentos: sigla exata, prefixo e depois substring.
+
+        Os prefixos usam os indices ``text_pattern_ops``; a busca por substring so
+        roda quando eles nao completam o limite.
+        """
+        termo_normalizado = fold_search_text(termo)
         if not termo_normalizado:
             return []
 
-        resultados = []
-        for empresa in self.get_all():
-            empresa_normalizada = normalize_empresa(empresa)
-            if not empresa_normalizada:
-                continue
+        termo_like = (
+            termo_normalizado.replace("\\", "\\\\")
+            .replace("%", "\\%")
+            .replace("_", "\\_")
+        )
+        contem = f"%{termo_like}%"
+        prefixo = f"{termo_like}%"
+        limit = int(limit or self.SEARCH_LIMIT)
+        numero_cliente_sql = (
+            "ultimo_numero_cliente"
+            if self._supports_numero_cliente_column()
+            else "0 AS ultimo_numero_cliente"
+        )
+        rows = self.conn.execute(
+            f"""
+            SELECT raw_json, {numero_cliente_sql}
+            FROM empresas
+            WHERE esi_fold_text(codigo) LIKE ?
+                OR esi_fold_text(nome) LIKE ?
+            ORDER BY
+                CASE
+                    WHEN esi_fold_text(codigo) = ? THEN 0
+                    WHEN esi_fold_text(codigo) LIKE ? THEN 1
+                    ELSE 2
+                END,
+                sort_order,
+                codigo
+            LIMIT ?
+            """,
+            (prefixo, prefixo, termo_normalizado, prefixo, limit),
+        ).fetchall()
 
-            codigo = empresa_normalizada.get("codigo", "")
-            nome = empresa_normalizada.get("nome", "")
-            primeiro_nome = nome.split(" ")[0].upper() if nome else ""
-            nome_upper = nome.upper()
+        if len(rows) < limit:
+            rows += self.conn.execute(
+                f"""
+                SELECT raw_json, {numero_cliente_sql}
+                FROM empresas
+                WHERE (esi_fold_text(codigo) LIKE ? OR esi_fold_text(nome) LIKE ?)
+                    AND esi_fold_text(codigo) NOT LIKE ?
+                    AND esi_fold_text(nome) NOT LIKE ?
+                ORDER BY sort_order, codigo
+                LIMIT ?
+                """,
+                (contem, contem, prefixo, prefixo, limit - len(rows)),
+            ).fetchall()
 
-            if (
-                codigo == termo_normalizado
-                or primeiro_nome.startswith(termo_normalizado)
-                or termo_normalizado in nome_upper
-            ):
+        resultados = []
+        for row in rows:
+            empresa_normalizada = normalize_empresa(self._hydrate_empresa_row(row))
+            if empresa_normalizada:
                 resultados.append(empresa_normalizada)
-
         return resultados
 
     def upsert_recovery_email(self, codigo, nome, email):
@@ -447,6 +498,61 @@ class EmpresaRepository:
         self._upsert_empresa(empresa)
         return True
 
+    def backfill_credential_expiry(self):
+        """Preenche ``credenciais_expires_at`` de linhas gravadas antes da coluna existir."""
+        rows = self.conn.execute(
+            """
+            SELECT codigo, credenciais_json
+            FROM empresas
+            WHERE credenciais_json IS NOT NULL AND credenciais_expires_at IS NULL
+            """
+        ).fetchall()
+        updates = []
+        for row in rows:
+            try:
+                credenciais = json.loads(row["credenciais_json"])
+            except Exception:
+                continue
+            expires_at = credential_expires_at(credenciais)
+            if expires_at is not None:
+                updates.append((expires_at, row["codigo"]))
+        if not updates:
+            return 0
+
+        cursor = self.conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            cursor.executemany(
+                "UPDATE empresas SET credenciais_expires_at = ? WHERE codigo = ?",
+                updates,
+            )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return len(updates)
+
+    def clear_expired_credentials(self):
+        """Remove em um unico UPDATE as credenciais vencidas; retorna os codigos afetados."""
+        cursor = self.conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            rows = cursor.execute(
+                """
+                UPDATE empresas
+                SET credenciais_json = NULL,
+                    credenciais_expires_at = NULL,
+                    raw_json = jsonb_set(raw_json::jsonb, '{credenciais}', 'null'::jsonb)::text
+                WHERE credenciais_expires_at <= CURRENT_TIMESTAMP
+                RETURNING codigo
+                """
+            ).fetchall()
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return [str(row["codigo"]) for row in rows]
+
     def get_by_codigo(self, codigo):
         if self._supports_numero_cliente_column():
             row = self.conn.execute(
@@ -494,13 +600,14 @@ class EmpresaRepository:
                 cursor.execute(
                     """
                     INSERT INTO empresas(
-                        codigo, nome, ultimo_numero_cliente, credenciais_json, raw_json, sort_order
+                        codigo, nome, ultimo_numero_cliente, credenciais_json, credenciais_expires_at, raw_json, sort_order
                     )
-                    VALUES(?, ?, ?, ?, ?, ?)
+                    VALUES(?, ?, ?, ?, ?, ?, ?)
                     ON CONFLICT(codigo) DO UPDATE SET
                         nome = EXCLUDED.nome,
                         ultimo_numero_cliente = EXCLUDED.ultimo_numero_cliente,
                         credenciais_json = EXCLUDED.credenciais_json,
+                        credenciais_expires_at = EXCLUDED.credenciais_expires_at,
                         raw_json = EXCLUDED.raw_json,
                         sort_order = EXCLUDED.sort_order
                     """,
@@ -515,6 +622,7 @@ class EmpresaRepository:
                         )
                         if empresa_normalizada.get("credenciais") is not None
                         else None,
+                        credential_expires_at(empresa_normalizada.get("credenciais")),
                         json.dumps(empresa_normalizada, ensure_ascii=False),
                         sort_order,
                     ),
@@ -523,12 +631,13 @@ class EmpresaRepository:
                 cursor.execute(
                     """
                     INSERT INTO empresas(
-                        codigo, nome, credenciais_json, raw_json, sort_order
+                        codigo, nome, credenciais_json, credenciais_expires_at, raw_json, sort_order
                     )
-                    VALUES(?, ?, ?, ?, ?)
+                    VALUES(?, ?, ?, ?, ?, ?)
                     ON CONFLICT(codigo) DO UPDATE SET
                         nome = EXCLUDED.nome,
                         credenciais_json = EXCLUDED.credenciais_json,
+                        credenciais_expires_at = EXCLUDED.credenciais_expires_at,
                         raw_json = EXCLUDED.raw_json,
                         sort_order = EXCLUDED.sort_order
                     """,
@@ -540,6 +649,7 @@ class EmpresaRepository:
                         )
                         if empresa_normalizada.get("credenciais") is not None
                         else None,
+                        credential_expires_at(empresa_normalizada.get("credenciais")),
                         json.dumps(empresa_normalizada, ensure_ascii=False),
                         sort_order,
                     ),
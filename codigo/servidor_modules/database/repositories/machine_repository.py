@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import json
 
+from servidor_modules.database.repositories.change_log_repository import ChangeLogRepository
 from servidor_modules.database.storage import get_storage
 
 
@@ -51,10 +52,12 @@ class MachineRepository:
                         index,
                     ),
                 )
+            ChangeLogRepository.record_catalog_sections(cursor, {"machines": machines})
             self.conn.commit()
         except Exception:
             self.conn.rollback()
             raise
+        self.storage.bump_catalog_version()
         return self.get_all()
 
     def add(self, machine):
@@ -6,6 +6,13 @@ import json
 from copy import deepcopy
 
 from servidor_modules.database.connection import has_empresas_numero_cliente_column
+from servidor_modules.database.repositories.change_log_repository import (
+    ENTITY_OBRA,
+    OPERATION_DELETE,
+    OPERATION_UPSERT,
+    ChangeLogRepository,
+    obra_empresa_scope,
+)
 from servidor_modules.database.storage import get_storage
 
 
@@ -40,12 +47,23 @@ class ObraRepository:
         try:
             if incoming_ids:
                 placeholders = ", ".join(["?"] * len(incoming_ids))
-                cursor.execute(
-                    f"DELETE FROM obras WHERE id NOT IN ({placeholders})",
+                deleted_rows = cursor.execute(
+                    f"DELETE FROM obras WHERE id NOT IN ({placeholders}) RETURNING id, raw_json",
                     tuple(incoming_ids),
-                )
+                ).fetchall()
             else:
-                cursor.execute("DELETE FROM obras")
+                deleted_rows = cursor.execute(
+                    "DELETE FROM obras RETURNING id, raw_json"
+                ).fetchall()
+
+            for row in deleted_rows:
+                ChangeLogRepository.record(
+                    cursor,
+                    ENTITY_OBRA,
+                    row["id"],
+                    OPERATION_DELETE,
+                    **obra_empresa_scope(json.loads(row["raw_json"])),
+                )
 
             for sort_order, obra in enumerate(obras):
                 self._save_with_cursor(cursor, obra, sort_order=sort_order)
@@ -89,6 +107,68 @@ class ObraRepository:
         ).fetchall()
         return [self._build_catalog_entry(row) for row in rows]
 
+    def get_by_empresa(self, empresa_codigo, empresa_nome=None):
+        """Obras de uma empresa pelo codigo ou, como fallback, pelo nome."""
+        return [
+            json.loads(row["raw_json"])
+            for row in self.get_raw_by_empresa(empresa_codigo, empresa_nome)
+        ]
+
+    def get_raw_by_empresa(self, empresa_codigo, empresa_nome=None):
+        """Linhas ``id``/``raw_json`` sem desserializar, para caches por versao da obra."""
+        where_sql, params = self._empresa_scope(empresa_codigo, empresa_nome)
+        if not where_sql:
+            return []
+        return self.conn.execute(
+            f"SELECT id, raw_json FROM obras WHERE {where_sql} ORDER BY sort_order, id",
+            params,
+        ).fetchall()
+
+    def get_catalog_by_empresa(self, empresa_codigo, empresa_nome=None):
+        where_sql, params = self._empresa_scope(empresa_codigo, empresa_nome)
+        if not where_sql:
+            return []
+        rows = self.conn.execute(
+            f"""
+            SELECT
+                obras.id,
+                obras.nome,
+                obras.empresa_codigo,
+                obras.empresa_id,
+                obras.empresa_nome,
+                obras.numero_cliente_final,
+                obras.raw_json,
+                obras.sort_order,
+                (
+                    SELECT COUNT(*)
+                    FROM projetos
+                    WHERE projetos.obra_id = obras.id
+                ) AS total_projetos
+            FROM obras
+            WHERE {where_sql}
+            ORDER BY obras.sort_order, obras.id
+            """,
+            params,
+        ).fetchall()
+        return [self._build_catalog_entry(row) for row in rows]
+
+    def _empresa_scope(self, empresa_codigo, empresa_nome=None):
+        # Mesmas chaves de _matches_empresa_context, lidas do raw_json: a coluna
+        # empresa_codigo vem so de empresaSigla e vira NULL quando o dados.json e
+        # regravado (ON DELETE SET NULL). Usa idx_obras_scope_empresa_codigo/_nome;
+        # o filtro fino continua no handler.
+        codigo = str(empresa_codigo or "").strip().upper()
+        nome = str(empresa_nome or "").strip().upper()
+        conditions = []
+        params = []
+        if codigo:
+            conditions.append("esi_obra_empresa_codigo(obras.raw_json) = ?")
+            params.append(codigo)
+        if nome:
+            conditions.append("esi_obra_empresa_nome(obras.raw_json) = ?")
+            params.append(nome)
+        return " OR ".join(conditions), tuple(params)
+
     def get_by_id(self, obra_id):
         row = self.conn.execute(
             "SELECT raw_json FROM obras WHERE id = ?",
@@ -121,8 +201,20 @@ class ObraRepository:
         cursor = self.conn.cursor()
         cursor.execute("BEGIN")
         try:
-            cursor.execute("DELETE FROM obras WHERE id = ?", (str(obra_id),))
-            deleted = cursor.rowcount > 0
+            deleted_row = cursor.execute(
+                "DELETE FROM obras WHERE id = ? RETURNING raw_json",
+                (str(obra_id),),
+            ).fetchone()
+            deleted = deleted_row is not None
+            if deleted:
+                ChangeLogRepository.record(
+                    cursor,
+                    ENTITY_OBRA,
+                    obra_id,
+                    OPERATION_DELETE,
+                    **obra_empresa_scope(json.loads(deleted_row["raw_json"])),
+                )
+            cursor.execute("DELETE FROM session_obras WHERE obra_id = ?", (str(obra_id),))
             codigo_empresa = str(
                 (obra_existente or {}).get("empresaSigla") or ""
             ).strip()
@@ -134,6 +226,19 @@ class ObraRepository:
             self.conn.rollback()
             raise
 
+    def get_by_session(self, session_id):
+        rows = self.conn.execute(
+            """
+            SELECT obras.raw_json
+            FROM session_obras
+            JOIN obras ON obras.id = session_obras.obra_id
+            WHERE session_obras.session_id = ?
+            ORDER BY session_obras.position, session_obras.obra_id
+            """,
+            (str(session_id),),
+        ).fetchall()
+        return [json.loads(row["raw_json"]) for row in rows]
+
     def get_by_session_ids(self, obra_ids):
         ordered_ids = [str(obra_id) for obra_id in obra_ids if str(obra_id).strip()]
         if not ordered_ids:
@@ -410,6 +515,7 @@ class ObraRepository:
 
         empresa_codigo = str(obra_payload.get("empresaSigla", "")).strip() or None
         empresa_nome = obra_payload.get("empresaNome")
+        raw_json = json.dumps(obra_payload, ensure_ascii=False)
 
         if empresa_codigo:
             cursor.execute(
@@ -455,10 +561,18 @@ class ObraRepository:
                 obra_payload.get("empresa_id"),
                 empresa_nome,
                 obra_payload.get("numeroClienteFinal"),
-                json.dumps(obra_payload, ensure_ascii=False),
+                raw_json,
                 sort_order,
             ),
         )
+        ChangeLogRepository.record(
+            cursor,
+            ENTITY_OBRA,
+            obra_id,
+            OPERATION_UPSERT,
+            raw_json,
+            **obra_empresa_scope(obra_payload),
+        )
 
         cursor.execute(
             """
@@ -509,6 +623,7 @@ class ObraRepository:
                     ),
                     projeto_index,
                 ),
+                prepare=True,
             )
 
             for sala_index, sala in enumerate(projeto.get("salas", [])):
@@ -535,6 +650,7 @@ class ObraRepository:
                         ),
                         sala_index,
                     ),
+                    prepare=True,
                 )
 
                 for machine_index, machine in enumerate(sala.get("maquinas", [])):
@@ -566,6 +682,7 @@ class ObraRepository:
                             ),
                             machine_index,
                         ),
+                        prepare=True,
                     )
 
     def _delete_nested_item(self, obra, path_parts):
@@ -634,8 +751,9 @@ class ObraRepository:
         return {
             "id": str(row["id"]),
             "nome": row.get("nome"),
-            "empresaSigla": row.get("empresa_codigo"),
-            "empresaNome": row.get("empresa_nome"),
+            # empresa_codigo fica NULL quando as empresas sao regravadas; o raw_json nao.
+            "empresaSigla": row.get("empresa_codigo") or raw_payload.get("empresaSigla"),
+            "empresaNome": row.get("empresa_nome") or raw_payload.get("empresaNome"),
             "empresa_id": row.get("empresa_id"),
             "numeroClienteFinal": row.get("numero_cliente_final"),
             "idGerado": raw_payload.get("idGerado"),
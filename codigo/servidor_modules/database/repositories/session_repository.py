@@ -0,0 +1,100 @@
+"""Repositorio das obras vinculadas a cada sessao (uma linha por obra)."""
+
+from __future__ import annotations
+
+from servidor_modules.database.storage import get_storage
+
+
+class SessionRepository:
+    def __init__(self, project_root):
+        self.storage = get_storage(project_root)
+        self.conn = self.storage.conn
+        self.project_root = self.storage.project_root
+        # Garante que listas legadas de sessions.payload_json ja foram migradas.
+        self.storage.ensure_bootstrap()
+
+    def add_obra(self, session_id, obra_id):
+        """Vincula a obra ao fim da sessao; retorna False se ja estava vinculada."""
+        cursor = self.conn.execute(
+            """
+            INSERT INTO session_obras(session_id, obra_id, position)
+            SELECT ?, ?, COALESCE(MAX(position), 0) + 1
+            FROM session_obras
+            WHERE session_id = ?
+            ON CONFLICT(session_id, obra_id) DO NOTHING
+            """,
+            (str(session_id), str(obra_id), str(session_id)),
+        )
+        self.conn.commit()
+        return cursor.rowcount > 0
+
+    def remove_obra(self, session_id, obra_id):
+        """Desvincula a obra da sessao; retorna False se ela nao estava vinculada."""
+        cursor = self.conn.execute(
+            "DELETE FROM session_obras WHERE session_id = ? AND obra_id = ?",
+            (str(session_id), str(obra_id)),
+        )
+        self.conn.commit()
+        return cursor.rowcount > 0
+
+    def contains(self, session_id, obra_id):
+        row = self.conn.execute(
+            """
+            SELECT EXISTS(
+                SELECT 1 FROM session_obras WHERE session_id = ? AND obra_id = ?
+            ) AS has_obra
+            """,
+            (str(session_id), str(obra_id)),
+        ).fetchone()
+        return bool(row and row["has_obra"])
+
+    def list_obra_ids(self, session_id):
+        rows = self.conn.execute(
+            """
+            SELECT obra_id
+            FROM session_obras
+            WHERE session_id = ?
+            ORDER BY position, obra_id
+            """,
+            (str(session_id),),
+        ).fetchall()
+        return [str(row["obra_id"]) for row in rows]
+
+    def clear(self, session_id=None):
+        """Remove os vinculos de uma sessao ou, sem ``session_id``, de todas."""
+        if session_id is None:
+            cursor = self.conn.execute("DELETE FROM session_obras")
+        else:
+            cursor = self.conn.execute(
+                "DELETE FROM session_obras WHERE session_id = ?",
+                (str(session_id),),
+            )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def keep_only(self, session_id):
+        """Descarta todas as sessoes diferentes de ``session_id``."""
+        cursor = self.conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute(
+                "DELETE FROM session_obras WHERE session_id <> ?",
+                (str(session_id),),
+            )
+            cursor.execute(
+                "DELETE FROM sessions WHERE session_id <> ?",
+                (str(session_id),),
+            )
+            cursor.execute(
+                """
+                INSERT INTO sessions(session_id, payload_json)
+                VALUES(?, '{}')
+                ON CONFLICT(session_id) DO NOTHING
+                """,
+                (str(session_id),),
+            )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return True
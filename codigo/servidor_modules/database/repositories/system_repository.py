@@ -5,6 +5,7 @@ from __future__ import annotations
 import json
 
 from servidor_modules.database.connection import execute_maintenance_statements
+from servidor_modules.database.repositories.change_log_repository import ChangeLogRepository
 from servidor_modules.database.storage import get_storage
 
 
@@ -246,10 +247,14 @@ class SystemRepository:
                         else None,
                     ),
                 )
+            ChangeLogRepository.record_catalog_sections(
+                cursor, {"constants": normalized_constants}
+            )
             self.conn.commit()
         except Exception:
             self.conn.rollback()
             raise
+        self.storage.bump_catalog_version()
         return normalized_constants
 
     def get_materials(self):
@@ -363,10 +368,14 @@ class SystemRepository:
                         index,
                     ),
                 )
+            ChangeLogRepository.record_catalog_sections(
+                cursor, {"materials": materials}
+            )
             self.conn.commit()
         except Exception:
             self.conn.rollback()
             raise
+        self.storage.bump_catalog_version()
         return materials
 
     def save_acessorios(self, acessorios):
@@ -387,10 +396,14 @@ class SystemRepository:
                         index,
                     ),
                 )
+            ChangeLogRepository.record_catalog_sections(
+                cursor, {"banco_acessorios": acessorios}
+            )
             self.conn.commit()
         except Exception:
             self.conn.rollback()
             raise
+        self.storage.bump_catalog_version()
         return acessorios
 
     def save_dutos(self, dutos):
@@ -413,10 +426,14 @@ class SystemRepository:
                         index,
                     ),
                 )
+            ChangeLogRepository.record_catalog_sections(
+                cursor, {"dutos": dutos}
+            )
             self.conn.commit()
         except Exception:
             self.conn.rollback()
             raise
+        self.storage.bump_catalog_version()
         return dutos
 
     def save_tubos(self, tubos):
@@ -440,8 +457,12 @@ class SystemRepository:
                         index,
                     ),
                 )
+            ChangeLogRepository.record_catalog_sections(
+                cursor, {"tubos": tubos}
+            )
             self.conn.commit()
         except Exception:
             self.conn.rollback()
             raise
+        self.storage.bump_catalog_version()
         return tubos
@@ -6,6 +6,7 @@ import json
 import os
 import threading
 from copy import deepcopy
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 from servidor_modules.database.connection import (
@@ -41,6 +42,64 @@ def normalize_numero_cliente_atual(value):
     return max(numero, 0)
 
 
+def _parse_credential_datetime(value):
+    if not value or not isinstance(value, str):
+        return None
+
+    normalized_value = value.strip()
+    if normalized_value.endswith("Z"):
+        normalized_value = normalized_value[:-1] + "+00:00"
+
+    try:
+        parsed_date = datetime.fromisoformat(normalized_value)
+    except ValueError:
+        return None
+
+    if parsed_date.tzinfo is None:
+        parsed_date = parsed_date.replace(tzinfo=timezone.utc)
+
+    return parsed_date.astimezone(timezone.utc)
+
+
+def credential_expires_at(credenciais):
+    """Data de expiracao (UTC) das credenciais, gravada em empresas.credenciais_expires_at."""
+    if not isinstance(credenciais, dict):
+        return None
+
+    explicit_expiration = _parse_credential_datetime(
+        credenciais.get("data_expiracao")
+        or credenciais.get("expiracao")
+        or credenciais.get("expiraEm")
+        or credenciais.get("expiresAt")
+        or credenciais.get("expiration")
+    )
+    if explicit_expiration:
+        return explicit_expiration
+
+    created_at = _parse_credential_datetime(
+        credenciais.get("data_criacao") or credenciais.get("createdAt")
+    )
+    if not created_at:
+        return None
+
+    try:
+        tempo_uso = int(
+            credenciais.get("tempoUso")
+            or credenciais.get("validadeDias")
+            or credenciais.get("validade")
+        )
+    except (TypeError, ValueError):
+        return None
+
+    if tempo_uso < 0:
+        return None
+
+    try:
+        return created_at + timedelta(days=tempo_uso)
+    except OverflowError:
+        return None
+
+
 def normalize_empresa(empresa):
     if not isinstance(empresa, dict):
         return None
@@ -137,6 +196,7 @@ class DatabaseStorage:
         self.conn = get_connection(self.project_root)
         self._lock = threading.RLock()
         self._bootstrapped = False
+        self._catalog_version = 0
         self._mirror_to_disk = (
             str(os.environ.get("ESI_WRITE_JSON_SNAPSHOTS", "")).strip().lower()
             in {"1", "true", "yes", "on"}
@@ -148,6 +208,16 @@ class DatabaseStorage:
             conn=self.conn,
         )
 
+    @property
+    def catalog_version(self):
+        """Versao em memoria do catalogo; muda a cada escrita confirmada nele."""
+        return self._catalog_version
+
+    def bump_catalog_version(self):
+        with self._lock:
+            self._catalog_version += 1
+            return self._catalog_version
+
     def default_document(self, name):
         return deepcopy(DEFAULT_DOCUMENTS.get(name, {}))
 
@@ -164,8 +234,40 @@ class DatabaseStorage:
 
                 self._save_document_internal(name, payload, mirror_to_disk=self._mirror_to_disk)
 
+            self._migrate_legacy_session_obras()
             self._bootstrapped = True
 
+    def _migrate_legacy_session_obras(self):
+        """Move listas ``obras`` antigas de ``sessions.payload_json`` para ``session_obras``."""
+        rows = self.conn.execute(
+            "SELECT session_id, payload_json FROM sessions ORDER BY session_id"
+        ).fetchall()
+        legacy = {}
+        for row in rows:
+            try:
+                session_payload = json.loads(row.get("payload_json") or "{}")
+            except Exception:
+                continue
+            if isinstance(session_payload, dict) and "obras" in session_payload:
+                legacy[str(row["session_id"])] = session_payload
+        if not legacy:
+            return
+
+        cursor = self.conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            for session_id, session_payload in legacy.items():
+                self._insert_session_obras(cursor, session_id, session_payload.pop("obras"))
+                cursor.execute(
+                    "UPDATE sessions SET payload_json = ? WHERE session_id = ?",
+                    (json.dumps(session_payload, ensure_ascii=False), session_id),
+                )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        print(f" Sessoes migradas para session_obras: {len(legacy)}")
+
     def load_document(self, name, default_payload=None):
         self.ensure_bootstrap()
         if name == "dados.json":
@@ -247,7 +349,16 @@ class DatabaseStorage:
             cursor.execute("BEGIN")
             try:
                 if name == "dados.json":
+                    from servidor_modules.database.repositories.change_log_repository import (
+                        CATALOG_SECTIONS,
+                        ChangeLogRepository,
+                    )
+
                     self._sync_dados(cursor, payload)
+                    ChangeLogRepository.record_catalog_sections(
+                        cursor,
+                        {section: payload.get(section) for section in CATALOG_SECTIONS},
+                    )
                 elif name == "sessions.json":
                     self._sync_sessions(cursor, payload)
 
@@ -256,6 +367,9 @@ class DatabaseStorage:
                 self.conn.rollback()
                 raise
 
+            if name == "dados.json":
+                self.bump_catalog_version()
+
         if mirror_to_disk:
             self._write_snapshot(name, payload)
 
@@ -306,6 +420,20 @@ class DatabaseStorage:
             except Exception:
                 sessions[str(row["session_id"])] = {}
 
+        membership_rows = self.conn.execute(
+            """
+            SELECT session_id, obra_id
+            FROM session_obras
+            ORDER BY session_id, position, obra_id
+            """
+        ).fetchall()
+        for session_payload in sessions.values():
+            session_payload["obras"] = []
+        for row in membership_rows:
+            sessions.setdefault(str(row["session_id"]), {"obras": []})["obras"].append(
+                str(row["obra_id"])
+            )
+
         payload["sessions"] = sessions
         return normalize_sessions_payload(payload)
 
@@ -421,9 +549,9 @@ class DatabaseStorage:
                 cursor.execute(
                     """
                     INSERT INTO empresas(
-                        codigo, nome, ultimo_numero_cliente, credenciais_json, raw_json, sort_order
+                        codigo, nome, ultimo_numero_cliente, credenciais_json, credenciais_expires_at, raw_json, sort_order
                     )
-                    VALUES(?, ?, ?, ?, ?, ?)
+                    VALUES(?, ?, ?, ?, ?, ?, ?)
                     """,
                     (
                         str(empresa_normalizada.get("codigo", "")).strip(),
@@ -436,6 +564,7 @@ class DatabaseStorage:
                         )
                         if empresa_normalizada.get("credenciais") is not None
                         else None,
+                        credential_expires_at(empresa_normalizada.get("credenciais")),
                         json.dumps(empresa_normalizada, ensure_ascii=False),
                         index,
                     ),
@@ -444,9 +573,9 @@ class DatabaseStorage:
                 cursor.execute(
                     """
                     INSERT INTO empresas(
-                        codigo, nome, credenciais_json, raw_json, sort_order
+                        codigo, nome, credenciais_json, credenciais_expires_at, raw_json, sort_order
                     )
-                    VALUES(?, ?, ?, ?, ?)
+                    VALUES(?, ?, ?, ?, ?, ?)
                     """,
                     (
                         str(empresa_normalizada.get("codigo", "")).strip(),
@@ -456,6 +585,7 @@ class DatabaseStorage:
                         )
                         if empresa_normalizada.get("credenciais") is not None
                         else None,
+                        credential_expires_at(empresa_normalizada.get("credenciais")),
                         json.dumps(empresa_normalizada, ensure_ascii=False),
                         index,
                     ),
@@ -554,7 +684,10 @@ class DatabaseStorage:
 
     def _sync_sessions(self, cursor, payload):
         cursor.execute("DELETE FROM sessions")
+        cursor.execute("DELETE FROM session_obras")
         for session_id, session_payload in normalize_sessions_payload(payload).get("sessions", {}).items():
+            session_payload = dict(session_payload)
+            obras = session_payload.pop("obras", [])
             cursor.execute(
                 """
                 INSERT INTO sessions(session_id, payload_json)
@@ -565,6 +698,25 @@ class DatabaseStorage:
                     json.dumps(session_payload, ensure_ascii=False),
                 ),
             )
+            self._insert_session_obras(cursor, session_id, obras)
+
+    def _insert_session_obras(self, cursor, session_id, obras):
+        obra_ids = list(
+            dict.fromkeys(str(obra_id) for obra_id in obras or [] if str(obra_id).strip())
+        )
+        if not obra_ids:
+            return
+        cursor.executemany(
+            """
+            INSERT INTO session_obras(session_id, obra_id, position)
+            VALUES(?, ?, ?)
+            ON CONFLICT(session_id, obra_id) DO NOTHING
+            """,
+            [
+                (str(session_id), obra_id, position)
+                for position, obra_id in enumerate(obra_ids, start=1)
+            ],
+        )
 
 
 def get_storage(project_root):
@@ -7,6 +7,7 @@ import os
 import hashlib
 import shutil
 import tempfile
+import time
 import traceback
 import re
 from datetime import datetime
@@ -21,10 +22,10 @@ from docxtpl import DocxTemplate
 class WordPCGenerator:
     """Gerador específico para Proposta Comercial"""
     
-    def __init__(self, project_root: Path, file_utils):
+    def __init__(self, project_root: Path, file_utils, shared_data: Optional[Dict] = None):
         self.project_root = project_root
         self.file_utils = file_utils
-        self._json_cache = {}
+        self._json_cache = dict(shared_data or {})
         self._dados_cache = None
         self._backup_cache = None
 
@@ -509,9 +510,18 @@ class WordPCGenerator:
     # ----------------------------------------------------------------------
     # Geração do documento
     # ----------------------------------------------------------------------
-    def generate_proposta_comercial(self, obra_id: str, template_path: Path) -> Optional[str]:
+    @staticmethod
+    def _report_phase(phase_timer, phase: str, started_at: float) -> float:
+        """Informa ao phase_timer a duracao (ms) da fase e devolve o inicio da proxima."""
+        now = time.perf_counter()
+        if phase_timer is not None:
+            phase_timer(phase, (now - started_at) * 1000)
+        return now
+
+    def generate_proposta_comercial(self, obra_id: str, template_path: Path, phase_timer=None) -> Optional[str]:
         """
         Gera documento de Proposta Comercial.
+        phase_timer(fase, ms), se informado, recebe a duracao de "context", "render" e "post".
         """
         try:
 
@@ -521,18 +531,22 @@ class WordPCGenerator:
                 return None
 
             # Gerar contexto
+            phase_started_at = time.perf_counter()
             context = self.generate_context_for_pc(obra_id)
             if not context:
                 raise ValueError("Não foi possível gerar contexto para a PC")
+            phase_started_at = self._report_phase(phase_timer, "context", phase_started_at)
 
             # Carregar e renderizar template (uma única vez)
             doc = DocxTemplate(str(template_path))
             doc.render(context)
+            phase_started_at = self._report_phase(phase_timer, "render", phase_started_at)
 
             # Salvar em arquivo temporário
             with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp:
                 output_path = tmp.name
                 doc.save(output_path)
+            self._report_phase(phase_timer, "post", phase_started_at)
 
 
             print(f"✅ Proposta Comercial gerada: {output_path}")
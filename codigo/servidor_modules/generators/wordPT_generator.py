@@ -2,6 +2,7 @@
 
 import json
 import tempfile
+import time
 import traceback
 import zipfile
 from datetime import datetime
@@ -255,14 +256,14 @@ class TipoEquipamentoAggregate:
 class WordPTGenerator:
     """Gerador específico para Proposta Técnica (PT) - Versão que preserva margens"""
 
-    def __init__(self, project_root: Path, file_utils=None):
+    def __init__(self, project_root: Path, file_utils=None, shared_data: Optional[Dict] = None):
         self.project_root = project_root
         self.file_utils = file_utils
         self.opcoes_possiveis_por_tipo = {}
         self.tensoes_disponiveis = []
         
-        # Caches
-        self._json_cache = {}
+        # Caches (pre-carregados quando o lote compartilha um snapshot)
+        self._json_cache = dict(shared_data or {})
         self._context_cache = {}
         self._dados_cache = None
         self._backup_cache = None
@@ -751,10 +752,19 @@ class WordPTGenerator:
             traceback.print_exc()
             return {}
 
-    def generate_proposta_tecnica(self, obra_id: str, template_path: Path) -> Optional[str]:
+    @staticmethod
+    def _report_phase(phase_timer, phase: str, started_at: float) -> float:
+        """Informa ao phase_timer a duracao (ms) da fase e devolve o inicio da proxima."""
+        now = time.perf_counter()
+        if phase_timer is not None:
+            phase_timer(phase, (now - started_at) * 1000)
+        return now
+
+    def generate_proposta_tecnica(self, obra_id: str, template_path: Path, phase_timer=None) -> Optional[str]:
         """
         Gera o documento da Proposta Técnica.
         Versão que preserva as margens do template original.
+        phase_timer(fase, ms), se informado, recebe a duracao de "context", "render" e "post".
         """
         try:
             if not template_path.exists():
@@ -764,11 +774,13 @@ class WordPTGenerator:
             print(f"📄 Gerando PT para obra {obra_id} usando template {template_path.name}")
             
             # Gera contexto (usa cache)
+            phase_started_at = time.perf_counter()
             context = self.generate_context_for_pt(obra_id)
             
             if not context:
                 print("❌ Contexto vazio, não é possível gerar documento")
                 return None
+            phase_started_at = self._report_phase(phase_timer, "context", phase_started_at)
 
             # CRÍTICO: Preservar margens - usar cópia do template
             # Cria um arquivo temporário como cópia do template
@@ -783,11 +795,13 @@ class WordPTGenerator:
             doc = DocxTemplate(output_path)
             jinja_env = self._create_custom_jinja_env(template_path)
             doc.render(context, jinja_env=jinja_env)
+            phase_started_at = self._report_phase(phase_timer, "render", phase_started_at)
             
             # Salva (sobrescreve o arquivo)
             doc.save(output_path)
             self._sanitize_generated_docx(output_path)
             self._preserve_template_layout(template_path, output_path)
+            self._report_phase(phase_timer, "post", phase_started_at)
 
             print(f"✅ Proposta Técnica gerada: {output_path}")
             return output_path
@@ -7,9 +7,10 @@ Manipulacao de empresas no dados.json
 
 import os
 import json
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
 from servidor_modules.database.repositories.empresa_repository import EmpresaRepository
+from servidor_modules.database.storage import credential_expires_at
 
 
 class EmpresaHandler:
@@ -94,57 +95,8 @@ class EmpresaHandler:
             "nome": empresa_normalizada.get("nome", ""),
         }
 
-    def _parse_datetime(self, value):
-        if not value or not isinstance(value, str):
-            return None
-
-        normalized_value = value.strip()
-        if normalized_value.endswith("Z"):
-            normalized_value = normalized_value[:-1] + "+00:00"
-
-        try:
-            parsed_date = datetime.fromisoformat(normalized_value)
-        except ValueError:
-            return None
-
-        if parsed_date.tzinfo is None:
-            parsed_date = parsed_date.replace(tzinfo=timezone.utc)
-
-        return parsed_date.astimezone(timezone.utc)
-
     def calcular_data_expiracao_credenciais(self, credenciais):
-        if not isinstance(credenciais, dict):
-            return None
-
-        explicit_expiration = self._parse_datetime(
-            credenciais.get("data_expiracao")
-            or credenciais.get("expiracao")
-            or credenciais.get("expiraEm")
-            or credenciais.get("expiresAt")
-            or credenciais.get("expiration")
-        )
-        if explicit_expiration:
-            return explicit_expiration
-
-        created_at = self._parse_datetime(
-            credenciais.get("data_criacao") or credenciais.get("createdAt")
-        )
-        if not created_at:
-            return None
-
-        try:
-            tempo_uso = int(
-                credenciais.get("tempoUso")
-                or credenciais.get("validadeDias")
-                or credenciais.get("validade")
-            )
-        except (TypeError, ValueError):
-            return None
-
-        if tempo_uso < 0:
-            return None
-
-        return created_at + timedelta(days=tempo_uso)
+        return credential_expires_at(credenciais)
 
     def credenciais_expiradas(self, credenciais, reference_time=None):
         if not isinstance(credenciais, dict):
@@ -157,60 +109,12 @@ class EmpresaHandler:
         now = reference_time or datetime.now(timezone.utc)
         return now >= expiration_date
 
-    def limpar_credenciais_expiradas(self, dados, persist=False, dados_file=None):
-        if not isinstance(dados, dict):
-            return dados, False, []
-
-        empresas = dados.get("empresas", [])
-        if not isinstance(empresas, list):
-            return dados, False, []
-
-        changed = False
-        empresas_expiradas = []
-        empresas_atualizadas = []
-        now = datetime.now(timezone.utc)
-
-        for empresa in empresas:
-            if not isinstance(empresa, dict):
-                empresas_atualizadas.append(empresa)
-                continue
-
-            empresa_atualizada = dict(empresa)
-            credenciais = empresa_atualizada.get("credenciais")
-
-            if self.credenciais_expiradas(credenciais, reference_time=now):
-                empresa_normalizada = self.normalizar_empresa(empresa_atualizada) or {}
-                empresas_expiradas.append(empresa_normalizada.get("codigo", "SEM_CODIGO"))
-                empresa_atualizada["credenciais"] = None
-                changed = True
-
-            empresas_atualizadas.append(empresa_atualizada)
-
-        if not changed:
-            return dados, False, []
-
-        dados_atualizados = dict(dados)
-        dados_atualizados["empresas"] = empresas_atualizadas
-
-        if persist and dados_file is not None:
-            self.file_utils.save_json_file(dados_file, dados_atualizados)
-
-        if empresas_expiradas:
-            print(
-                f"Credenciais expiradas removidas automaticamente: {', '.join(empresas_expiradas)}"
-            )
-
-        return dados_atualizados, True, empresas_expiradas
-
     def carregar_dados_empresas_atualizados(self):
         dados_file = self.file_utils.find_json_file("dados.json")
+        # Credenciais vencidas sao removidas pela limpeza periodica
+        # (utils/credential_expiry.py), nao a cada leitura.
         dados = self.file_utils.load_json_file(dados_file, {"empresas": []})
-        dados_atualizados, _, _ = self.limpar_credenciais_expiradas(
-            dados,
-            persist=True,
-            dados_file=dados_file,
-        )
-        return dados_file, dados_atualizados
+        return dados_file, dados
 
     def _carregar_empresas_do_banco(self):
         try:
@@ -279,31 +183,12 @@ class EmpresaHandler:
             print(f"Erro ao adicionar empresa: {e}")
             return False, f"Erro interno: {str(e)}"
 
-    def buscar_empresa_por_termo(self, termo):
-        """Busca empresas por sigla, primeiro nome ou substring."""
+    def buscar_empresa_por_termo(self, termo, limit=None):
+        """Busca empresas por sigla, prefixo ou substring (consulta ranqueada no banco)."""
         try:
-            empresas = self.obter_empresas()
-            termo = termo.upper().strip()
-
-            resultados = []
-
-            for empresa in empresas:
-                sigla = empresa.get("codigo", "")
-                nome = empresa.get("nome", "")
-                if not sigla:
-                    continue
-
-                nome_upper = nome.upper()
-                primeiro_nome = nome.split(" ")[0].upper() if nome else ""
-
-                if sigla == termo:
-                    resultados.append(empresa)
-                elif primeiro_nome.startswith(termo):
-                    resultados.append(empresa)
-                elif termo in nome_upper:
-                    resultados.append(empresa)
-
-            return resultados
+            return self.normalizar_empresas(
+                self.empresa_repository.search(termo, limit=limit)
+            )
 
         except Exception as e:
             print(f"Erro ao buscar empresas: {e}")
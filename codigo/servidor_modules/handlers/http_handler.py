@@ -9,7 +9,10 @@ import os
 import gzip
 import threading
 import re
-import tempfile
+import hmac
+import hashlib
+import shutil
+import uuid
 
 
 
@@ -17,7 +20,34 @@ import tempfile
 from servidor_modules.utils.file_utils import FileUtils
 from servidor_modules.utils.security_utils import SessionSecurity
 from servidor_modules.utils.background_jobs import background_jobs
-from servidor_modules.database.connection import release_thread_connection
+from servidor_modules.utils.catalog_search import catalog_search_index
+from servidor_modules.utils.client_projection_cache import client_projection_cache
+from servidor_modules.utils.download_registry import download_registry
+from servidor_modules.utils.page_cache import page_cache
+from servidor_modules.utils.system_diff import system_diff_index
+from servidor_modules.utils.metrics import (
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_requests_total,
+    metrics_registry,
+)
+from servidor_modules.utils.profiler import request_profiler
+from servidor_modules.utils.memory_diagnostics import memory_diagnostics
+from servidor_modules.database.connection import (
+    begin_query_tracking,
+    collect_database_metrics,
+    end_query_tracking,
+    get_cache_stats,
+    get_query_tracking,
+    release_thread_connection,
+)
+from servidor_modules.database.repositories.change_log_repository import (
+    ENTITY_CATALOG,
+    OPERATION_DELETE,
+)
+
+metrics_registry.register_collector(collect_database_metrics)
+memory_diagnostics.register_cache_size("database", get_cache_stats)
 
 
 class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
@@ -108,6 +138,24 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         "valor",
         "value",
     }
+    # GETs revalidaveis por ETag e a versao que define o conteudo de cada um:
+    # "catalog" muda com escritas no catalogo; "data" com qualquer escrita no banco.
+    ETAG_API_ROUTES = {
+        "/api/runtime/bootstrap": "data",
+        "/api/runtime/system-bootstrap": "catalog",
+        "/api/obras/catalog": "data",
+        "/api/acessorios": "catalog",
+        "/api/dutos": "catalog",
+        "/api/tubos": "catalog",
+    }
+    # Para admins estas rotas tambem levam ADM, administradores e empresas, gravados
+    # fora do catalogo: o ETag passa a seguir qualquer escrita no banco.
+    ETAG_ADMIN_DATA_ROUTES = {"/api/runtime/system-bootstrap"}
+    # Os contadores de versao recomecam a cada processo; o prefixo evita
+    # reaproveitar ETags emitidos antes de um restart.
+    ETAG_EPOCH = uuid.uuid4().hex[:8]
+    _response_etag = None
+    _revalidate_only = False
     PAGE_ACCESS_ROLES = {
         "/login": None,
         "/obras/create": {"client", "admin"},
@@ -124,6 +172,7 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     AUTHENTICATED_API_ROUTES = {
         "/obras",
         "/api/obras/catalog",
+        "/api/changes",
         "/api/backup-completo",
         "/api/runtime/bootstrap",
         "/api/runtime/system-bootstrap",
@@ -160,6 +209,16 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         "/api/system/database-size/vacuum-obras",
         "/api/system/storage-status",
         "/api/system/storage-status/reorganize",
+        "/api/system/downloads",
+        "/api/system/database-pool",
+        "/metrics",
+        "/api/system/profiler",
+        "/api/system/profiler/stop",
+        "/api/system/profiler/download",
+        "/api/system/memory",
+        "/api/system/memory/tracemalloc",
+        "/api/system/memory/snapshot",
+        "/api/system/memory/diff",
         "/system/database-size",
         "/system/database-size/tables",
         "/system/storage-status",
@@ -181,6 +240,7 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         "/api/reload-page",
         "/api/admin/email-config",
         "/api/export",
+        "/api/export/batch",
         "/api/shutdown",
         "/api/delete",
         "/api/system/apply-json",
@@ -211,6 +271,28 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         "/api/tubos/delete",
     )
 
+    CATALOG_SEARCH_DEFAULT_LIMIT = int(
+        os.environ.get("ESI_CATALOG_SEARCH_LIMIT", "50") or 50
+    )
+    CATALOG_SEARCH_MAX_LIMIT = 500
+
+    CHANGES_DEFAULT_LIMIT = 500
+    CHANGES_MAX_LIMIT = 2000
+
+    JOB_STREAM_MAX_IDS = 20
+    JOB_STREAM_HEARTBEAT_SECONDS = 15
+    JOB_STREAM_TIMEOUT_SECONDS = int(
+        os.environ.get("ESI_JOB_STREAM_TIMEOUT_SECONDS", "600") or 600
+    )
+
+    BATCH_EXPORT_MAX_OBRAS = int(os.environ.get("ESI_BATCH_EXPORT_MAX_OBRAS", "100") or 100)
+    BATCH_EXPORT_WORKERS = max(int(os.environ.get("ESI_BATCH_EXPORT_WORKERS", "2") or 2), 1)
+
+    METRICS_TOKEN = str(os.environ.get("ESI_METRICS_TOKEN", "") or "").strip()
+
+    SLOW_REQUEST_DB_MS = float(os.environ.get("ESI_SLOW_REQUEST_DB_MS", "500") or 500)
+    REQUEST_QUERY_WARN = int(os.environ.get("ESI_REQUEST_QUERY_WARN", "50") or 50)
+
     # Roteamento direto para máxima velocidade
     API_ROUTES = {
         # ROTAS EXISTENTES DO SISTEMA
@@ -244,6 +326,13 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         "/system/database-size": "handle_get_database_usage",
         "/system/database-size/tables": "handle_get_database_table_usage",
         "/system/storage-status": "handle_get_storage_status",
+        "/api/system/downloads": "handle_get_download_registry_status",
+        "/api/system/database-pool": "handle_get_database_pool_status",
+        "/metrics": "handle_get_metrics",
+        "/api/system/profiler": "handle_get_profiler_status",
+        "/api/system/profiler/download": "handle_get_profiler_download",
+        "/api/system/memory": "handle_get_memory_status",
+        "/api/system/memory/diff": "handle_get_memory_diff",
         "/api/constants": "handle_get_constants_json",
         "/api/materials": "handle_get_materials",
         "/api/empresas/all": "handle_get_all_empresas",
@@ -295,6 +384,39 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         "/api/word/download": "handle_download_word",
     }
 
+    # Rotas tratadas direto em do_GET/do_POST, fora das tabelas acima.
+    METRICS_EXTRA_ROUTES = {
+        "/",
+        "/api/jobs/status",
+        "/api/jobs/stream",
+        "/api/obra/notificar",
+        "/api/acessorios/add",
+        "/api/acessorios/update",
+        "/api/acessorios/delete",
+        "/api/dutos/add",
+        "/api/dutos/update",
+        "/api/dutos/delete",
+        "/api/tubos/add",
+        "/api/tubos/update",
+        "/api/tubos/delete",
+    }
+    # Prefixos das rotas com parametro no caminho -> label da metrica.
+    METRICS_ROUTE_TEMPLATES = (
+        ("/api/dados/empresas/buscar/", "/api/dados/empresas/buscar/:termo"),
+        ("/api/dados/empresas/numero/", "/api/dados/empresas/numero/:sigla"),
+        ("/api/machines/type/", "/api/machines/type/:tipo"),
+        ("/api/acessorios/type/", "/api/acessorios/type/:tipo"),
+        ("/api/acessorios/search", "/api/acessorios/search"),
+        ("/api/dutos/type/", "/api/dutos/type/:tipo"),
+        ("/api/dutos/search", "/api/dutos/search"),
+        ("/api/tubos/polegada/", "/api/tubos/polegada/:polegada"),
+        ("/api/tubos/search", "/api/tubos/search"),
+        ("/api/empresas/", "/api/empresas/:indice"),
+        ("/api/sessions/remove-obra/", "/api/sessions/remove-obra/:id"),
+        ("/obras/", "/obras/:id"),
+    )
+    _metrics_known_routes = None
+
     PAGE_ROUTES = {
         "/login": "public/pages/login/index.html",
         "/obras/create": "public/pages/obras/create.html",
@@ -337,6 +459,109 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         finally:
             release_thread_connection(self.project_root)
 
+    def handle_one_request(self):
+        begin_query_tracking()
+        self._metrics_status = None
+        self._metrics_started_at = None
+        self._profile_run = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self._profile_run is not None:
+                self._profile_run.stop()
+                self._profile_run = None
+            self._log_request_query_stats(end_query_tracking())
+            self._record_request_metrics()
+
+    def parse_request(self):
+        parsed = super().parse_request()
+        query_stats = get_query_tracking()
+        if parsed and query_stats is not None:
+            query_stats["label"] = f"{self.command} {self.path}"
+        if parsed:
+            self._metrics_started_at = time.perf_counter()
+            http_requests_in_flight.inc()
+            self._start_request_profile()
+        return parsed
+
+    def _start_request_profile(self):
+        """Perfila a requisicao se houver alvo armado ou header X-ESI-Profile de admin."""
+        target = request_profiler.claim("request", urlparse(self.path).path)
+        if target is None:
+            requested_mode = str(self.headers.get("X-ESI-Profile") or "").strip()
+            if not requested_mode:
+                return
+            session = self.get_auth_session()
+            if not session or session.get("role") != "admin":
+                return
+            target = request_profiler.adhoc_target(requested_mode)
+
+        self._profile_run = request_profiler.start(target, f"{self.command} {self.path}")
+
+    def send_response(self, code, message=None):
+        self._metrics_status = code
+        super().send_response(code, message)
+
+    def _record_request_metrics(self):
+        if self._metrics_started_at is None:
+            return
+
+        http_requests_in_flight.dec()
+        route = self._metrics_route_label()
+        http_request_duration_seconds.observe(
+            time.perf_counter() - self._metrics_started_at, self.command, route
+        )
+        http_requests_total.inc(self.command, route, self._metrics_status or 0)
+        self._metrics_started_at = None
+
+    def _metrics_route_label(self):
+        """Rota conhecida, modelo da rota com parametro, "static" ou "unmatched".
+
+        Caminhos livres (termos de busca, ids, varreduras) nunca viram serie propria,
+        para nao esgotar ``MAX_SERIES_PER_METRIC``.
+        """
+        path = urlparse(self.path).path
+        if path.startswith("/codigo/"):
+            path = path[7:]
+        cls = type(self)
+        if cls._metrics_known_routes is None:
+            cls._metrics_known_routes = frozenset().union(
+                self.API_ROUTES,
+                self.PAGE_ROUTES,
+                self.PAGE_ACCESS_ROLES,
+                self.PUBLIC_API_ROUTES,
+                self.AUTHENTICATED_API_ROUTES,
+                self.ADMIN_ONLY_API_ROUTES,
+                self.ETAG_API_ROUTES,
+                self.METRICS_EXTRA_ROUTES,
+            )
+        if path in cls._metrics_known_routes:
+            return path
+        for prefix, template in self.METRICS_ROUTE_TEMPLATES:
+            if path.startswith(prefix):
+                return template
+        if path.startswith("/public/") or any(
+            marker in path for marker in self.SILENT_PATHS
+        ):
+            return "static"
+        return "unmatched"
+
+    def _log_request_query_stats(self, stats):
+        """Registra requisicoes com muitas consultas ou tempo alto no banco."""
+        if not stats or not stats["queries"]:
+            return
+        if stats["db_ms"] < self.SLOW_REQUEST_DB_MS and stats["queries"] < self.REQUEST_QUERY_WARN:
+            return
+
+        label = stats["label"] or "-"
+        statement, repeats = max(stats["statements"].items(), key=lambda item: item[1])
+        print(
+            f" Requisicao pesada no banco: {label} - {stats['queries']} consulta(s), "
+            f"{stats['db_ms']:.0f} ms, {stats['rows']} linha(s)"
+        )
+        if repeats > 1:
+            print(f"   - Consulta mais repetida ({repeats}x): {' '.join(statement.split())[:300]}")
+
     @property
     def routes_core(self):
         """Inicialização preguiçosa do RoutesCore"""
@@ -437,6 +662,15 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
 
         return host
 
+    def _has_valid_metrics_token(self):
+        """Permite coleta pelo Prometheus com Authorization: Bearer ESI_METRICS_TOKEN."""
+        if not self.METRICS_TOKEN:
+            return False
+        authorization = str(self.headers.get("Authorization") or "").strip()
+        if not authorization.lower().startswith("bearer "):
+            return False
+        return hmac.compare_digest(authorization[7:].strip(), self.METRICS_TOKEN)
+
     def _is_local_request(self):
         request_host = self._get_request_host()
         # CONFIGURA A PORTA HOST PARA O USER(ADM)
@@ -533,6 +767,50 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             if isinstance(obra, dict) and self._matches_empresa_context(obra, session)
         ]
 
+    def _load_obras_for_session(self, session=None, catalog=False):
+        """Obras visiveis para a sessao; clientes consultam apenas a propria empresa."""
+        session = session or self.get_auth_session()
+        if not session:
+            return []
+
+        obra_repository = self.routes_core.obra_repository
+        if session.get("role") == "admin":
+            return obra_repository.get_catalog() if catalog else obra_repository.get_all()
+
+        if catalog:
+            # O escopo SQL le as mesmas chaves de _matches_empresa_context no raw_json;
+            # a entrada de catalogo nao as carrega, entao nao passa pelo filtro fino.
+            return obra_repository.get_catalog_by_empresa(
+                session.get("empresaCodigo"), session.get("empresaNome")
+            )
+        return self._filter_obras_for_session(
+            obra_repository.get_by_empresa(
+                session.get("empresaCodigo"), session.get("empresaNome")
+            ),
+            session,
+        )
+
+    def _load_client_obra_views(self, session=None):
+        """Obras da empresa do cliente ja sanitizadas, refeitas apenas quando a obra muda."""
+        session = session or self.get_auth_session()
+        if not session:
+            return []
+
+        rows = self.routes_core.obra_repository.get_raw_by_empresa(
+            session.get("empresaCodigo"), session.get("empresaNome")
+        )
+        views = [
+            client_projection_cache.get_obra_view(
+                row["id"], row["raw_json"], self._build_client_obra_view
+            )
+            for row in rows
+        ]
+        # Os campos de empresa nao sao sensiveis, entao o filtro fino roda sobre as visoes.
+        return self._filter_obras_for_session(views, session)
+
+    def _build_client_obra_view(self, raw_json):
+        return self._sanitize_obra_for_client(json.loads(raw_json))
+
     def _sanitize_obra_for_client(self, payload):
         if isinstance(payload, list):
             return [self._sanitize_obra_for_client(item) for item in payload]
@@ -782,6 +1060,9 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         return True
 
     def _authorize_request(self, path):
+        if path == "/metrics" and self._has_valid_metrics_token():
+            return True
+
         if path in self.PAGE_ACCESS_ROLES:
             return self._require_roles(path, self.PAGE_ACCESS_ROLES[path])
 
@@ -805,25 +1086,18 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
 
     def _build_runtime_bootstrap_payload(self):
         session = self.get_auth_session() or {}
-        all_catalog = self.routes_core.obra_repository.get_catalog()
-        allowed_catalog = self._filter_obras_for_session(all_catalog, session)
 
         if session.get("role") == "admin":
             session_obras = self.routes_core.handle_get_session_obras()
             obras_sessao = self.routes_core.handle_get_obras()
             empresas = self.routes_core.empresa_handler.obter_empresas_publicas()
-            obra_catalog = {"obras": all_catalog}
+            obra_catalog = {"obras": self.routes_core.obra_repository.get_catalog()}
         else:
             empresa_publica = {
                 "codigo": session.get("empresaCodigo", ""),
                 "nome": session.get("empresaNome", ""),
             }
-            obras_cliente = self._sanitize_obras_for_client(
-                self._filter_obras_for_session(
-                    self.routes_core.obra_repository.get_all(),
-                    session,
-                )
-            )
+            obras_cliente = self._load_client_obra_views(session)
             empresas = [empresa_publica] if empresa_publica["codigo"] else []
             session_obras = {
                 "session_id": self.routes_core.sessions_manager.get_current_session_id(),
@@ -868,25 +1142,68 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
 
         return base_payload
 
+    def _get_client_system_projection(self):
+        """Catalogo sanitizado do cliente (payload e JSON), refeito apenas por versao."""
+        storage = self.routes_core.system_repository.storage
+        return client_projection_cache.get_catalog(
+            storage.catalog_version,
+            lambda: self._build_system_bootstrap_payload(
+                include_admin_sections=False,
+                sanitize_for_client=True,
+            ),
+        )
+
     def _serialize_script_payload(self, payload):
         return json.dumps(payload, ensure_ascii=False).replace("</", "<\\/")
 
-    def _build_page_context_script(self, route_path):
-        script_parts = []
+    def _page_fragment_key(self, route_path, session):
+        if route_path in {"/obras/create", "/admin/obras/create", "/admin/obras/embed"}:
+            group = "obras"
+        elif route_path == "/admin/data":
+            group = "admin_data"
+        else:
+            return None
+
+        session = session or {}
+        role = session.get("role") or ""
+        if role == "admin":
+            return (group, role, "", "")
+        # Clientes enxergam apenas a propria empresa (codigo e nome usados no filtro).
+        return (
+            group,
+            role,
+            self._normalize_text(session.get("empresaCodigo")),
+            self._normalize_text(session.get("empresaNome")),
+        )
+
+    def _get_page_data_script(self, route_path):
+        """Trecho de bootstrap da pagina, reaproveitado por papel/empresa e versao dos dados."""
         session = self.get_auth_session()
+        key = self._page_fragment_key(route_path, session)
+        if key is None:
+            return b""
+        data_version = self.routes_core.obra_repository.conn.data_version
+        return page_cache.get_fragment(
+            key,
+            data_version,
+            lambda: self._build_page_data_script(route_path),
+        )
+
+    def _build_page_data_script(self, route_path):
+        script_parts = []
 
         if route_path in {"/obras/create", "/admin/obras/create", "/admin/obras/embed"}:
             runtime_payload = self._build_runtime_bootstrap_payload()
-            system_payload = self._build_system_bootstrap_payload(
-                include_admin_sections=False,
-                sanitize_for_client=not self._has_role("admin"),
-            )
+            if self._has_role("admin"):
+                system_script = self._serialize_script_payload(
+                    self._build_system_bootstrap_payload(include_admin_sections=False)
+                )
+            else:
+                system_script = self._get_client_system_projection()["script"]
             script_parts.append(
                 f"window.__RUNTIME_BOOTSTRAP__={self._serialize_script_payload(runtime_payload)};"
             )
-            script_parts.append(
-                f"window.__SYSTEM_BOOTSTRAP__={self._serialize_script_payload(system_payload)};"
-            )
+            script_parts.append(f"window.__SYSTEM_BOOTSTRAP__={system_script};")
 
         if route_path == "/admin/data":
             system_payload = self._build_system_bootstrap_payload(
@@ -896,6 +1213,16 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 f"window.__SYSTEM_BOOTSTRAP__={self._serialize_script_payload(system_payload)};"
             )
 
+        return "".join(script_parts)
+
+    def _build_page_context_script(self, route_path):
+        script_parts = []
+        session = self.get_auth_session()
+
+        data_script = self._get_page_data_script(route_path)
+        if data_script:
+            script_parts.append(data_script)
+
         if session:
             public_session = {
                 "role": session.get("role"),
@@ -905,13 +1232,13 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 "empresaEmail": self._resolve_company_email_from_session(session),
             }
             script_parts.append(
-                f"window.__AUTH_CONTEXT__={self._serialize_script_payload(public_session)};"
+                f"window.__AUTH_CONTEXT__={self._serialize_script_payload(public_session)};".encode("utf-8")
             )
 
         if not script_parts:
-            return ""
+            return b""
 
-        return "<script>" + "".join(script_parts) + "</script>"
+        return b"<script>" + b"".join(script_parts) + b"</script>"
 
     def _serve_html_page(self, route_path, target_file):
         file_path = Path(self.translate_path(f"/{target_file}"))
@@ -925,19 +1252,12 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 self.session_security.build_clear_cookie_header(),
             )
 
-        html_content = file_path.read_text(encoding="utf-8")
+        head, separator, tail = page_cache.get_shell(file_path)
         page_context_script = self._build_page_context_script(route_path)
         if page_context_script:
-            if "</head>" in html_content:
-                html_content = html_content.replace(
-                    "</head>",
-                    f"{page_context_script}\n</head>",
-                    1,
-                )
-            else:
-                html_content = page_context_script + html_content
-
-        response = html_content.encode("utf-8")
+            response = b"".join((head, page_context_script, separator, tail))
+        else:
+            response = head + tail
         self.send_response(200)
         self.send_header("Content-type", "text/html; charset=utf-8")
         self.send_header("Content-Length", str(len(response)))
@@ -953,36 +1273,126 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.send_json_response(self._build_runtime_bootstrap_payload())
 
     def handle_get_runtime_system_bootstrap(self):
+        if not self._has_role("admin"):
+            self.send_json_bytes(self._get_client_system_projection()["json_bytes"])
+            return
         self.send_json_response(
-            self._build_system_bootstrap_payload(
-                include_admin_sections=self._has_role("admin"),
-                sanitize_for_client=not self._has_role("admin"),
-            )
+            self._build_system_bootstrap_payload(include_admin_sections=True)
         )
 
     def handle_get_backup_completo_secure(self):
-        obras = self.routes_core.obra_repository.get_all()
-        obras_filtradas = self._filter_obras_for_session(obras)
         if self._has_role("admin"):
-            self.send_json_response({"obras": obras_filtradas})
+            self.send_json_response({"obras": self._load_obras_for_session()})
             return
-        self.send_json_response({"obras": self._sanitize_obras_for_client(obras_filtradas)})
+        self.send_json_response({"obras": self._load_client_obra_views()})
 
     def handle_get_obras_catalog_secure(self):
-        catalog = self.routes_core.obra_repository.get_catalog()
-        self.send_json_response({"obras": self._filter_obras_for_session(catalog)})
+        self.send_json_response({"obras": self._load_obras_for_session(catalog=True)})
 
-    def handle_get_obras_secure(self):
-        if self._has_role("admin"):
-            obras = self.routes_core.handle_get_obras()
-        else:
-            obras = self._filter_obras_for_session(
-                self.routes_core.obra_repository.get_all()
+    def handle_get_changes(self):
+        """GET /api/changes?since={versao}&limit={n} - Obras e secoes do catalogo alteradas desde a versao."""
+        query_params = parse_qs(urlparse(self.path).query)
+        try:
+            since = max(int(query_params.get("since", ["0"])[0] or 0), 0)
+            limit = int(
+                query_params.get("limit", [""])[0] or self.CHANGES_DEFAULT_LIMIT
+            )
+        except ValueError:
+            self.send_json_response(
+                {"success": False, "error": "Parametros since/limit invalidos."},
+                status=400,
+            )
+            return
+        limit = min(max(limit, 1), self.CHANGES_MAX_LIMIT)
+
+        session = self.get_auth_session() or {}
+        is_admin = session.get("role") == "admin"
+        change_log_repository = self.routes_core.change_log_repository
+        current_version = change_log_repository.get_current_version()
+        if since > current_version:
+            # Versao que este banco nunca emitiu (ex.: banco recriado): recarregar tudo.
+            self.send_json_response(
+                {
+                    "success": True,
+                    "reset": True,
+                    "since": since,
+                    "version": current_version,
+                    "has_more": False,
+                    "obras": {"upserted": [], "deleted": []},
+                    "catalog": {},
+                }
+            )
+            return
+
+        rows = change_log_repository.get_changes(since, limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        upserted = []
+        deleted = []
+        catalog_sections = []
+        for row in rows:
+            if row["entity"] == ENTITY_CATALOG:
+                catalog_sections.append(row["entity_id"])
+                continue
+
+            obra_id = str(row["entity_id"])
+            # Obra que saiu da empresa do cliente: para ele, vira exclusao.
+            left_session_empresa = any(
+                self._matches_empresa_context({"empresaCodigo": codigo}, session)
+                for codigo in row["previous_empresas"] or ()
+            ) or any(
+                self._matches_empresa_context({"empresaNome": nome}, session)
+                for nome in row["previous_empresa_nomes"] or ()
+            )
+            if row["operation"] == OPERATION_DELETE or row["raw_json"] is None:
+                if left_session_empresa or self._matches_empresa_context(
+                    {
+                        "empresaCodigo": row["empresa_codigo"],
+                        "empresaNome": row["empresa_nome"],
+                    },
+                    session,
+                ):
+                    deleted.append(obra_id)
+                continue
+
+            if is_admin:
+                upserted.append(json.loads(row["raw_json"]))
+                continue
+            view = client_projection_cache.get_obra_view(
+                obra_id, row["raw_json"], self._build_client_obra_view
             )
+            if self._matches_empresa_context(view, session):
+                upserted.append(view)
+            elif left_session_empresa:
+                deleted.append(obra_id)
+
+        catalog = {}
+        if catalog_sections:
+            source = (
+                self._build_system_bootstrap_payload()
+                if is_admin
+                else self._get_client_system_projection()["payload"]
+            )
+            catalog = {section: source.get(section) for section in catalog_sections}
+
+        self.send_json_response(
+            {
+                "success": True,
+                "reset": False,
+                "since": since,
+                "version": rows[-1]["version"] if rows else since,
+                "has_more": has_more,
+                "obras": {"upserted": upserted, "deleted": deleted},
+                "catalog": catalog,
+            }
+        )
+
+    def handle_get_obras_secure(self):
         if self._has_role("admin"):
-            self.send_json_response(obras)
+            self.send_json_response(self.routes_core.handle_get_obras())
             return
-        self.send_json_response(self._sanitize_obras_for_client(obras))
+        self.send_json_response(self._load_client_obra_views())
 
     def handle_get_obra_by_id_secure(self, obra_id):
         obra = self.routes_core.handle_get_obra_by_id(obra_id)
@@ -1057,7 +1467,7 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.route_handler.handle_get_session_obras(self)
             return
 
-        obras = self._filter_obras_for_session(self.routes_core.obra_repository.get_all())
+        obras = self._load_obras_for_session()
         self.send_json_response(
             {
                 "session_id": self.routes_core.sessions_manager.get_current_session_id(),
@@ -1130,6 +1540,10 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         if not self._authorize_request(path):
             return
 
+        self._response_etag = None
+        if path in self.ETAG_API_ROUTES and self._handle_conditional_get(path):
+            return
+
         if path == "/api/runtime/bootstrap":
             self.handle_get_runtime_bootstrap_secure()
             return
@@ -1142,6 +1556,10 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.handle_get_background_job_status()
             return
 
+        if path == "/api/jobs/stream":
+            self.handle_get_background_job_stream()
+            return
+
         if path == "/api/backup-completo":
             self.handle_get_backup_completo_secure()
             return
@@ -1150,6 +1568,10 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.handle_get_obras_catalog_secure()
             return
 
+        if path == "/api/changes":
+            self.handle_get_changes()
+            return
+
         if path in {"/session-obras", "/api/session-obras"}:
             self.handle_get_session_obras_secure()
             return
@@ -1287,6 +1709,26 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.handle_post_export()
             return
 
+        elif path == "/api/export/batch":
+            self.handle_post_export_batch()
+            return
+
+        elif path == "/api/system/profiler":
+            self.handle_post_profiler_arm()
+            return
+
+        elif path == "/api/system/profiler/stop":
+            self.handle_post_profiler_stop()
+            return
+
+        elif path == "/api/system/memory/tracemalloc":
+            self.handle_post_memory_tracemalloc()
+            return
+
+        elif path == "/api/system/memory/snapshot":
+            self.handle_post_memory_snapshot()
+            return
+
         elif path == "/api/obra/notificar":
             self.handle_post_obra_notificar()
             return
@@ -1988,7 +2430,7 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
 
     def handle_health_check(self):
         """Health check rápido"""
-        self.send_json_response({"status": "online", "timestamp": time.time()})
+        self.route_handler.handle_health_check(self)
 
     def handle_empresa_routes(self, path):
         """Rotas de empresa"""
@@ -2106,23 +2548,100 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             print(f" Erro em {path}: {e}")
             self.send_error(404, f"Recurso não encontrado: {path}")
 
+    def _build_api_etag(self, path):
+        version_kind = self.ETAG_API_ROUTES.get(path)
+        if version_kind is None:
+            return None
+
+        if path in self.ETAG_ADMIN_DATA_ROUTES and self._has_role("admin"):
+            version_kind = "data"
+
+        storage = self.routes_core.system_repository.storage
+        if version_kind == "catalog":
+            version = storage.catalog_version
+        else:
+            version = storage.conn.data_version
+
+        session = self.get_auth_session() or {}
+        scope = "|".join(
+            (
+                path,
+                str(session.get("role") or ""),
+                self._normalize_text(session.get("empresaCodigo")),
+                self._normalize_text(session.get("empresaNome")),
+            )
+        )
+        scope_hash = hashlib.blake2b(scope.encode("utf-8"), digest_size=8).hexdigest()
+        return f'"{self.ETAG_EPOCH}-{version_kind[0]}{version}-{scope_hash}"'
+
+    @staticmethod
+    def _etag_matches(if_none_match, etag):
+        if not if_none_match:
+            return False
+        candidates = [item.strip() for item in if_none_match.split(",")]
+        if "*" in candidates:
+            return True
+        return etag in {
+            candidate[2:] if candidate.startswith("W/") else candidate
+            for candidate in candidates
+        }
+
+    def _handle_conditional_get(self, path):
+        """Responde 304 se o ETag do navegador ainda vale; senao agenda o ETag da resposta.
+
+        A versao e lida antes de montar a resposta, entao uma escrita concorrente
+        no maximo gera um ETag antigo (e uma revalidacao extra), nunca um 304 errado.
+        """
+        etag = self._build_api_etag(path)
+        if etag is None:
+            return False
+
+        if self._etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "private, no-cache")
+            self.send_header("Vary", "Cookie")
+            self._revalidate_only = True
+            self.end_headers()
+            return True
+
+        self._response_etag = etag
+        return False
+
     def send_json_response(self, data, status=200):
         """Resposta JSON RÁPIDA SEM compressão para simplicidade"""
         try:
             response = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        except Exception as e:
+            print(f" Erro em send_json_response: {e}")
+            self.send_error(500, "Erro interno")
+            return
+        self.send_json_bytes(response, status)
 
+    def send_json_bytes(self, response, status=200):
+        """Envia um corpo JSON ja serializado (ex.: projecoes em cache)."""
+        etag = self._response_etag
+        self._response_etag = None
+        try:
             # Resposta direta SEM compressão
             self.send_response(status)
             self.send_header("Content-type", "application/json; charset=utf-8")
             self.send_header("Content-Length", str(len(response)))
-            self.send_header("Cache-Control", "no-cache, no-store, must-revalidate")
-            self.send_header("Pragma", "no-cache")
-            self.send_header("Expires", "0")
+            if etag and status == 200:
+                # Guardavel pelo navegador, mas sempre revalidado com If-None-Match.
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "private, no-cache")
+                self.send_header("Vary", "Cookie")
+                self._revalidate_only = True
+            else:
+                self.send_header("Cache-Control", "no-cache, no-store, must-revalidate")
+                self.send_header("Pragma", "no-cache")
+                self.send_header("Expires", "0")
             self.end_headers()
             self.wfile.write(response)
 
         except Exception as e:
-            print(f" Erro em send_json_response: {e}")
+            print(f" Erro em send_json_bytes: {e}")
             self.send_error(500, "Erro interno")
 
     def end_headers(self):
@@ -2131,6 +2650,15 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             header_name, header_value = self._pending_response_headers.pop(0)
             self.send_header(header_name, header_value)
 
+        query_stats = get_query_tracking()
+        if query_stats is not None:
+            total_ms = (time.perf_counter() - query_stats["started_at"]) * 1000
+            self.send_header(
+                "Server-Timing",
+                f'db;dur={query_stats["db_ms"]:.1f};desc="{query_stats["queries"]} queries, '
+                f'{query_stats["rows"]} rows", total;dur={total_ms:.1f}',
+            )
+
         allowed_origin = self._resolve_allowed_origin()
         if allowed_origin:
             self.send_header("Access-Control-Allow-Origin", allowed_origin)
@@ -2150,10 +2678,14 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             "camera=(), microphone=(), geolocation=(), usb=(), payment=(), browsing-topics=()",
         )
         self.send_header("X-Permitted-Cross-Domain-Policies", "none")
-        # Headers anti-cache
-        self.send_header("Cache-Control", "no-cache, no-store, must-revalidate")
-        self.send_header("Pragma", "no-cache")
-        self.send_header("Expires", "0")
+        if self._revalidate_only:
+            # Resposta com ETag: o navegador guarda e revalida, entao sem no-store.
+            self._revalidate_only = False
+        else:
+            # Headers anti-cache
+            self.send_header("Cache-Control", "no-cache, no-store, must-revalidate")
+            self.send_header("Pragma", "no-cache")
+            self.send_header("Expires", "0")
         if self.headers.get("X-Forwarded-Proto", "").lower() == "https":
             self.send_header(
                 "Strict-Transport-Security",
@@ -2271,17 +2803,27 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             )
 
     def handle_post_system_apply_json(self):
-        """Rota: /api/system/apply-json - Compara JSONs e retorna diferenças"""
+        """Rota: /api/system/apply-json - Compara o JSON proposto com o sistema gravado.
+
+        Basta enviar ``proposed``; a base e o catalogo do servidor. ``current``
+        ainda e aceito para comparar com outra base.
+        """
         try:
             content_length = int(self.headers.get("Content-Length", 0))
             post_data = self.rfile.read(content_length)
             data = json.loads(post_data)
 
-            current = data.get("current", {})
-            proposed = data.get("proposed", {})
+            current = data.get("current") or None
+            proposed = data.get("proposed")
+            if not isinstance(proposed, dict) or (
+                current is not None and not isinstance(current, dict)
+            ):
+                return self.send_json_response(
+                    {"success": False, "error": "JSON proposto invalido"}, 400
+                )
 
             print(
-                f" Comparando JSONs: current={bool(current)}, proposed={bool(proposed)}"
+                f" Comparando JSONs: base={'enviada' if current else 'servidor'}, proposed={bool(proposed)}"
             )
 
             # Validação básica ATUALIZADA
@@ -2303,8 +2845,9 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                         400,
                     )
 
-            # Calcular diferenças (já atualizada anteriormente)
-            differences = self._calculate_simple_differences(current, proposed)
+            storage = self.routes_core.system_repository.storage
+            version = storage.conn.data_version
+            differences = self._calculate_simple_differences(current, proposed, version)
             summary = self._generate_simple_summary(differences)
 
             print(f" Comparação concluída: {summary['total_changes']} alterações")
@@ -2314,6 +2857,7 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                     "success": True,
                     "differences": differences,
                     "summary": summary,
+                    "version": version,
                     "message": "Comparação realizada com sucesso",
                 },
                 200,
@@ -2327,132 +2871,21 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 {"success": False, "error": f"Erro interno: {str(e)}"}, 500
             )
 
-    def _calculate_simple_differences(self, current, proposed):
-        """Calcula diferenças simples entre JSONs"""
-        diffs = {
-            "constants": {"added": [], "modified": [], "removed": []},
-            "machines": {"added": [], "modified": [], "removed": []},
-            "materials": {"added": [], "modified": [], "removed": []},
-            "empresas": {"added": [], "modified": [], "removed": []},
-            "banco_acessorios": {"added": [], "modified": [], "removed": []},
-            "dutos": {"added": [], "modified": [], "removed": []},
-            "tubos": {"added": [], "modified": [], "removed": []},  # ADICIONADO
-        }
-
-        # Constants
-        current_const = current.get("constants", {})
-        proposed_const = proposed.get("constants", {})
-
-        for key in proposed_const:
-            if key not in current_const:
-                diffs["constants"]["added"].append(key)
-            elif json.dumps(proposed_const[key]) != json.dumps(current_const[key]):
-                diffs["constants"]["modified"].append(key)
-
-        for key in current_const:
-            if key not in proposed_const:
-                diffs["constants"]["removed"].append(key)
-
-        # Machines (por type)
-        current_machines = {m.get("type", ""): m for m in current.get("machines", [])}
-        proposed_machines = {m.get("type", ""): m for m in proposed.get("machines", [])}
-
-        for type_name in proposed_machines:
-            if type_name not in current_machines:
-                diffs["machines"]["added"].append(type_name)
-            elif json.dumps(proposed_machines[type_name]) != json.dumps(
-                current_machines[type_name]
-            ):
-                diffs["machines"]["modified"].append(type_name)
-
-        for type_name in current_machines:
-            if type_name not in proposed_machines:
-                diffs["machines"]["removed"].append(type_name)
-
-        # Materials
-        current_materials = current.get("materials", {})
-        proposed_materials = proposed.get("materials", {})
-
-        for key in proposed_materials:
-            if key not in current_materials:
-                diffs["materials"]["added"].append(key)
-            elif json.dumps(proposed_materials[key]) != json.dumps(
-                current_materials[key]
-            ):
-                diffs["materials"]["modified"].append(key)
-
-        for key in current_materials:
-            if key not in proposed_materials:
-                diffs["materials"]["removed"].append(key)
-
-        # Dutos (por type)
-        current_dutos = {d.get("type", ""): d for d in current.get("dutos", [])}
-        proposed_dutos = {d.get("type", ""): d for d in proposed.get("dutos", [])}
-        
-        for type_name in proposed_dutos:
-            if type_name not in current_dutos:
-                diffs["dutos"]["added"].append(type_name)
-            elif json.dumps(proposed_dutos[type_name]) != json.dumps(current_dutos[type_name]):
-                diffs["dutos"]["modified"].append(type_name)
-        
-        for type_name in current_dutos:
-            if type_name not in proposed_dutos:
-                diffs["dutos"]["removed"].append(type_name)
-        
-        # Tubos (por polegadas)
-        current_tubos = {t.get("polegadas", ""): t for t in current.get("tubos", [])}
-        proposed_tubos = {t.get("polegadas", ""): t for t in proposed.get("tubos", [])}
-        
-        for polegadas in proposed_tubos:
-            if polegadas not in current_tubos:
-                diffs["tubos"]["added"].append(polegadas)
-            elif json.dumps(proposed_tubos[polegadas]) != json.dumps(current_tubos[polegadas]):
-                diffs["tubos"]["modified"].append(polegadas)
-        
-        for polegadas in current_tubos:
-            if polegadas not in proposed_tubos:
-                diffs["tubos"]["removed"].append(polegadas)
-        
-        # Empresas (por primeiro campo)
-        def get_empresa_key(empresa):
-            return next(iter(empresa)) if empresa else ""
-
-        current_empresas_dict = {
-            get_empresa_key(e): e for e in current.get("empresas", [])
-        }
-        proposed_empresas_dict = {
-            get_empresa_key(e): e for e in proposed.get("empresas", [])
-        }
-
-        for key in proposed_empresas_dict:
-            if key not in current_empresas_dict:
-                diffs["empresas"]["added"].append(key)
-            elif json.dumps(proposed_empresas_dict[key]) != json.dumps(
-                current_empresas_dict[key]
-            ):
-                diffs["empresas"]["modified"].append(key)
-
-        for key in current_empresas_dict:
-            if key not in proposed_empresas_dict:
-                diffs["empresas"]["removed"].append(key)
-
-        # Banco de Acessorios
-        current_acessorios = current.get("banco_acessorios", {})
-        proposed_acessorios = proposed.get("banco_acessorios", {})
-
-        for key in proposed_acessorios:
-            if key not in current_acessorios:
-                diffs["banco_acessorios"]["added"].append(key)
-            elif json.dumps(proposed_acessorios[key]) != json.dumps(
-                current_acessorios[key]
-            ):
-                diffs["banco_acessorios"]["modified"].append(key)
-
-        for key in current_acessorios:
-            if key not in proposed_acessorios:
-                diffs["banco_acessorios"]["removed"].append(key)
-
-        return diffs
+    def _calculate_simple_differences(self, current, proposed, version=None):
+        """Diferencas por secao: chaves adicionadas/alteradas/removidas e campos alterados.
+
+        Sem ``current`` a base e o catalogo gravado, com hashes por item mantidos
+        em ``system_diff_index`` ate a proxima escrita.
+        """
+        system_repository = self.routes_core.system_repository
+        if version is None:
+            version = system_repository.storage.conn.data_version
+        return system_diff_index.diff(
+            proposed,
+            version,
+            system_repository.get_dados_payload,
+            current=current,
+        )
 
     def _generate_simple_summary(self, differences):
         """Gera resumo simples das diferenças"""
@@ -2846,28 +3279,17 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             )
 
     def handle_get_search_acessorios(self):
-        """GET /api/acessorios/search?q=termo - Busca acessorios"""
+        """GET /api/acessorios/search?q=termo&limit=N&prefix=1 - Busca acessorios"""
         try:
-            # Extrair parâmetro de busca da query string
-            parsed_path = urlparse(self.path)
-            query_params = parse_qs(parsed_path.query)
-            termo = query_params.get("q", [""])[0].lower()
-
-            if not termo:
-                self.send_json_response(
-                    {"success": False, "error": "Termo de busca não fornecido"},
-                    status=400,
-                )
+            params = self._parse_catalog_search_params()
+            if params is None:
                 return
+            termo, limit, prefix_only = params
 
-            # Carregar dados.json
-            dados_file = self.file_utils.find_json_file("dados.json", self.project_root)
-
-
-            dados_data = self.file_utils.load_json_file(dados_file, {})
-
-            # Verificar se existe a seção banco_acessorios
-            if "banco_acessorios" not in dados_data:
+            found = self._search_catalog_section(
+                "banco_acessorios", termo, limit, prefix_only
+            )
+            if found is None:
                 self.send_json_response(
                     {
                         "success": False,
@@ -2877,50 +3299,18 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 )
                 return
 
-            banco_acessorios = dados_data["banco_acessorios"]
-
+            matches, total = found
             resultados = []
-            for tipo, dados in banco_acessorios.items():
-                # Buscar no tipo
-                if termo in tipo.lower():
-                    resultados.append(
-                        {
-                            "tipo": tipo,
-                            "descricao": dados.get("descricao", ""),
-                            "match": "tipo",
-                            "valores_count": len(dados.get("valores_padrao", {})),
-                        }
-                    )
-                    continue
-
-                # Buscar na descrição
-                descricao = dados.get("descricao", "").lower()
-                if termo in descricao:
-                    resultados.append(
-                        {
-                            "tipo": tipo,
-                            "descricao": dados.get("descricao", ""),
-                            "match": "descricao",
-                            "valores_count": len(dados.get("valores_padrao", {})),
-                        }
-                    )
-                    continue
-
-                # Buscar nas dimensões/valores
-                valores = dados.get("valores_padrao", {})
-                for dimensao, valor in valores.items():
-                    if termo in dimensao.lower():
-                        resultados.append(
-                            {
-                                "tipo": tipo,
-                                "descricao": dados.get("descricao", ""),
-                                "dimensao_encontrada": dimensao,
-                                "valor": valor,
-                                "match": "dimensao",
-                                "valores_count": len(valores),
-                            }
-                        )
-                        break
+            for (tipo, dados), match, extra in matches:
+                resultado = {
+                    "tipo": tipo,
+                    "descricao": dados.get("descricao", ""),
+                    "match": match,
+                    "valores_count": len(dados.get("valores_padrao", {})),
+                }
+                if match == "dimensao":
+                    resultado["dimensao_encontrada"], resultado["valor"] = extra
+                resultados.append(resultado)
 
             self.send_json_response(
                 {
@@ -2928,6 +3318,7 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                     "termo": termo,
                     "resultados": resultados,
                     "count": len(resultados),
+                    "total": total,
                 }
             )
 
@@ -2937,6 +3328,47 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 {"success": False, "error": f"Erro interno: {str(e)}"}, status=500
             )
 
+    def _parse_catalog_search_params(self):
+        """Le ``q``, ``limit`` e ``prefix`` da busca; envia 400 e retorna None se invalidos."""
+        query_params = parse_qs(urlparse(self.path).query)
+        termo = query_params.get("q", [""])[0].lower()
+        if not termo.strip():
+            self.send_json_response(
+                {"success": False, "error": "Termo de busca não fornecido"},
+                status=400,
+            )
+            return None
+
+        try:
+            limit = int(
+                query_params.get("limit", [""])[0] or self.CATALOG_SEARCH_DEFAULT_LIMIT
+            )
+        except ValueError:
+            self.send_json_response(
+                {"success": False, "error": "Parametro limit invalido"},
+                status=400,
+            )
+            return None
+
+        prefix_only = str(query_params.get("prefix", [""])[0]).strip().lower() in {
+            "1",
+            "true",
+            "yes",
+            "on",
+        }
+        return termo, min(max(limit, 1), self.CATALOG_SEARCH_MAX_LIMIT), prefix_only
+
+    def _search_catalog_section(self, section, termo, limit, prefix_only=False):
+        system_repository = self.routes_core.system_repository
+        return catalog_search_index.search(
+            section,
+            termo,
+            system_repository.storage.catalog_version,
+            system_repository.get_dados_payload,
+            limit=limit,
+            prefix_only=prefix_only,
+        )
+
     def handle_get_acessorio_dimensoes(self):
         """GET /api/acessorios/dimensoes - Retorna dimensões disponíveis"""
         try:
@@ -3183,62 +3615,36 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             )
 
     def handle_get_search_dutos(self):
-        """GET /api/dutos/search?q=termo - Busca dutos"""
+        """GET /api/dutos/search?q=termo&limit=N&prefix=1 - Busca dutos"""
         try:
-            from urllib.parse import parse_qs
-            
-            parsed_path = urlparse(self.path)
-            query_params = parse_qs(parsed_path.query)
-            termo = query_params.get("q", [""])[0].lower()
-            
-            if not termo:
-                self.send_json_response(
-                    {"success": False, "error": "Termo de busca não fornecido"},
-                    status=400
-                )
+            params = self._parse_catalog_search_params()
+            if params is None:
                 return
-            
-            dados_file = self.file_utils.find_json_file("dados.json", self.project_root)
+            termo, limit, prefix_only = params
 
-                
-            dados_data = self.file_utils.load_json_file(dados_file, {})
-            
-            dutos = dados_data.get("dutos", [])
+            matches, total = self._search_catalog_section(
+                "dutos", termo, limit, prefix_only
+            ) or ([], 0)
             resultados = []
-            
-            for duto in dutos:
-                tipo = duto.get("type", "").lower()
-                
-                # Buscar no tipo
-                if termo in tipo:
-                    resultados.append({
-                        "tipo": duto.get("type", ""),
-                        "valor_base": duto.get("valor", 0),
-                        "match": "tipo",
-                        "opcionais_count": len(duto.get("opcionais", []))
-                    })
-                    continue
-                
-                # Buscar nos opcionais
-                opcionais = duto.get("opcionais", [])
-                for opcional in opcionais:
-                    nome_opcional = opcional.get("nome", "").lower()
-                    if termo in nome_opcional:
-                        resultados.append({
-                            "tipo": duto.get("type", ""),
-                            "valor_base": duto.get("valor", 0),
-                            "opcional_encontrado": opcional.get("nome", ""),
-                            "valor_opcional": opcional.get("value", 0),
-                            "match": "opcional",
-                            "opcionais_count": len(opcionais)
-                        })
-                        break
-            
+
+            for duto, match, opcional in matches:
+                resultado = {
+                    "tipo": duto.get("type", ""),
+                    "valor_base": duto.get("valor", 0),
+                    "match": match,
+                }
+                if match == "opcional":
+                    resultado["opcional_encontrado"] = opcional.get("nome", "")
+                    resultado["valor_opcional"] = opcional.get("value", 0)
+                resultado["opcionais_count"] = len(duto.get("opcionais", []))
+                resultados.append(resultado)
+
             self.send_json_response({
                 "success": True,
                 "termo": termo,
                 "resultados": resultados,
-                "count": len(resultados)
+                "count": len(resultados),
+                "total": total
             })
             
         except Exception as e:
@@ -3852,69 +4258,32 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             )
 
     def handle_get_search_tubos(self):
-        """GET /api/tubos/search?q=termo - Busca tubos por termo"""
+        """GET /api/tubos/search?q=termo&limit=N&prefix=1 - Busca tubos por termo"""
         try:
-            from urllib.parse import parse_qs
-            
-            parsed_path = urlparse(self.path)
-            query_params = parse_qs(parsed_path.query)
-            termo = query_params.get("q", [""])[0].lower()
-            
-            if not termo:
-                self.send_json_response(
-                    {"success": False, "error": "Termo de busca não fornecido"},
-                    status=400
-                )
+            params = self._parse_catalog_search_params()
+            if params is None:
                 return
-            
-            dados_file = self.file_utils.find_json_file("dados.json", self.project_root)
+            termo, limit, prefix_only = params
 
-                
-            dados_data = self.file_utils.load_json_file(dados_file, {})
-            
-            tubos = dados_data.get("tubos", [])
-            resultados = []
-            
-            for tubo in tubos:
-                polegadas = tubo.get("polegadas", "").lower()
-                mm = str(tubo.get("mm", "")).lower()
-                valor = str(tubo.get("valor", "")).lower()
-                
-                # Buscar na polegada
-                if termo in polegadas:
-                    resultados.append({
-                        "polegadas": tubo.get("polegadas", ""),
-                        "mm": tubo.get("mm", 0),
-                        "valor": tubo.get("valor", 0),
-                        "match": "polegadas"
-                    })
-                    continue
-                
-                # Buscar no mm
-                if termo in mm:
-                    resultados.append({
-                        "polegadas": tubo.get("polegadas", ""),
-                        "mm": tubo.get("mm", 0),
-                        "valor": tubo.get("valor", 0),
-                        "match": "mm"
-                    })
-                    continue
-                
-                # Buscar no valor
-                if termo in valor:
-                    resultados.append({
-                        "polegadas": tubo.get("polegadas", ""),
-                        "mm": tubo.get("mm", 0),
-                        "valor": tubo.get("valor", 0),
-                        "match": "valor"
-                    })
-                    continue
+            matches, total = self._search_catalog_section(
+                "tubos", termo, limit, prefix_only
+            ) or ([], 0)
+            resultados = [
+                {
+                    "polegadas": tubo.get("polegadas", ""),
+                    "mm": tubo.get("mm", 0),
+                    "valor": tubo.get("valor", 0),
+                    "match": match
+                }
+                for tubo, match, _ in matches
+            ]
             
             self.send_json_response({
                 "success": True,
                 "termo": termo,
                 "resultados": resultados,
-                "count": len(resultados)
+                "count": len(resultados),
+                "total": total
             })
             
         except Exception as e:
@@ -4033,26 +4402,14 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         template_type,
     ):
         """Registra um arquivo temporario para download posterior."""
-        from datetime import datetime
-        from uuid import uuid4
-
-        download_info = {
-            "file_path": file_path,
-            "filename": filename,
-            "obra_id": obra_id,
-            "obra_nome": obra_nome,
-            "template_type": template_type,
-            "generated_at": datetime.now().isoformat(),
-            "size": os.path.getsize(file_path) if file_path and os.path.exists(file_path) else 0,
-        }
-
-        download_id = f"word_{obra_id}_{uuid4().hex}"
-        temp_info_file = tempfile.gettempdir() + f"/{download_id}.json"
-
-        with open(temp_info_file, "w", encoding="utf-8") as file_obj:
-            json.dump(download_info, file_obj)
-
-        return download_id, download_info
+        return download_registry.register(
+            file_path,
+            filename,
+            prefix=f"word_{obra_id}",
+            obra_id=obra_id,
+            obra_nome=obra_nome,
+            template_type=template_type,
+        )
 
     def _store_generated_downloads(
         self,
@@ -4123,6 +4480,104 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             }
         )
 
+    def _write_sse_event(self, event, data, event_id=None):
+        lines = []
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+        lines.append(f"event: {event}")
+        lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+        self.wfile.write(("\n".join(lines) + "\n\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def handle_get_background_job_stream(self):
+        """GET /api/jobs/stream?id={job_id}[&id=...] - Transmite o progresso dos jobs via SSE."""
+        parsed_path = urlparse(self.path)
+        query_params = parse_qs(parsed_path.query)
+        job_ids = []
+        for raw_value in query_params.get("id", []):
+            for job_id in str(raw_value or "").split(","):
+                job_id = job_id.strip()
+                if job_id and job_id not in job_ids:
+                    job_ids.append(job_id)
+
+        if not job_ids:
+            self.send_json_response(
+                {"success": False, "error": "ID do job nao informado."},
+                status=400,
+            )
+            return
+
+        if len(job_ids) > self.JOB_STREAM_MAX_IDS:
+            self.send_json_response(
+                {
+                    "success": False,
+                    "error": f"Maximo de {self.JOB_STREAM_MAX_IDS} jobs por conexao.",
+                },
+                status=400,
+            )
+            return
+
+        if not any(background_jobs.get(job_id) for job_id in job_ids):
+            self.send_json_response(
+                {"success": False, "error": "Job nao encontrado ou expirado."},
+                status=404,
+            )
+            return
+
+        try:
+            since_version = int(self.headers.get("Last-Event-ID") or 0)
+        except (TypeError, ValueError):
+            since_version = 0
+
+        # A conexao fica aberta por varios segundos: nao segura conexao do pool.
+        release_thread_connection(self.project_root)
+
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("X-Accel-Buffering", "no")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        pending_ids = set(job_ids)
+        deadline = time.monotonic() + self.JOB_STREAM_TIMEOUT_SECONDS
+
+        try:
+            self.wfile.write(b"retry: 3000\n\n")
+            self.wfile.flush()
+
+            while pending_ids and time.monotonic() < deadline:
+                version, changes = background_jobs.wait_for_changes(
+                    pending_ids,
+                    since_version,
+                    timeout=self.JOB_STREAM_HEARTBEAT_SECONDS,
+                )
+
+                if not changes:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+
+                for job_id, job in changes.items():
+                    if job is None:
+                        pending_ids.discard(job_id)
+                        self._write_sse_event("expired", {"id": job_id}, version)
+                        continue
+
+                    self._write_sse_event(
+                        "job", self._serialize_background_job(job), version
+                    )
+                    if job.get("status") in {"completed", "failed"}:
+                        pending_ids.discard(job_id)
+
+                since_version = version
+
+            self._write_sse_event(
+                "end", {"pending": sorted(pending_ids)}, since_version
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
     def _queue_background_email_job(self, destinatario, assunto, mensagem, attachment_files):
         def run_email_job(job_id):
             return self._run_background_email_job(
@@ -4689,11 +5144,14 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             is_update=is_update,
         )
 
+        # Notificacoes em rajada (varias obras salvas/exportadas juntas) saem no
+        # mesmo lote, pela mesma conexao autenticada.
         enviar_email_com_anexos(
             str(config.get("email") or "").strip(),
             assunto,
             mensagem,
             attachment_files,
+            em_lote=True,
         )
         repository.upsert(obra_id, current_fingerprint, assunto, mensagem)
 
@@ -4806,6 +5264,374 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 status=500,
             )
 
+    def handle_post_profiler_arm(self):
+        """POST /api/system/profiler - Arma o profiler para as proximas N requisicoes ou um job"""
+        try:
+            payload = self._read_json_body()
+        except json.JSONDecodeError:
+            self.send_json_response({"success": False, "error": "JSON invalido"}, status=400)
+            return
+
+        kind = "job" if payload.get("job_type") else "request"
+        try:
+            target = request_profiler.arm(
+                kind,
+                payload.get("job_type") or payload.get("route"),
+                count=payload.get("count", 1),
+                mode=payload.get("mode", "cprofile"),
+            )
+        except (TypeError, ValueError) as exc:
+            self.send_json_response({"success": False, "error": str(exc)}, status=400)
+            return
+
+        self.send_json_response({"success": True, "target": target}, status=201)
+
+    def handle_post_profiler_stop(self):
+        """POST /api/system/profiler/stop - Desarma um alvo (id) ou todos"""
+        try:
+            payload = self._read_json_body()
+        except json.JSONDecodeError:
+            self.send_json_response({"success": False, "error": "JSON invalido"}, status=400)
+            return
+
+        removed = request_profiler.disarm(payload.get("id"))
+        self.send_json_response({"success": True, "removed": removed})
+
+    def handle_post_memory_tracemalloc(self):
+        """POST /api/system/memory/tracemalloc - Liga ou desliga o tracemalloc"""
+        try:
+            payload = self._read_json_body()
+        except json.JSONDecodeError:
+            self.send_json_response({"success": False, "error": "JSON invalido"}, status=400)
+            return
+
+        action = str(payload.get("action") or "").strip().lower()
+        if action == "start":
+            try:
+                changed = memory_diagnostics.start(payload.get("frames"))
+            except (TypeError, ValueError):
+                self.send_json_response(
+                    {"success": False, "error": "Numero de frames invalido"}, status=400
+                )
+                return
+        elif action == "stop":
+            changed = memory_diagnostics.stop()
+        else:
+            self.send_json_response(
+                {"success": False, "error": "Acao invalida (use 'start' ou 'stop')"},
+                status=400,
+            )
+            return
+
+        self.send_json_response(
+            {
+                "success": True,
+                "changed": changed,
+                "tracemalloc": memory_diagnostics.status()["tracemalloc"],
+            }
+        )
+
+    def handle_post_memory_snapshot(self):
+        """POST /api/system/memory/snapshot - Registra um snapshot do tracemalloc"""
+        try:
+            payload = self._read_json_body()
+        except json.JSONDecodeError:
+            self.send_json_response({"success": False, "error": "JSON invalido"}, status=400)
+            return
+
+        try:
+            snapshot = memory_diagnostics.take_snapshot(
+                payload.get("label"), limit=payload.get("limit", 15)
+            )
+        except RuntimeError as exc:
+            self.send_json_response({"success": False, "error": str(exc)}, status=409)
+            return
+
+        self.send_json_response({"success": True, "snapshot": snapshot}, status=201)
+
+    def handle_post_export_batch(self):
+        """POST /api/export/batch - Exporta varias obras em um unico ZIP."""
+        try:
+            payload = self._read_json_body()
+            export_format = str(payload.get("formato") or "ambos").strip().lower()
+            if export_format not in {"pc", "pt", "ambos"}:
+                self.send_json_response(
+                    {"success": False, "error": "Formato de exportacao invalido."},
+                    status=400,
+                )
+                return
+
+            obra_ids = self._resolve_batch_export_obra_ids(payload)
+            if not obra_ids:
+                self.send_json_response(
+                    {
+                        "success": False,
+                        "error": "Informe obraIds ou um filtro (empresa/periodo) com obras.",
+                    },
+                    status=400,
+                )
+                return
+
+            if len(obra_ids) > self.BATCH_EXPORT_MAX_OBRAS:
+                self.send_json_response(
+                    {
+                        "success": False,
+                        "error": f"Maximo de {self.BATCH_EXPORT_MAX_OBRAS} obras por lote.",
+                    },
+                    status=400,
+                )
+                return
+
+            job_id = background_jobs.submit(
+                "export_batch",
+                lambda background_job_id: self._run_batch_export_job(
+                    background_job_id,
+                    obra_ids,
+                    export_format,
+                ),
+                metadata={
+                    "formato": export_format,
+                    "total_obras": len(obra_ids),
+                },
+            )
+
+            self.send_json_response(
+                {
+                    "success": True,
+                    "accepted": True,
+                    "job_id": job_id,
+                    "total_obras": len(obra_ids),
+                    "message": "Exportacao em lote iniciada em segundo plano.",
+                },
+                status=202,
+            )
+        except json.JSONDecodeError:
+            self.send_json_response({"success": False, "error": "JSON invalido"}, 400)
+        except Exception as e:
+            print(f" Erro em handle_post_export_batch: {e}")
+            self.send_json_response(
+                {"success": False, "error": str(e)},
+                status=500,
+            )
+
+    def _parse_export_date(self, value):
+        from datetime import datetime
+
+        text = str(value or "").strip()
+        if not text:
+            return None
+
+        for date_format in ("%d/%m/%Y", "%Y-%m-%d"):
+            try:
+                return datetime.strptime(text[:10], date_format).date()
+            except ValueError:
+                continue
+        return None
+
+    def _resolve_batch_export_obra_ids(self, payload):
+        explicit_ids = payload.get("obraIds") or payload.get("obra_ids")
+        if isinstance(explicit_ids, list):
+            return list(
+                dict.fromkeys(
+                    str(obra_id).strip() for obra_id in explicit_ids if str(obra_id).strip()
+                )
+            )
+
+        filtro = payload.get("filtro") if isinstance(payload.get("filtro"), dict) else payload
+        empresa_codigo = str(
+            filtro.get("empresaCodigo") or filtro.get("empresa_codigo") or ""
+        ).strip().upper()
+        data_inicio = self._parse_export_date(
+            filtro.get("dataInicio") or filtro.get("data_inicio")
+        )
+        data_fim = self._parse_export_date(filtro.get("dataFim") or filtro.get("data_fim"))
+
+        # Sem filtro nenhum nao exporta o banco inteiro por engano.
+        if not empresa_codigo and data_inicio is None and data_fim is None:
+            return []
+
+        obra_ids = []
+        for entry in self.routes_core.obra_repository.get_catalog():
+            if empresa_codigo and str(entry.get("empresaSigla") or "").strip().upper() != empresa_codigo:
+                continue
+
+            if data_inicio is not None or data_fim is not None:
+                data_cadastro = self._parse_export_date(entry.get("dataCadastro"))
+                if data_cadastro is None:
+                    continue
+                if data_inicio is not None and data_cadastro < data_inicio:
+                    continue
+                if data_fim is not None and data_cadastro > data_fim:
+                    continue
+
+            obra_ids.append(str(entry.get("id")))
+
+        return obra_ids
+
+    def _run_batch_export_job(self, job_id, obra_ids, export_format):
+        import tempfile
+        import zipfile
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from datetime import datetime
+
+        from servidor_modules.database.connection import (
+            release_thread_connection,
+            scoped_connection,
+        )
+        from servidor_modules.handlers.word_handler import WordHandler
+        from servidor_modules.utils.export_utils import (
+            cleanup_temp_files,
+            write_zip_entry_from_file,
+        )
+
+        background_jobs.set_stage(
+            job_id,
+            "loading_catalog",
+            "Carregando dados do catalogo...",
+        )
+
+        # Um unico snapshot do catalogo e das obras do lote para todos os documentos.
+        snapshot = {
+            "dados.json": self.file_utils.load_json_file(
+                self.file_utils.find_json_file("dados.json", self.project_root),
+                {},
+            ),
+            "backup.json": {
+                "obras": self.routes_core.obra_repository.get_by_session_ids(obra_ids),
+            },
+        }
+        obras_by_id = {
+            str(obra.get("id")): obra for obra in snapshot["backup.json"]["obras"]
+        }
+        # O restante do job trabalha sobre o snapshot; a conexao nao fica presa.
+        release_thread_connection(self.project_root)
+
+        obra_statuses = [
+            {
+                "obra_id": obra_id,
+                "obra_nome": (obras_by_id.get(obra_id) or {}).get("nome", obra_id),
+                "status": "queued" if obra_id in obras_by_id else "failed",
+                "error": "" if obra_id in obras_by_id else "Obra nao encontrada.",
+            }
+            for obra_id in obra_ids
+        ]
+        status_by_id = {status["obra_id"]: status for status in obra_statuses}
+
+        def report_progress(stage, message):
+            completed = sum(1 for status in obra_statuses if status["status"] == "completed")
+            failed = sum(1 for status in obra_statuses if status["status"] == "failed")
+            background_jobs.set_stage(
+                job_id,
+                stage,
+                message,
+                progress={
+                    "total": len(obra_statuses),
+                    "completed": completed,
+                    "failed": failed,
+                },
+                obras=[dict(status) for status in obra_statuses],
+            )
+            return completed, failed
+
+        @scoped_connection
+        def render_obra(obra_id):
+            word_handler = WordHandler(self.project_root, self.file_utils, snapshot)
+            files, error = word_handler.generate_selected_documents(obra_id, export_format)
+            if error:
+                raise RuntimeError(error)
+            return files
+
+        report_progress("generating_files", "Gerando documentos do lote...")
+
+        zip_name = f"exportacao_lote_{datetime.now().strftime('%d-%m-%Y')}.zip"
+        zip_path = None
+        used_folders = set()
+
+        try:
+            with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp_file:
+                zip_path = tmp_file.name
+
+            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zip_file, ThreadPoolExecutor(
+                max_workers=self.BATCH_EXPORT_WORKERS
+            ) as executor:
+                futures = {}
+                for obra_id in obras_by_id:
+                    status_by_id[obra_id]["status"] = "running"
+                    futures[executor.submit(render_obra, obra_id)] = obra_id
+
+                # O ZIP so e escrito nesta thread; os workers apenas renderizam.
+                for future in as_completed(futures):
+                    obra_id = futures[future]
+                    status = status_by_id[obra_id]
+                    files = []
+                    try:
+                        files = future.result()
+                        folder = re.sub(r'[\\/:*?"<>|]+', "_", str(status["obra_nome"])).strip() or obra_id
+                        if folder in used_folders:
+                            folder = f"{folder}_{obra_id}"
+                        used_folders.add(folder)
+
+                        for file_info in files:
+                            write_zip_entry_from_file(
+                                zip_file,
+                                file_info["path"],
+                                f"{folder}/{file_info['filename']}",
+                            )
+                        status.update(status="completed", files=len(files))
+                    except Exception as exc:
+                        status.update(status="failed", error=str(exc))
+                    finally:
+                        cleanup_temp_files(*(file_info.get("path") for file_info in files))
+
+                    processed = sum(
+                        1
+                        for item in obra_statuses
+                        if item["status"] in {"completed", "failed"}
+                    )
+                    report_progress(
+                        "generating_files",
+                        f"{processed} de {len(obra_statuses)} obras processadas...",
+                    )
+
+            completed, failed = report_progress(
+                "preparing_download",
+                "Preparando download...",
+            )
+            if not completed:
+                raise RuntimeError("Nenhum documento do lote foi gerado.")
+
+            download_id, download_info = self._store_generated_download(
+                zip_path,
+                zip_name,
+                "lote",
+                "Exportacao em lote",
+                f"export_batch_{export_format}",
+            )
+        except Exception:
+            cleanup_temp_files(zip_path)
+            raise
+
+        downloads = [
+            {
+                "download_id": download_id,
+                "filename": download_info.get("filename", ""),
+                "size": download_info.get("size", 0),
+                "template_type": download_info.get("template_type", ""),
+            }
+        ]
+        return {
+            "message": (
+                f"Lote exportado: {completed} obra(s) com sucesso"
+                + (f", {failed} com falha." if failed else ".")
+            ),
+            "formato": export_format,
+            "download_id": download_id,
+            "download_ids": [download_id],
+            "downloads": downloads,
+            "filename": zip_name,
+            "size": download_info.get("size", 0),
+        }
+
     def handle_post_obra_notificar(self):
         """POST /api/obra/notificar - Envia notificacao automatica ao ADM."""
         try:
@@ -5001,26 +5827,13 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                         cleanup_temp_files(temp_notification_zip)
             
             # Salvar informações do arquivo gerado para download posterior
-            from datetime import datetime
-            import os
-            
-            download_info = {
-                "file_path": file_path,
-                "filename": filename,
-                "obra_id": obra_id,
-                "obra_nome": obra_nome,
-                "template_type": template_type,
-                "generated_at": datetime.now().isoformat(),
-                "size": os.path.getsize(file_path) if os.path.exists(file_path) else 0
-            }
-            
-            # Salvar em arquivo temporário de sessão
-            import tempfile
-            download_id = f"word_{int(datetime.now().timestamp())}_{obra_id}"
-            temp_info_file = tempfile.gettempdir() + f"/{download_id}.json"
-            
-            with open(temp_info_file, "w", encoding="utf-8") as f:
-                json.dump(download_info, f)
+            download_id, download_info = self._store_generated_download(
+                file_path,
+                filename,
+                obra_id,
+                obra_nome,
+                template_type,
+            )
             
             self.send_json_response({
                 "success": True,
@@ -5121,33 +5934,26 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 return
             
             # Buscar informações do arquivo
-            import tempfile
-            temp_info_file = tempfile.gettempdir() + f"/{download_id}.json"
+            download_info = download_registry.get(download_id)
             
-            if not os.path.exists(temp_info_file):
+            if not download_info:
                 self.send_json_response({
                     "success": False,
                     "error": "Arquivo não encontrado ou expirado"
                 }, status=404)
                 return
             
-            with open(temp_info_file, "r", encoding="utf-8") as f:
-                download_info = json.load(f)
-            
             file_path = download_info.get("file_path")
             filename = download_info.get("filename", "documento.docx")
             
             if not file_path or not os.path.exists(file_path):
+                download_registry.discard(download_id)
                 self.send_json_response({
                     "success": False,
                     "error": "Arquivo Word não encontrado"
                 }, status=404)
                 return
             
-            # Enviar arquivo
-            with open(file_path, "rb") as f:
-                file_data = f.read()
-            
             lower_filename = filename.lower()
             if lower_filename.endswith(".zip"):
                 content_type = "application/zip"
@@ -5156,19 +5962,18 @@ class UniversalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             else:
                 content_type = self.guess_type(filename) or "application/octet-stream"
 
-            self.send_response(200)
-            self.send_header("Content-Type", content_type)
-            self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
-            self.send_header("Content-Length", str(len(file_data)))
-            self.end_headers()
-            self.wfile.write(file_data)
+            # Enviar arquivo em blocos, sem carregar tudo na memoria
+            with open(file_path, "rb") as f:
+                file_size = os.fstat(f.fileno()).st_size
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+                self.send_header("Content-Length", str(file_size))
+                self.end_headers()
+                shutil.copyfileobj(f, self.wfile, 64 * 1024)
             
-            # Limpar arquivos temporários após envio
-            try:
-                os.unlink(file_path)
-                os.unlink(temp_info_file)
-            except:
-                pass
+            # Limpar arquivo temporário após envio
+            download_registry.discard(download_id, served=True)
                 
         except Exception as e:
             print(f" Erro em handle_download_word: {e}")
@@ -7,6 +7,7 @@ import json
 from http.server import BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import os
+import shutil
 import time
 
 class RouteHandler:
@@ -279,6 +280,103 @@ class RouteHandler:
         payload = self.routes_core.handle_get_storage_status()
         handler.send_json_response(payload)
 
+    def handle_get_download_registry_status(self, handler):
+        """GET /api/system/downloads - Retorna arquivos temporarios aguardando download"""
+        from servidor_modules.utils.download_registry import download_registry
+
+        handler.send_json_response({"success": True, **download_registry.stats()})
+
+    def handle_get_database_pool_status(self, handler):
+        """GET /api/system/database-pool - Retorna estatisticas do pool de conexoes"""
+        from servidor_modules.database.connection import get_pool_settings, get_pool_stats
+
+        pool_stats = get_pool_stats(self.project_root)
+        if pool_stats is None:
+            handler.send_json_response(
+                {"success": False, "error": "Pool de conexoes ainda nao inicializado"},
+                status=503,
+            )
+            return
+
+        handler.send_json_response(
+            {"success": True, "settings": get_pool_settings(), "pool": pool_stats}
+        )
+
+    def handle_get_metrics(self, handler):
+        """GET /metrics - Metricas no formato texto do Prometheus"""
+        from servidor_modules.utils.metrics import metrics_registry
+
+        body = metrics_registry.render().encode("utf-8")
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("Cache-Control", "no-cache, no-store, must-revalidate")
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def handle_get_profiler_status(self, handler):
+        """GET /api/system/profiler - Lista alvos armados e perfis gerados"""
+        from servidor_modules.utils.profiler import request_profiler
+
+        handler.send_json_response({"success": True, **request_profiler.status()})
+
+    def handle_get_profiler_download(self, handler):
+        """GET /api/system/profiler/download?id={result_id} - Baixa o arquivo do perfil"""
+        from servidor_modules.utils.profiler import request_profiler
+
+        query_params = parse_qs(urlparse(handler.path).query)
+        result = request_profiler.get_result(query_params.get("id", [""])[0])
+        if not result or not os.path.exists(result["file_path"]):
+            handler.send_json_response(
+                {"success": False, "error": "Perfil nao encontrado"}, status=404
+            )
+            return
+
+        content_type = (
+            "text/plain; charset=utf-8"
+            if result["filename"].endswith(".txt")
+            else "application/octet-stream"
+        )
+        with open(result["file_path"], "rb") as file_obj:
+            handler.send_response(200)
+            handler.send_header("Content-Type", content_type)
+            handler.send_header(
+                "Content-Disposition", f'attachment; filename="{result["filename"]}"'
+            )
+            handler.send_header("Content-Length", str(os.fstat(file_obj.fileno()).st_size))
+            handler.end_headers()
+            shutil.copyfileobj(file_obj, handler.wfile)
+
+    def handle_get_memory_status(self, handler):
+        """GET /api/system/memory - Retorna RSS, GC, caches e estado do tracemalloc"""
+        from servidor_modules.utils.memory_diagnostics import memory_diagnostics
+
+        handler.send_json_response({"success": True, **memory_diagnostics.status()})
+
+    def handle_get_memory_diff(self, handler):
+        """GET /api/system/memory/diff?from={id}&to={id}&group_by=lineno - Compara snapshots"""
+        from servidor_modules.utils.memory_diagnostics import memory_diagnostics
+
+        query_params = parse_qs(urlparse(handler.path).query)
+        try:
+            diff = memory_diagnostics.diff(
+                query_params.get("from", [""])[0],
+                to_id=query_params.get("to", [""])[0] or None,
+                group_by=query_params.get("group_by", ["lineno"])[0],
+                limit=query_params.get("limit", ["25"])[0],
+            )
+        except ValueError as exc:
+            handler.send_json_response({"success": False, "error": str(exc)}, status=400)
+            return
+        except KeyError as exc:
+            handler.send_json_response({"success": False, "error": exc.args[0]}, status=404)
+            return
+        except RuntimeError as exc:
+            handler.send_json_response({"success": False, "error": str(exc)}, status=409)
+            return
+
+        handler.send_json_response({"success": True, **diff})
+
     def handle_get_database_table_usage(self, handler):
         """GET /api/system/database-usage/tables - Retorna uso por tabela"""
         payload = self.routes_core.handle_get_database_table_usage()
@@ -381,7 +479,23 @@ class RouteHandler:
 
     def handle_health_check(self, handler):
         """GET /health-check"""
-        handler.send_json_response({"status": "online", "timestamp": time.time()})
+        from servidor_modules.database.connection import get_pool_stats
+
+        pool_stats = get_pool_stats(self.project_root)
+        handler.send_json_response(
+            {
+                "status": "online",
+                "timestamp": time.time(),
+                "database_pool": (
+                    {
+                        key: pool_stats[key]
+                        for key in ("size", "available", "in_use", "max_size", "requests_waiting")
+                    }
+                    if pool_stats
+                    else None
+                ),
+            }
+        )
         
     def handle_delete_empresa(self, handler, index):
         """DELETE /api/empresas/{index}"""
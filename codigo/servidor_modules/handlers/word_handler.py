@@ -6,23 +6,31 @@ word_handler.py - Manipulação de documentos Word
 import json
 import os
 import tempfile
+import time
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from docxtpl import DocxTemplate
 import traceback
 from http.server import BaseHTTPRequestHandler
 from typing import Dict, List, Any, Optional
 
+from servidor_modules.utils.metrics import word_render_duration_seconds
+
 class WordHandler:
     """Handler para geração de documentos Word"""
     
-    def __init__(self, project_root, file_utils):
+    def __init__(self, project_root, file_utils, shared_data=None):
         self.project_root = project_root
         self.file_utils = file_utils
         self.templates_dir = project_root / "word_templates"
-        self._backup_cache = None
-        self._obra_cache = {}
+        # Snapshot opcional {"dados.json": ..., "backup.json": ...} compartilhado em lote
+        self.shared_data = shared_data
+        self._backup_cache = (shared_data or {}).get("backup.json")
+        self._obra_cache = {
+            str(obra.get("id")): obra
+            for obra in (self._backup_cache or {}).get("obras", [])
+            if isinstance(obra, dict)
+        }
         self.ensure_templates_dir()
         
     def ensure_templates_dir(self):
@@ -153,7 +161,7 @@ class WordHandler:
             from servidor_modules.generators.wordPC_generator import WordPCGenerator
             
             # Criar instância do gerador
-            pc_generator = WordPCGenerator(self.project_root, self.file_utils)
+            pc_generator = WordPCGenerator(self.project_root, self.file_utils, self.shared_data)
             
             # Usar o método do gerador
             return pc_generator.generate_context_for_pc(obra_id)
@@ -167,6 +175,8 @@ class WordHandler:
     def generate_proposta_comercial(self, obra_id: str, template_path: Path) -> Optional[str]:
         """Gera documento de Proposta Comercial com tratamento de erros melhorado"""
         try:
+            from docxtpl import DocxTemplate
+
             # Verificar template
             if not template_path.exists():
                 print(f"❌ Template não encontrado: {template_path}")
@@ -179,7 +189,7 @@ class WordHandler:
             
             # Usar o gerador avançado
             from servidor_modules.generators.wordPC_generator import WordPCGenerator
-            pc_generator = WordPCGenerator(self.project_root, self.file_utils)
+            pc_generator = WordPCGenerator(self.project_root, self.file_utils, self.shared_data)
             
             # Gerar contexto
             context = pc_generator.generate_context_for_pc(obra_id)
@@ -242,7 +252,7 @@ class WordHandler:
             from servidor_modules.generators.wordPT_generator import WordPTGenerator
             
             # Criar instância do gerador
-            pt_generator = WordPTGenerator(self.project_root, self.file_utils)
+            pt_generator = WordPTGenerator(self.project_root, self.file_utils, self.shared_data)
             
             # Localizar template
             template_path = self.templates_dir / "proposta_tecnica_template.docx"
@@ -260,7 +270,13 @@ class WordHandler:
                 print(f"⚠️ Validação: {message}")
             
             # Gerar documento
+            render_started_at = time.perf_counter()
             output_path = pt_generator.generate_proposta_tecnica(obra_id, template_path)
+            word_render_duration_seconds.observe(
+                time.perf_counter() - render_started_at,
+                "pt",
+                "ok" if output_path else "error",
+            )
             
             if output_path:
                 # Gerar nome do arquivo usando o método do handler
@@ -373,7 +389,7 @@ class WordHandler:
             from servidor_modules.generators.wordPC_generator import WordPCGenerator
             
             # Criar instância do gerador
-            pc_generator = WordPCGenerator(self.project_root, self.file_utils)
+            pc_generator = WordPCGenerator(self.project_root, self.file_utils, self.shared_data)
             
             # Localizar template
             template_path = self.templates_dir / "proposta_comercial_template.docx"
@@ -392,7 +408,13 @@ class WordHandler:
                 return None, None, message
             
             # Gerar proposta (AGORA FUNCIONA MESMO SEM ITENS)
+            render_started_at = time.perf_counter()
             output_path = pc_generator.generate_proposta_comercial(obra_id, template_path)
+            word_render_duration_seconds.observe(
+                time.perf_counter() - render_started_at,
+                "pc",
+                "ok" if output_path else "error",
+            )
             
             if output_path:
                 # Gerar nome do arquivo usando o método do gerador
@@ -452,13 +474,15 @@ class WordHandler:
             files = []
 
             if export_format == "ambos":
+                from servidor_modules.database.connection import scoped_connection
+
                 with ThreadPoolExecutor(max_workers=2) as executor:
                     pc_future = executor.submit(
-                        self.generate_proposta_comercial_avancada,
+                        scoped_connection(self.generate_proposta_comercial_avancada),
                         obra_id,
                     )
                     pt_future = executor.submit(
-                        self.generate_proposta_tecnica_avancada,
+                        scoped_connection(self.generate_proposta_tecnica_avancada),
                         obra_id,
                     )
 
@@ -155,6 +155,11 @@ class AdminEmailConfigStore:
         self.conn.commit()
         self._remove_legacy_json_file()
 
+        # Descarta configuracao e conexoes mantidas pelo transporte de email.
+        from servidor_modules.utils.mail_transport import mail_transport
+
+        mail_transport.invalidate_config()
+
         return normalized
 
     def _migrate_legacy_json_if_available(self):
@@ -4,17 +4,24 @@ from __future__ import annotations
 
 import os
 import threading
+import time
 import traceback
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from uuid import uuid4
 
+from servidor_modules.utils.memory_diagnostics import memory_diagnostics
+from servidor_modules.utils.metrics import background_job_duration_seconds, metrics_registry
+from servidor_modules.utils.profiler import request_profiler
+
 
 class BackgroundJobManager:
     def __init__(self, max_workers=4, ttl_seconds=3600):
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
         self.ttl = timedelta(seconds=max(ttl_seconds, 300))
         self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.version = 0
         self.jobs = {}
 
     def submit(self, job_type, target, metadata=None):
@@ -32,6 +39,7 @@ class BackgroundJobManager:
                 "message": "Job enfileirado.",
                 "metadata": dict(metadata or {}),
             }
+            self._touch_locked(job_id)
 
         self.executor.submit(self._run_job, job_id, target)
         return job_id
@@ -44,6 +52,7 @@ class BackgroundJobManager:
                 return
             job.update(fields)
             job["updated_at"] = now
+            self._touch_locked(job_id)
 
     def set_stage(self, job_id, stage, message=None, **extra):
         payload = {"stage": stage}
@@ -58,7 +67,39 @@ class BackgroundJobManager:
             job = self.jobs.get(str(job_id))
             return dict(job) if job else None
 
+    def wait_for_changes(self, job_ids, since_version=0, timeout=None):
+        job_ids = [str(job_id) for job_id in job_ids or []]
+
+        def collect_changes():
+            changes = {}
+            for job_id in job_ids:
+                job = self.jobs.get(job_id)
+                if job is None:
+                    changes[job_id] = None
+                elif int(job.get("version") or 0) > since_version:
+                    changes[job_id] = dict(job)
+            return changes
+
+        with self.changed:
+            changes = collect_changes()
+            if not changes:
+                self.changed.wait(timeout)
+                changes = collect_changes()
+            return self.version, changes
+
+    def _touch_locked(self, job_id):
+        self.version += 1
+        self.jobs[job_id]["version"] = self.version
+        self.changed.notify_all()
+
     def _run_job(self, job_id, target):
+        from servidor_modules.database.connection import connection_scope
+
+        # Conexoes fixadas pela thread do job voltam ao pool quando ele termina.
+        with connection_scope(label=f"job:{job_id}"):
+            self._execute_job(job_id, target)
+
+    def _execute_job(self, job_id, target):
         self.update(
             job_id,
             status="running",
@@ -66,6 +107,18 @@ class BackgroundJobManager:
             message="Processamento iniciado.",
         )
 
+        with self.lock:
+            job_type = (self.jobs.get(job_id) or {}).get("job_type", "generic")
+
+        profile_target = request_profiler.claim("job", job_type)
+        profile_run = (
+            request_profiler.start(profile_target, f"job {job_type} {job_id}")
+            if profile_target
+            else None
+        )
+
+        started_at = time.perf_counter()
+        status = "failed"
         try:
             result = target(job_id) or {}
             if not isinstance(result, dict):
@@ -78,6 +131,7 @@ class BackgroundJobManager:
                 completed_at=datetime.now().isoformat(),
                 **result,
             )
+            status = "completed"
         except Exception as exc:
             self.update(
                 job_id,
@@ -87,6 +141,46 @@ class BackgroundJobManager:
                 completed_at=datetime.now().isoformat(),
                 debug_trace=traceback.format_exc(),
             )
+        finally:
+            background_job_duration_seconds.observe(
+                time.perf_counter() - started_at, job_type, status
+            )
+            if profile_run is not None:
+                profile_run.stop()
+
+    def cache_size(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return {
+            "jobs": len(jobs),
+            "finished": sum(1 for job in jobs if job.get("status") in {"completed", "failed"}),
+        }
+
+    def collect_metrics(self):
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                key = (job.get("job_type", "generic"), job.get("status", "unknown"))
+                counts[key] = counts.get(key, 0) + 1
+            queued = sum(1 for job in self.jobs.values() if job.get("status") == "queued")
+
+        return [
+            (
+                "esi_background_jobs",
+                "gauge",
+                "Jobs conhecidos pelo gerenciador por tipo e status.",
+                [
+                    ({"job_type": job_type, "status": status}, count)
+                    for (job_type, status), count in sorted(counts.items())
+                ],
+            ),
+            (
+                "esi_background_jobs_queue_depth",
+                "gauge",
+                "Jobs aguardando um worker livre.",
+                [({}, queued)],
+            ),
+        ]
 
     def _cleanup_locked(self):
         now = datetime.now()
@@ -109,4 +203,5 @@ class BackgroundJobManager:
 
 _DEFAULT_MAX_WORKERS = int(os.environ.get("ESI_BACKGROUND_WORKERS", "4") or 4)
 background_jobs = BackgroundJobManager(max_workers=max(_DEFAULT_MAX_WORKERS, 2))
-
+metrics_registry.register_collector(background_jobs.collect_metrics)
+memory_diagnostics.register_cache_size("background_jobs", background_jobs.cache_size)
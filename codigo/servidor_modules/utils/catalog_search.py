@@ -0,0 +1,271 @@
+"""Indice em memoria para a busca de acessorios, dutos e tubos do catalogo.
+
+Cada secao vira uma lista de campos normalizados (sem acento, casefold) e um indice
+de n-gramas de 1 a 3 caracteres. Termos de ate 3 caracteres saem direto do indice;
+os maiores intersectam os trigramas e confirmam a substring nos candidatos.
+
+O indice acompanha ``DatabaseStorage.catalog_version``: quando a versao muda as
+secoes sao recarregadas, mas so e refeita a secao cujo conteudo mudou.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+
+from servidor_modules.utils.memory_diagnostics import memory_diagnostics
+from servidor_modules.utils.metrics import metrics_registry
+
+GRAM_SIZE = 3
+# Resultados ranqueados guardados por secao; o digitar repete os mesmos prefixos.
+RESULT_CACHE_SIZE = 512
+RANK_EXACT = 0
+RANK_PREFIX = 1
+RANK_TOKEN_PREFIX = 2
+RANK_SUBSTRING = 3
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_search_text(value):
+    """Texto sem acentos e em casefold, para comparar termo e catalogo."""
+    decomposed = unicodedata.normalize("NFKD", "" if value is None else str(value))
+    return "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).casefold()
+
+
+def _token_text(text):
+    # Palavras separadas por um espaco e com espaco inicial: " termo" dentro do
+    # campo indica que o termo comeca em uma palavra.
+    return " " + _TOKEN_SPLIT.sub(" ", text).strip()
+
+
+def _acessorio_fields(banco_acessorios):
+    for tipo, dados in (banco_acessorios or {}).items():
+        dados = dados if isinstance(dados, dict) else {}
+        fields = [("tipo", tipo, None), ("descricao", dados.get("descricao", ""), None)]
+        for dimensao, valor in (dados.get("valores_padrao") or {}).items():
+            fields.append(("dimensao", dimensao, (dimensao, valor)))
+        yield (tipo, dados), fields
+
+
+def _duto_fields(dutos):
+    for duto in dutos or []:
+        if not isinstance(duto, dict):
+            continue
+        fields = [("tipo", duto.get("type", ""), None)]
+        for opcional in duto.get("opcionais") or []:
+            if isinstance(opcional, dict):
+                fields.append(("opcional", opcional.get("nome", ""), opcional))
+        yield duto, fields
+
+
+def _tubo_fields(tubos):
+    for tubo in tubos or []:
+        if not isinstance(tubo, dict):
+            continue
+        yield tubo, [
+            ("polegadas", tubo.get("polegadas", ""), None),
+            ("mm", tubo.get("mm", ""), None),
+            ("valor", tubo.get("valor", ""), None),
+        ]
+
+
+SECTION_FIELDS = {
+    "banco_acessorios": _acessorio_fields,
+    "dutos": _duto_fields,
+    "tubos": _tubo_fields,
+}
+
+
+class _SectionIndex:
+    __slots__ = ("fingerprint", "items", "fields", "grams", "results")
+
+    def __init__(self, entries, fingerprint):
+        self.fingerprint = fingerprint
+        self.items = []
+        # (posicao do item, ordem do campo, tipo do match, texto, texto por palavras, extra)
+        self.fields = []
+        grams = {}
+        for item, item_fields in entries:
+            item_pos = len(self.items)
+            self.items.append(item)
+            for field_order, (kind, value, extra) in enumerate(item_fields):
+                text = normalize_search_text(value)
+                if not text:
+                    continue
+                field_id = len(self.fields)
+                self.fields.append(
+                    (item_pos, field_order, kind, text, _token_text(text), extra)
+                )
+                for size in range(1, GRAM_SIZE + 1):
+                    for start in range(len(text) - size + 1):
+                        grams.setdefault(text[start:start + size], set()).add(field_id)
+        self.grams = {gram: frozenset(ids) for gram, ids in grams.items()}
+        self.results = {}
+
+    def _candidates(self, query):
+        if len(query) <= GRAM_SIZE:
+            return self.grams.get(query, ())
+        postings = sorted(
+            (
+                self.grams.get(query[start:start + GRAM_SIZE], frozenset())
+                for start in range(len(query) - GRAM_SIZE + 1)
+            ),
+            key=len,
+        )
+        return postings[0].intersection(*postings[1:])
+
+    def search(self, query, limit=None, prefix_only=False):
+        """Retorna ``([(item, tipo_do_match, extra), ...], total)`` ordenado por relevancia.
+
+        Cada item aparece uma vez, pelo seu melhor campo: igual ao termo, comecando
+        pelo termo, com uma palavra comecando pelo termo e, por fim, contendo o termo.
+        """
+        cache_key = (query, bool(prefix_only))
+        ranked = self.results.get(cache_key)
+        if ranked is None:
+            ranked = self._rank(query, prefix_only)
+            if len(self.results) >= RESULT_CACHE_SIZE:
+                self.results.clear()
+            self.results[cache_key] = ranked
+        matches = ranked if limit is None else ranked[:limit]
+        return matches, len(ranked)
+
+    def _rank(self, query, prefix_only):
+        fields = self.fields
+        token_query = _token_text(query)
+        # Ate GRAM_SIZE os candidatos ja contem o termo; acima disso e preciso confirmar.
+        verify = len(query) > GRAM_SIZE
+        best = {}
+        for field_id in self._candidates(query):
+            item_pos, field_order, kind, text, token_text, extra = fields[field_id]
+            if text == query:
+                rank = RANK_EXACT
+            elif text.startswith(query):
+                rank = RANK_PREFIX
+            elif token_query in token_text:
+                rank = RANK_TOKEN_PREFIX
+            elif prefix_only or (verify and query not in text):
+                continue
+            else:
+                rank = RANK_SUBSTRING
+
+            key = (rank, field_order, item_pos)
+            current = best.get(item_pos)
+            if current is None or key < current[0]:
+                best[item_pos] = (key, kind, extra)
+
+        ranked = sorted(best.values(), key=lambda entry: entry[0])
+        return [(self.items[key[2]], kind, extra) for key, kind, extra in ranked]
+
+
+class CatalogSearchIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._version = None
+        self._sections = {}
+        self.counters = {
+            "queries": 0,
+            "refreshes": 0,
+            "section_builds": 0,
+        }
+
+    def _ensure_current(self, version, loader):
+        if self._version == version:
+            return
+        with self.lock:
+            if self._version == version:
+                return
+            payload = loader() or {}
+            sections = dict(self._sections)
+            for name, extractor in SECTION_FIELDS.items():
+                if name not in payload:
+                    sections[name] = None
+                    continue
+                fingerprint = hashlib.blake2b(
+                    json.dumps(
+                        payload[name], ensure_ascii=False, sort_keys=True, default=str
+                    ).encode("utf-8"),
+                    digest_size=16,
+                ).digest()
+                current = sections.get(name)
+                if current is not None and current.fingerprint == fingerprint:
+                    continue
+                sections[name] = _SectionIndex(extractor(payload[name]), fingerprint)
+                self.counters["section_builds"] += 1
+            self._sections = sections
+            self._version = version
+            self.counters["refreshes"] += 1
+
+    def search(self, section, query, version, loader, limit=None, prefix_only=False):
+        """Busca ``query`` na secao; ``None`` quando a secao nao existe no catalogo.
+
+        ``version`` deve ser lida antes de ``loader()`` rodar, para que uma escrita
+        concorrente gere nova versao e force outra atualizacao.
+        """
+        self._ensure_current(version, loader)
+        index = self._sections.get(section)
+        self.counters["queries"] += 1
+        if index is None:
+            return None
+        return index.search(normalize_search_text(query).strip(), limit, prefix_only)
+
+    def clear(self):
+        with self.lock:
+            self._sections = {}
+            self._version = None
+
+    def stats(self):
+        sections = self._sections
+        return {
+            "version": self._version,
+            "sections": {
+                name: {
+                    "items": len(index.items),
+                    "fields": len(index.fields),
+                    "grams": len(index.grams),
+                    "cached_results": len(index.results),
+                }
+                for name, index in sections.items()
+                if index is not None
+            },
+            **self.counters,
+        }
+
+    def cache_size(self):
+        return self.stats()["sections"]
+
+    def collect_metrics(self):
+        stats = self.stats()
+        return [
+            (
+                "esi_catalog_search_items",
+                "gauge",
+                "Itens indexados para a busca do catalogo por secao.",
+                [
+                    ({"section": name}, section["items"])
+                    for name, section in stats["sections"].items()
+                ],
+            ),
+            (
+                "esi_catalog_search_queries_total",
+                "counter",
+                "Buscas atendidas pelo indice do catalogo.",
+                [({}, stats["queries"])],
+            ),
+            (
+                "esi_catalog_search_section_builds_total",
+                "counter",
+                "Secoes do indice de busca reconstruidas apos mudanca no catalogo.",
+                [({}, stats["section_builds"])],
+            ),
+        ]
+
+
+catalog_search_index = CatalogSearchIndex()
+metrics_registry.register_collector(catalog_search_index.collect_metrics)
+memory_diagnostics.register_cache_size("catalog_search", catalog_search_index.cache_size)
@@ -0,0 +1,136 @@
+"""Projecoes sanitizadas para clientes, reaproveitadas enquanto a origem nao muda.
+
+O catalogo sanitizado e guardado por versao do catalogo (``DatabaseStorage.catalog_version``)
+junto com o JSON ja serializado. Cada obra sanitizada fica em um LRU identificado pelo
+fingerprint do ``raw_json``: qualquer alteracao gera outro fingerprint e a visao e refeita.
+
+As estruturas devolvidas sao compartilhadas entre requisicoes e nao devem ser alteradas.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from servidor_modules.utils.memory_diagnostics import memory_diagnostics
+from servidor_modules.utils.metrics import metrics_registry
+
+
+def fingerprint_raw_json(raw_json):
+    return hashlib.blake2b(str(raw_json or "").encode("utf-8"), digest_size=16).digest()
+
+
+class ClientProjectionCache:
+    def __init__(self, max_obras=2048):
+        self.max_obras = max(int(max_obras), 0)
+        self.lock = threading.Lock()
+        self._catalog = None
+        self._obras = OrderedDict()
+        self.counters = {
+            "catalog_hits": 0,
+            "catalog_misses": 0,
+            "obra_hits": 0,
+            "obra_misses": 0,
+            "obra_evicted": 0,
+        }
+
+    def get_catalog(self, version, builder):
+        """Retorna a entrada do catalogo sanitizado: ``payload``, ``json`` e ``script``."""
+        with self.lock:
+            entry = self._catalog
+            if entry is not None and entry["version"] == version:
+                self.counters["catalog_hits"] += 1
+                return entry
+            self.counters["catalog_misses"] += 1
+
+        payload = builder()
+        serialized = json.dumps(payload, ensure_ascii=False)
+        entry = {
+            "version": version,
+            "payload": payload,
+            "json": serialized,
+            "json_bytes": serialized.encode("utf-8"),
+            # Mesmo escape de _serialize_script_payload para embutir em <script>.
+            "script": serialized.replace("</", "<\\/"),
+        }
+        with self.lock:
+            current = self._catalog
+            if current is None or current["version"] <= version:
+                self._catalog = entry
+        return entry
+
+    def get_obra_view(self, obra_id, raw_json, builder):
+        """Visao sanitizada da obra; ``builder(raw_json)`` so roda quando a obra mudou."""
+        key = str(obra_id)
+        fingerprint = fingerprint_raw_json(raw_json)
+        with self.lock:
+            cached = self._obras.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                self._obras.move_to_end(key)
+                self.counters["obra_hits"] += 1
+                return cached[1]
+            self.counters["obra_misses"] += 1
+
+        view = builder(raw_json)
+        if self.max_obras <= 0:
+            return view
+
+        with self.lock:
+            self._obras[key] = (fingerprint, view)
+            self._obras.move_to_end(key)
+            while len(self._obras) > self.max_obras:
+                self._obras.popitem(last=False)
+                self.counters["obra_evicted"] += 1
+        return view
+
+    def clear(self):
+        with self.lock:
+            self._catalog = None
+            self._obras.clear()
+
+    def stats(self):
+        with self.lock:
+            catalog = self._catalog
+            return {
+                "catalog_version": catalog["version"] if catalog else None,
+                "catalog_bytes": len(catalog["json_bytes"]) if catalog else 0,
+                "obras": len(self._obras),
+                "max_obras": self.max_obras,
+                **self.counters,
+            }
+
+    def cache_size(self):
+        stats = self.stats()
+        return {"obras": stats["obras"], "catalog_bytes": stats["catalog_bytes"]}
+
+    def collect_metrics(self):
+        stats = self.stats()
+        return [
+            (
+                "esi_client_projection_obras",
+                "gauge",
+                "Obras sanitizadas mantidas em cache para clientes.",
+                [({}, stats["obras"])],
+            ),
+            (
+                "esi_client_projection_lookups_total",
+                "counter",
+                "Consultas ao cache de projecoes sanitizadas por tipo e resultado.",
+                [
+                    ({"kind": "catalog", "result": "hit"}, stats["catalog_hits"]),
+                    ({"kind": "catalog", "result": "miss"}, stats["catalog_misses"]),
+                    ({"kind": "obra", "result": "hit"}, stats["obra_hits"]),
+                    ({"kind": "obra", "result": "miss"}, stats["obra_misses"]),
+                ],
+            ),
+        ]
+
+
+client_projection_cache = ClientProjectionCache(
+    max_obras=int(os.environ.get("ESI_CLIENT_OBRA_CACHE_SIZE", "2048") or 2048),
+)
+metrics_registry.register_collector(client_projection_cache.collect_metrics)
+memory_diagnostics.register_cache_size("client_projections", client_projection_cache.cache_size)
@@ -0,0 +1,114 @@
+"""Limpeza periodica das credenciais de empresa vencidas.
+
+A expiracao fica em ``empresas.credenciais_expires_at`` (indexada); uma thread
+remove as vencidas com um unico UPDATE, sem que as requisicoes precisem ler e
+regravar as empresas. O login continua conferindo a validade de cada registro.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from servidor_modules.utils.metrics import metrics_registry
+
+
+class CredentialExpirySweeper:
+    def __init__(self, sweep_interval=300):
+        self.sweep_interval = max(int(sweep_interval), 10)
+        self.lock = threading.Lock()
+        self.project_root = None
+        self.last_sweep_at = None
+        self._backfilled = False
+        self._sweeper = None
+        self.counters = {
+            "sweeps": 0,
+            "cleared": 0,
+            "backfilled": 0,
+            "errors": 0,
+        }
+
+    def start(self, project_root):
+        """Agenda a limpeza; a primeira roda logo em seguida, ja em segundo plano."""
+        self.project_root = project_root
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        with self.lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop,
+                name="credential-expiry-sweeper",
+                daemon=True,
+            )
+            self._sweeper.start()
+
+    def sweep(self):
+        from servidor_modules.database.connection import connection_scope
+        from servidor_modules.database.repositories.empresa_repository import (
+            EmpresaRepository,
+        )
+
+        with connection_scope(self.project_root, label="credential-expiry"):
+            repository = EmpresaRepository(self.project_root)
+            if not self._backfilled:
+                self.counters["backfilled"] += repository.backfill_credential_expiry()
+                self._backfilled = True
+            codigos = repository.clear_expired_credentials()
+
+        self.counters["sweeps"] += 1
+        self.counters["cleared"] += len(codigos)
+        self.last_sweep_at = datetime.now().isoformat()
+        if codigos:
+            print(
+                f" Credenciais expiradas removidas automaticamente: {', '.join(codigos)}"
+            )
+        return codigos
+
+    def stats(self):
+        return {
+            "sweep_interval": self.sweep_interval,
+            "last_sweep_at": self.last_sweep_at,
+            "running": bool(self._sweeper is not None and self._sweeper.is_alive()),
+            **self.counters,
+        }
+
+    def collect_metrics(self):
+        stats = self.stats()
+        return [
+            (
+                "esi_credential_expiry_sweeps_total",
+                "counter",
+                "Execucoes da limpeza de credenciais vencidas.",
+                [({}, stats["sweeps"])],
+            ),
+            (
+                "esi_credential_expiry_cleared_total",
+                "counter",
+                "Credenciais de empresa removidas por vencimento.",
+                [({}, stats["cleared"])],
+            ),
+            (
+                "esi_credential_expiry_errors_total",
+                "counter",
+                "Falhas na limpeza de credenciais vencidas.",
+                [({}, stats["errors"])],
+            ),
+        ]
+
+    def _sweep_loop(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as exc:
+                self.counters["errors"] += 1
+                print(f" Erro na limpeza de credenciais expiradas: {exc}")
+            time.sleep(self.sweep_interval)
+
+
+credential_expiry_sweeper = CredentialExpirySweeper(
+    sweep_interval=int(os.environ.get("ESI_CREDENTIAL_SWEEP_SECONDS", "300") or 300),
+)
+metrics_registry.register_collector(credential_expiry_sweeper.collect_metrics)
@@ -0,0 +1,200 @@
+"""Registro em memoria dos arquivos temporarios aguardando download."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from uuid import uuid4
+
+from servidor_modules.utils.memory_diagnostics import memory_diagnostics
+from servidor_modules.utils.metrics import metrics_registry
+
+
+class DownloadRegistry:
+    def __init__(self, ttl_seconds=1800, quota_bytes=200 * 1024 * 1024, sweep_interval=60):
+        self.ttl_seconds = max(int(ttl_seconds), 60)
+        self.quota_bytes = max(int(quota_bytes), 0)
+        self.sweep_interval = max(int(sweep_interval), 5)
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.bytes_held = 0
+        self.counters = {
+            "registered": 0,
+            "served": 0,
+            "expired": 0,
+            "evicted": 0,
+        }
+        self._sweeper = None
+
+    def register(self, file_path, filename, prefix="download", **metadata):
+        size = 0
+        try:
+            size = os.stat(file_path).st_size if file_path else 0
+        except OSError:
+            size = 0
+
+        download_id = f"{prefix}_{uuid4().hex}"
+        info = {
+            **metadata,
+            "file_path": file_path,
+            "filename": filename,
+            "generated_at": datetime.now().isoformat(),
+            "size": size,
+        }
+
+        with self.lock:
+            self.entries[download_id] = {
+                "info": info,
+                "expires_at": time.monotonic() + self.ttl_seconds,
+            }
+            self.bytes_held += size
+            self.counters["registered"] += 1
+            removed_paths = self._enforce_quota_locked(keep_id=download_id)
+
+        self._remove_files(removed_paths)
+        self._ensure_sweeper()
+        return download_id, dict(info)
+
+    def get(self, download_id):
+        removed_paths = []
+        with self.lock:
+            entry = self.entries.get(str(download_id))
+            if entry and entry["expires_at"] <= time.monotonic():
+                removed_paths.append(self._pop_locked(str(download_id), "expired"))
+                entry = None
+            info = dict(entry["info"]) if entry else None
+
+        self._remove_files(removed_paths)
+        return info
+
+    def discard(self, download_id, served=False):
+        with self.lock:
+            if str(download_id) not in self.entries:
+                return False
+            file_path = self._pop_locked(str(download_id), "served" if served else None)
+
+        self._remove_files([file_path])
+        return True
+
+    def sweep(self):
+        now = time.monotonic()
+        with self.lock:
+            expired_ids = [
+                download_id
+                for download_id, entry in self.entries.items()
+                if entry["expires_at"] <= now
+            ]
+            removed_paths = [
+                self._pop_locked(download_id, "expired") for download_id in expired_ids
+            ]
+            removed_paths.extend(self._enforce_quota_locked())
+
+        self._remove_files(removed_paths)
+        return len(removed_paths)
+
+    def stats(self):
+        with self.lock:
+            oldest = next(iter(self.entries.values()), None)
+            return {
+                "files": len(self.entries),
+                "bytes_held": self.bytes_held,
+                "quota_bytes": self.quota_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "oldest_generated_at": oldest["info"].get("generated_at") if oldest else None,
+                **self.counters,
+            }
+
+    def cache_size(self):
+        stats = self.stats()
+        return {"files": stats["files"], "bytes_held": stats["bytes_held"]}
+
+    def collect_metrics(self):
+        stats = self.stats()
+        return [
+            (
+                "esi_downloads_held_bytes",
+                "gauge",
+                "Bytes em arquivos temporarios aguardando download.",
+                [({}, stats["bytes_held"])],
+            ),
+            (
+                "esi_downloads_files",
+                "gauge",
+                "Arquivos temporarios aguardando download.",
+                [({}, stats["files"])],
+            ),
+            (
+                "esi_downloads_total",
+                "counter",
+                "Arquivos registrados, servidos, expirados ou removidos pela cota.",
+                [
+                    ({"event": event}, stats[event])
+                    for event in ("registered", "served", "expired", "evicted")
+                ],
+            ),
+        ]
+
+    def _pop_locked(self, download_id, counter=None):
+        entry = self.entries.pop(download_id)
+        self.bytes_held -= int(entry["info"].get("size") or 0)
+        if counter:
+            self.counters[counter] += 1
+        return entry["info"].get("file_path")
+
+    def _enforce_quota_locked(self, keep_id=None):
+        removed_paths = []
+        if not self.quota_bytes:
+            return removed_paths
+
+        # Remove os mais antigos primeiro; o arquivo recem-registrado sempre fica.
+        while self.bytes_held > self.quota_bytes and len(self.entries) > 1:
+            oldest_id = next(iter(self.entries))
+            if oldest_id == keep_id:
+                break
+            removed_paths.append(self._pop_locked(oldest_id, "evicted"))
+        return removed_paths
+
+    def _remove_files(self, file_paths):
+        for file_path in file_paths:
+            if not file_path:
+                continue
+            try:
+                os.unlink(file_path)
+            except FileNotFoundError:
+                pass
+            except OSError as exc:
+                print(f" Falha ao remover download temporario {file_path}: {exc}")
+
+    def _ensure_sweeper(self):
+        # Recria a thread se ela morreu por qualquer motivo.
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        with self.lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop,
+                name="download-registry-sweeper",
+                daemon=True,
+            )
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as exc:
+                print(f" Erro na limpeza de downloads temporarios: {exc}")
+
+
+download_registry = DownloadRegistry(
+    ttl_seconds=int(os.environ.get("ESI_DOWNLOAD_TTL_SECONDS", "1800") or 1800),
+    quota_bytes=int(os.environ.get("ESI_DOWNLOAD_QUOTA_MB", "200") or 200) * 1024 * 1024,
+    sweep_interval=int(os.environ.get("ESI_DOWNLOAD_SWEEP_SECONDS", "60") or 60),
+)
+metrics_registry.register_collector(download_registry.collect_metrics)
+memory_diagnostics.register_cache_size("downloads", download_registry.cache_size)
@@ -2,26 +2,14 @@
 
 from __future__ import annotations
 
-import base64
-import json
 import os
-import smtplib
 import shutil
 import tempfile
 import time
 import zipfile
-from email.message import EmailMessage
 from email.utils import formataddr
 from html import escape as html_escape
 from pathlib import Path
-from urllib import error as urllib_error
-from urllib import request as urllib_request
-
-from servidor_modules.handlers.word_handler import WordHandler
-from servidor_modules.utils.admin_email_config import (
-    AdminEmailConfigStore,
-    is_valid_email,
-)
 
 
 def normalize_smtp_secret(sender_email, token):
@@ -124,73 +112,6 @@ def convert_message_to_simple_html(message_text):
     return "".join(f"<p>{html_escape(line) or '&nbsp;'}</p>" for line in lines)
 
 
-def send_via_resend(destino, assunto, mensagem, sender_email, sender_name, attachments=None):
-    """Envia email via Resend como fallback HTTP."""
-    api_key = get_resend_api_key()
-    if not api_key:
-        raise RuntimeError("API key do Resend não configurada.")
-
-    destination = str(destino or "").strip()
-    if not is_valid_email(destination):
-        raise ValueError("Endereço de email de destino inválido")
-
-    resend_payload = {
-        "from": build_resend_sender(sender_email, sender_name),
-        "to": [destination],
-        "subject": str(assunto or "").strip() or "Exportação de obra",
-        "text": str(mensagem or "").strip() or "Segue arquivo em anexo.",
-        "html": convert_message_to_simple_html(mensagem),
-    }
-
-    reply_to_email = str(sender_email or "").strip()
-    if reply_to_email and is_valid_email(reply_to_email):
-        resend_payload["reply_to"] = reply_to_email
-
-    normalized_attachments = normalize_attachment_files(attachments)
-    if normalized_attachments:
-        resend_payload["attachments"] = []
-        for attachment in normalized_attachments:
-            file_path = Path(str(attachment.get("path") or ""))
-            filename = str(attachment.get("filename") or file_path.name).strip() or file_path.name
-            file_bytes = read_verified_attachment_bytes(file_path)
-            resend_payload["attachments"].append(
-                {
-                    "filename": filename,
-                    "content": base64.b64encode(file_bytes).decode("ascii"),
-                }
-            )
-
-    request_body = json.dumps(resend_payload).encode("utf-8")
-    request_obj = urllib_request.Request(
-        "https://api.resend.com/emails",
-        data=request_body,
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-            "User-Agent": "app-esienergia/1.0",
-        },
-        method="POST",
-    )
-
-    try:
-        with urllib_request.urlopen(request_obj, timeout=30) as response:
-            response_body = response.read().decode("utf-8", errors="replace")
-            parsed_response = json.loads(response_body or "{}")
-            if response.status < 200 or response.status >= 300:
-                raise RuntimeError(
-                    f"Resend respondeu com status {response.status}: {response_body}"
-                )
-            return parsed_response
-    except urllib_error.HTTPError as exc:
-        response_body = exc.read().decode("utf-8", errors="replace")
-        raise RuntimeError(
-            f"Resend rejeitou a requisição ({exc.code}): {response_body}"
-        ) from exc
-    except urllib_error.URLError as exc:
-        raise RuntimeError(f"Falha de rede ao conectar no Resend: {exc}") from exc
-
-
 def cleanup_temp_files(*paths):
     """Remove arquivos temporários silenciosamente."""
     for path in paths:
@@ -252,26 +173,46 @@ def read_verified_attachment_bytes(file_path, max_attempts=5, wait_seconds=0.25)
     )
 
 
+# Formatos que ja sao compactados (DOCX/XLSX sao ZIPs): armazenar sem recomprimir.
+ALREADY_COMPRESSED_SUFFIXES = {
+    ".docx",
+    ".xlsx",
+    ".pptx",
+    ".zip",
+    ".pdf",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gz",
+}
+ZIP_COPY_CHUNK_SIZE = 256 * 1024
+
+
 def duplicate_temp_file(source_path, output_filename=None):
     """Cria uma cópia temporária de um arquivo para uso paralelo em jobs distintos."""
     source = Path(source_path)
     if not source.exists():
         raise FileNotFoundError("Arquivo temporário não encontrado para duplicação")
 
-    source_bytes = read_verified_attachment_bytes(source)
     suffix = source.suffix or ".tmp"
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp_file:
-        tmp_file.write(source_bytes)
-        tmp_file.flush()
-        os.fsync(tmp_file.fileno())
-        duplicate_path = tmp_file.name
-
-    duplicate_size = Path(duplicate_path).stat().st_size
-    if duplicate_size != len(source_bytes):
+    with open(source, "rb") as source_file:
+        source_size = os.fstat(source_file.fileno()).st_size
+        if source_size <= 0:
+            raise RuntimeError(
+                f"Arquivo de anexo vazio ou ainda não finalizado: {source}"
+            )
+
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp_file:
+            duplicate_path = tmp_file.name
+            shutil.copyfileobj(source_file, tmp_file, ZIP_COPY_CHUNK_SIZE)
+            tmp_file.flush()
+            duplicate_size = os.fstat(tmp_file.fileno()).st_size
+
+    if duplicate_size != source_size:
         cleanup_temp_files(duplicate_path)
         raise RuntimeError(
             "Falha ao criar cópia íntegra do anexo para envio: "
-            f"{source.name} (origem={len(source_bytes)}, copia={duplicate_size})"
+            f"{source.name} (origem={source_size}, copia={duplicate_size})"
         )
 
     try:
@@ -348,6 +289,41 @@ def normalize_attachment_files(files):
     return normalized_files
 
 
+def write_zip_entry_from_file(zip_file, file_path, arcname):
+    """Grava um arquivo no ZIP em blocos, validando o tamanho uma única vez via fstat."""
+    source_path = Path(file_path)
+    with open(source_path, "rb") as source:
+        file_stat = os.fstat(source.fileno())
+        if file_stat.st_size <= 0:
+            raise RuntimeError(
+                f"Arquivo de anexo vazio ou ainda não finalizado: {source_path}"
+            )
+
+        zip_info = zipfile.ZipInfo(arcname, date_time=time.localtime(file_stat.st_mtime)[:6])
+        zip_info.file_size = file_stat.st_size
+        zip_info.compress_type = (
+            zipfile.ZIP_STORED
+            if Path(arcname).suffix.lower() in ALREADY_COMPRESSED_SUFFIXES
+            else zipfile.ZIP_DEFLATED
+        )
+
+        copied_size = 0
+        with zip_file.open(zip_info, "w") as target:
+            while True:
+                chunk = source.read(ZIP_COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                target.write(chunk)
+                copied_size += len(chunk)
+
+    if copied_size != file_stat.st_size:
+        raise RuntimeError(
+            "Leitura inconsistente do anexo: "
+            f"{source_path} (lido={copied_size}, esperado={file_stat.st_size})"
+        )
+    return copied_size
+
+
 def create_zip_bundle(files, output_filename=None):
     """Compacta anexos em um ZIP temporário para envio íntegro por email."""
     normalized_files = normalize_attachment_files(files)
@@ -371,8 +347,7 @@ def create_zip_bundle(files, output_filename=None):
             for file_info in normalized_files:
                 file_path = Path(str(file_info.get("path") or ""))
                 filename = str(file_info.get("filename") or file_path.name).strip() or file_path.name
-                file_bytes = read_verified_attachment_bytes(file_path)
-                zip_file.writestr(filename, file_bytes)
+                write_zip_entry_from_file(zip_file, file_path, filename)
 
         if Path(zip_path).stat().st_size <= 0:
             raise RuntimeError("Falha ao gerar ZIP temporário para envio por email")
@@ -407,165 +382,27 @@ def prepare_email_attachments(attachment_files):
     return [build_export_file(zip_path, bundle_name, "zip_bundle")], [zip_path]
 
 
-def enviar_email(destino, assunto, mensagem, attachment_files=None):
-    """Envia um email usando a configuração SMTP do ADM."""
-    config_store = AdminEmailConfigStore()
-    config = config_store.load()
-
-    if not config_store.is_configured(config):
-        raise RuntimeError("Configuração SMTP do ADM não encontrada")
-
-    destination = str(destino or "").strip()
-    if not is_valid_email(destination):
-        raise ValueError("Endereço de email de destino inválido")
-
-    attachments = normalize_attachment_files(attachment_files)
-
-    resend_error = None
-    sender_email = str(config.get("email") or "").strip()
-    sender_name = str(config.get("nome") or "").strip() or sender_email
-
-    if get_resend_api_key():
-        try:
-            send_via_resend(
-                destino=destination,
-                assunto=str(assunto or "").strip() or "Exportação de obra",
-                mensagem=mensagem,
-                sender_email=sender_email,
-                sender_name=sender_name,
-                attachments=attachments,
-            )
-            return
-        except Exception as exc:
-            resend_error = exc
-            print(" Aviso Resend:", exc)
-
-    smtp_settings = config_store.resolve_smtp_settings(config)
-    host = str(smtp_settings.get("host") or "").strip()
-    port = int(smtp_settings.get("port") or 587)
-    use_tls = bool(smtp_settings.get("use_tls", True))
-
-    if not host:
-        if resend_error is not None:
-            raise RuntimeError(
-                "Falha no envio via Resend e nenhum servidor SMTP foi configurado."
-            ) from resend_error
-        raise RuntimeError("Não foi possível resolver o servidor SMTP")
-
-    sender_email = str(config.get("email") or "").strip()
-    sender_name = str(config.get("nome") or "").strip() or sender_email
-
-    message = EmailMessage()
-    message["Subject"] = str(assunto or "").strip() or "Exportação de obra"
-    message["From"] = formataddr((sender_name, sender_email))
-    message["To"] = destination
-    message.set_content(str(mensagem or "").strip() or "Segue arquivo em anexo.")
-
-    for attachment in attachments:
-        file_path = Path(str(attachment.get("path") or ""))
-        filename = str(attachment.get("filename") or file_path.name).strip() or file_path.name
-        suffix = file_path.suffix.lower()
-        subtype = "octet-stream"
-        file_bytes = read_verified_attachment_bytes(file_path)
-
-        if suffix == ".docx":
-            subtype = "vnd.openxmlformats-officedocument.wordprocessingml.document"
-        elif suffix == ".zip":
-            subtype = "zip"
-
-        message.add_attachment(
-            file_bytes,
-            maintype="application",
-            subtype=subtype,
-            filename=filename,
-            cte="base64",
-        )
-
-    smtp_token = validate_smtp_secret(sender_email, config.get("token") or "")
-    smtp_candidates = build_smtp_connection_candidates(host, port, use_tls, sender_email)
-    last_error = None
-
-    for smtp_candidate in smtp_candidates:
-        smtp_client = None
-        try:
-            if smtp_candidate["use_ssl"]:
-                smtp_client = smtplib.SMTP_SSL(
-                    smtp_candidate["host"],
-                    smtp_candidate["port"],
-                    timeout=30,
-                )
-            else:
-                smtp_client = smtplib.SMTP(
-                    smtp_candidate["host"],
-                    smtp_candidate["port"],
-                    timeout=30,
-                )
-                smtp_client.ehlo()
-                if smtp_candidate["use_tls"]:
-                    smtp_client.starttls()
-                    smtp_client.ehlo()
-
-            smtp_client.login(sender_email, smtp_token)
-            smtp_client.send_message(message)
-            return
-        except smtplib.SMTPAuthenticationError as exc:
-            last_error = exc
-        except Exception as exc:
-            last_error = exc
-            print(
-                " Aviso SMTP:",
-                smtp_candidate["label"],
-                smtp_candidate["host"],
-                smtp_candidate["port"],
-                exc,
-            )
-        finally:
-            if smtp_client is not None:
-                try:
-                    smtp_client.quit()
-                except Exception:
-                    pass
-
-    if False and get_resend_api_key():
-        try:
-            send_via_resend(
-                destino=destination,
-                assunto=message["Subject"],
-                mensagem=mensagem,
-                sender_email=sender_email,
-                sender_name=sender_name,
-                attachments=attachments,
-            )
-            return
-        except Exception as exc:
-            resend_error = exc
-            print(" Aviso Resend fallback:", exc)
-
-    if isinstance(last_error, smtplib.SMTPAuthenticationError):
-        domain = sender_email.split("@", 1)[1].lower() if "@" in sender_email else ""
-        if domain in {"gmail.com", "googlemail.com"}:
-            raise RuntimeError(
-                "Gmail rejeitou a autenticação SMTP. Verifique se o App Password está correto e se a conta usa verificação em duas etapas."
-            ) from last_error
-        raise RuntimeError("Credenciais SMTP rejeitadas pelo provedor de email.") from last_error
+def enviar_email(destino, assunto, mensagem, attachment_files=None, em_lote=False):
+    """Envia um email usando a configuração SMTP do ADM.
 
-    if resend_error is not None:
-        raise RuntimeError(
-            f"Falha no envio por SMTP ({host}:{port}) e tambem no fallback Resend."
-        ) from resend_error
+    Com ``em_lote``, envios simultâneos saem juntos pela mesma conexão.
+    """
+    from servidor_modules.utils.mail_transport import mail_transport
 
-    if last_error is not None:
-        raise RuntimeError(f"Falha ao conectar ao servidor SMTP ({host}:{port}).") from last_error
+    if em_lote:
+        mail_transport.send_queued(destino, assunto, mensagem, attachment_files)
+    else:
+        mail_transport.send(destino, assunto, mensagem, attachment_files)
 
 
-def enviar_email_com_anexos(destino, assunto, mensagem, attachment_files):
+def enviar_email_com_anexos(destino, assunto, mensagem, attachment_files, em_lote=False):
     """Envia um email com anexos diretos usando a configuração SMTP do ADM."""
     attachments, temp_paths = prepare_email_attachments(attachment_files)
     if not attachments:
         raise FileNotFoundError("Nenhum arquivo válido encontrado para envio")
 
     try:
-        return enviar_email(destino, assunto, mensagem, attachments)
+        return enviar_email(destino, assunto, mensagem, attachments, em_lote=em_lote)
     finally:
         cleanup_temp_files(*temp_paths)
 
@@ -595,6 +432,9 @@ def prepare_export_assets(project_root, file_utils, obra_id, formato, need_downl
     if export_format not in {"pc", "pt", "ambos"}:
         raise ValueError("Formato de exportação inválido")
 
+    # A pilha Word (docxtpl/Jinja2/python-docx) so e carregada na primeira exportacao.
+    from servidor_modules.handlers.word_handler import WordHandler
+
     word_handler = WordHandler(project_root, file_utils)
     obra_data = word_handler.get_obra_data(obra_id)
 
@@ -0,0 +1,545 @@
+"""Transporte de email reutilizavel: configuracao em cache e conexoes SMTP/HTTPS persistentes."""
+
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import smtplib
+import threading
+import time
+from base64 import b64encode
+from email.message import EmailMessage
+from email.utils import formataddr
+from pathlib import Path
+
+from servidor_modules.utils.admin_email_config import AdminEmailConfigStore, is_valid_email
+from servidor_modules.utils.export_utils import (
+    build_resend_sender,
+    build_smtp_connection_candidates,
+    convert_message_to_simple_html,
+    get_resend_api_key,
+    normalize_attachment_files,
+    read_verified_attachment_bytes,
+    validate_smtp_secret,
+)
+from servidor_modules.utils.metrics import email_send_duration_seconds
+
+
+RESEND_HOST = "api.resend.com"
+RESEND_CHUNK_SIZE = 3 * 64 * 1024
+RESEND_ATTACHMENTS_PLACEHOLDER = "__esi_attachments__"
+
+
+class MailTransport:
+    def __init__(
+        self,
+        config_ttl_seconds=300,
+        idle_seconds=120,
+        timeout=30,
+        config_store_factory=None,
+        smtp_auth=True,
+    ):
+        self.config_ttl_seconds = max(int(config_ttl_seconds), 0)
+        self.idle_seconds = max(int(idle_seconds), 5)
+        self.timeout = timeout
+        self.config_store_factory = config_store_factory or AdminEmailConfigStore
+        # Desligar o login so faz sentido contra servidores de teste sem AUTH.
+        self.smtp_auth = bool(smtp_auth)
+        self._config_lock = threading.Lock()
+        self._config_cache = None
+        self._smtp_lock = threading.Lock()
+        self._smtp_client = None
+        self._smtp_key = None
+        self._smtp_last_used = 0.0
+        self._http_lock = threading.Lock()
+        self._http_conn = None
+        self._http_last_used = 0.0
+        self._queue_lock = threading.Lock()
+        self._queue = []
+        self._draining = False
+
+    def resolve_config(self):
+        with self._config_lock:
+            cached = self._config_cache
+            if cached and time.monotonic() - cached["loaded_at"] < self.config_ttl_seconds:
+                return cached
+
+            config_store = self.config_store_factory()
+            config = config_store.load()
+            if not config_store.is_configured(config):
+                raise RuntimeError("Configuração SMTP do ADM não encontrada")
+
+            sender_email = str(config.get("email") or "").strip()
+            self._config_cache = {
+                "loaded_at": time.monotonic(),
+                "config": config,
+                "sender_email": sender_email,
+                "sender_name": str(config.get("nome") or "").strip() or sender_email,
+                "smtp": config_store.resolve_smtp_settings(config),
+            }
+            return self._config_cache
+
+    def invalidate_config(self):
+        with self._config_lock:
+            self._config_cache = None
+        self.close()
+
+    def close(self):
+        with self._smtp_lock:
+            self._close_smtp_locked()
+        with self._http_lock:
+            self._close_http_locked()
+
+    def send(self, destino, assunto, mensagem, attachment_files=None):
+        result = self.send_batch(
+            [
+                {
+                    "destino": destino,
+                    "assunto": assunto,
+                    "mensagem": mensagem,
+                    "attachments": attachment_files,
+                }
+            ]
+        )[0]
+        if result["error"] is not None:
+            raise result["error"]
+
+    def send_queued(self, destino, assunto, mensagem, attachment_files=None):
+        """Envia pela fila: mensagens enfileiradas ao mesmo tempo saem em um unico lote.
+
+        Quem encontra a fila parada envia os lotes ate ela esvaziar; os demais
+        apenas esperam o proprio resultado.
+        """
+        entry = {
+            "message": {
+                "destino": destino,
+                "assunto": assunto,
+                "mensagem": mensagem,
+                "attachments": attachment_files,
+            },
+            "done": threading.Event(),
+            "result": None,
+        }
+        with self._queue_lock:
+            self._queue.append(entry)
+            drain = not self._draining
+            self._draining = True
+
+        if drain:
+            self._drain_queue()
+        entry["done"].wait()
+        if entry["result"]["error"] is not None:
+            raise entry["result"]["error"]
+
+    def _drain_queue(self):
+        while True:
+            with self._queue_lock:
+                batch, self._queue = self._queue, []
+                if not batch:
+                    self._draining = False
+                    return
+
+            try:
+                results = self.send_batch([entry["message"] for entry in batch])
+            except Exception as exc:
+                results = [{"error": exc} for _ in batch]
+            for entry, result in zip(batch, results):
+                entry["result"] = result
+                entry["done"].set()
+
+    def send_batch(self, messages):
+        """Envia varias mensagens reaproveitando a mesma conexao."""
+        resolved = self.resolve_config()
+        results = []
+        pending = []
+
+        for message in messages or []:
+            destination = str(message.get("destino") or "").strip()
+            result = {"destino": destination, "success": False, "transport": "", "error": None}
+            results.append(result)
+            if not is_valid_email(destination):
+                result["error"] = ValueError("Endereço de email de destino inválido")
+                continue
+
+            pending.append(
+                (
+                    result,
+                    {
+                        "destino": destination,
+                        "assunto": str(message.get("assunto") or "").strip()
+                        or "Exportação de obra",
+                        "mensagem": message.get("mensagem"),
+                        "attachments": normalize_attachment_files(message.get("attachments")),
+                    },
+                )
+            )
+
+        resend_errors = {}
+        if pending and get_resend_api_key():
+            remaining = []
+            with self._http_lock:
+                for result, message in pending:
+                    started_at = time.perf_counter()
+                    try:
+                        self._send_resend_locked(message, resolved)
+                        result.update(success=True, transport="resend")
+                    except Exception as exc:
+                        print(" Aviso Resend:", exc)
+                        resend_errors[id(result)] = exc
+                        remaining.append((result, message))
+                    email_send_duration_seconds.observe(
+                        time.perf_counter() - started_at,
+                        "resend",
+                        "ok" if result["success"] else "error",
+                    )
+            pending = remaining
+
+        if pending:
+            secret_error = None
+            if str(resolved["smtp"].get("host") or "").strip():
+                try:
+                    validate_smtp_secret(
+                        resolved["sender_email"], resolved["config"].get("token") or ""
+                    )
+                except Exception as exc:
+                    secret_error = exc
+
+            with self._smtp_lock:
+                for result, message in pending:
+                    if secret_error is not None:
+                        result["error"] = secret_error
+                        continue
+                    started_at = time.perf_counter()
+                    try:
+                        self._send_smtp_locked(message, resolved)
+                        result.update(success=True, transport="smtp")
+                    except Exception as exc:
+                        result["error"] = self._describe_smtp_failure(
+                            exc,
+                            resolved,
+                            resend_errors.get(id(result)),
+                        )
+                    email_send_duration_seconds.observe(
+                        time.perf_counter() - started_at,
+                        "smtp",
+                        "ok" if result["success"] else "error",
+                    )
+
+        return results
+
+    def _send_resend_locked(self, message, resolved):
+        payload = {
+            "from": build_resend_sender(resolved["sender_email"], resolved["sender_name"]),
+            "to": [message["destino"]],
+            "subject": message["assunto"],
+            "text": str(message["mensagem"] or "").strip() or "Segue arquivo em anexo.",
+            "html": convert_message_to_simple_html(message["mensagem"]),
+        }
+        reply_to_email = resolved["sender_email"]
+        if reply_to_email and is_valid_email(reply_to_email):
+            payload["reply_to"] = reply_to_email
+        if message["attachments"]:
+            payload["attachments"] = RESEND_ATTACHMENTS_PLACEHOLDER
+
+        headers = {
+            "Authorization": f"Bearer {get_resend_api_key()}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "User-Agent": "app-esienergia/1.0",
+        }
+
+        for attempt in range(2):
+            reused = self._http_conn is not None
+            conn = self._get_http_conn_locked()
+            parts, content_length = self._build_resend_body(payload, message["attachments"])
+            try:
+                conn.request(
+                    "POST",
+                    "/emails",
+                    body=parts,
+                    headers={**headers, "Content-Length": str(content_length)},
+                )
+                response = conn.getresponse()
+                response_body = response.read().decode("utf-8", errors="replace")
+            except (http.client.RemoteDisconnected, ConnectionError) as exc:
+                self._close_http_locked()
+                # Conexao keep-alive derrubada pelo servidor: repete uma vez.
+                if reused and attempt == 0:
+                    continue
+                raise RuntimeError(f"Falha de rede ao conectar no Resend: {exc}") from exc
+            except Exception:
+                self._close_http_locked()
+                raise
+
+            self._http_last_used = time.monotonic()
+            if response.will_close:
+                self._close_http_locked()
+            if response.status < 200 or response.status >= 300:
+                raise RuntimeError(
+                    f"Resend rejeitou a requisição ({response.status}): {response_body}"
+                )
+            return json.loads(response_body or "{}")
+
+    def _build_resend_body(self, payload, attachments):
+        """Monta o corpo JSON em partes, codificando anexos em base64 por blocos."""
+        serialized = json.dumps(payload, ensure_ascii=False)
+        if not attachments:
+            body = serialized.encode("utf-8")
+            return body, len(body)
+
+        head, tail = serialized.split(json.dumps(RESEND_ATTACHMENTS_PLACEHOLDER), 1)
+        sized_parts = [head.encode("utf-8") + b"["]
+        content_length = len(sized_parts[0])
+
+        for index, attachment in enumerate(attachments):
+            file_path = Path(str(attachment.get("path") or ""))
+            filename = str(attachment.get("filename") or file_path.name).strip() or file_path.name
+            file_size = file_path.stat().st_size
+            if file_size <= 0:
+                raise RuntimeError(
+                    f"Arquivo de anexo vazio ou ainda não finalizado: {file_path}"
+                )
+
+            opening = (
+                ("," if index else "")
+                + '{"filename": '
+                + json.dumps(filename, ensure_ascii=False)
+                + ', "content": "'
+            ).encode("utf-8")
+            sized_parts.extend([opening, (file_path, file_size), b'"}'])
+            content_length += len(opening) + 4 * ((file_size + 2) // 3) + 2
+
+        closing = b"]" + tail.encode("utf-8")
+        sized_parts.append(closing)
+        content_length += len(closing)
+
+        def iter_parts():
+            for part in sized_parts:
+                if isinstance(part, bytes):
+                    yield part
+                    continue
+
+                file_path, expected_size = part
+                read_size = 0
+                with open(file_path, "rb") as file_obj:
+                    while True:
+                        chunk = file_obj.read(RESEND_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        read_size += len(chunk)
+                        yield b64encode(chunk)
+                if read_size != expected_size:
+                    raise RuntimeError(
+                        "Leitura inconsistente do anexo: "
+                        f"{file_path} (lido={read_size}, esperado={expected_size})"
+                    )
+
+        return iter_parts(), content_length
+
+    def _get_http_conn_locked(self):
+        if (
+            self._http_conn is not None
+            and time.monotonic() - self._http_last_used > self.idle_seconds
+        ):
+            self._close_http_locked()
+
+        if self._http_conn is None:
+            self._http_conn = http.client.HTTPSConnection(RESEND_HOST, timeout=self.timeout)
+            self._http_last_used = time.monotonic()
+        return self._http_conn
+
+    def _close_http_locked(self):
+        if self._http_conn is not None:
+            try:
+                self._http_conn.close()
+            except Exception:
+                pass
+        self._http_conn = None
+
+    def _send_smtp_locked(self, message, resolved):
+        email_message = self._build_email_message(message, resolved)
+        smtp_key = self._smtp_key_for(resolved)
+
+        smtp_client = self._reusable_smtp_client_locked(smtp_key)
+        if smtp_client is not None:
+            try:
+                smtp_client.send_message(email_message)
+                self._smtp_last_used = time.monotonic()
+                return
+            except Exception:
+                # Conexao reaproveitada derrubada ou recusada: recomeca pelos candidatos.
+                pass
+        self._close_smtp_locked()
+
+        # Como no envio original, falha na conexao, no login ou no envio passa
+        # para o proximo candidato (ex.: fallback SSL do Gmail).
+        host, port, use_tls, sender_email = smtp_key
+        smtp_token = validate_smtp_secret(sender_email, resolved["config"].get("token") or "")
+        last_error = None
+        for smtp_candidate in build_smtp_connection_candidates(host, port, use_tls, sender_email):
+            try:
+                smtp_client = self._connect_smtp_locked(
+                    smtp_candidate, sender_email, smtp_token, smtp_key
+                )
+                smtp_client.send_message(email_message)
+                self._smtp_last_used = time.monotonic()
+                return
+            except smtplib.SMTPAuthenticationError as exc:
+                last_error = exc
+            except Exception as exc:
+                last_error = exc
+                print(
+                    " Aviso SMTP:",
+                    smtp_candidate["label"],
+                    smtp_candidate["host"],
+                    smtp_candidate["port"],
+                    exc,
+                )
+            self._close_smtp_locked()
+
+        raise last_error or RuntimeError("Não foi possível resolver o servidor SMTP")
+
+    def _build_email_message(self, message, resolved):
+        email_message = EmailMessage()
+        email_message["Subject"] = message["assunto"]
+        email_message["From"] = formataddr((resolved["sender_name"], resolved["sender_email"]))
+        email_message["To"] = message["destino"]
+        email_message.set_content(
+            str(message["mensagem"] or "").strip() or "Segue arquivo em anexo."
+        )
+
+        for attachment in message["attachments"]:
+            file_path = Path(str(attachment.get("path") or ""))
+            filename = str(attachment.get("filename") or file_path.name).strip() or file_path.name
+            suffix = file_path.suffix.lower()
+            subtype = "octet-stream"
+            if suffix == ".docx":
+                subtype = "vnd.openxmlformats-officedocument.wordprocessingml.document"
+            elif suffix == ".zip":
+                subtype = "zip"
+
+            email_message.add_attachment(
+                read_verified_attachment_bytes(file_path),
+                maintype="application",
+                subtype=subtype,
+                filename=filename,
+                cte="base64",
+            )
+
+        return email_message
+
+    def _smtp_key_for(self, resolved):
+        smtp_settings = resolved["smtp"]
+        host = str(smtp_settings.get("host") or "").strip()
+        if not host:
+            raise RuntimeError("Não foi possível resolver o servidor SMTP")
+        return (
+            host,
+            int(smtp_settings.get("port") or 587),
+            bool(smtp_settings.get("use_tls", True)),
+            resolved["sender_email"],
+        )
+
+    def _reusable_smtp_client_locked(self, smtp_key):
+        if self._smtp_client is None or self._smtp_key != smtp_key:
+            return None
+        if time.monotonic() - self._smtp_last_used > self.idle_seconds:
+            return None
+        try:
+            if self._smtp_client.noop()[0] == 250:
+                return self._smtp_client
+        except Exception:
+            pass
+        return None
+
+    def _connect_smtp_locked(self, smtp_candidate, sender_email, smtp_token, smtp_key):
+        """Conecta e autentica em um candidato; a conexao fica guardada para reuso."""
+        smtp_client = None
+        try:
+            if smtp_candidate["use_ssl"]:
+                smtp_client = smtplib.SMTP_SSL(
+                    smtp_candidate["host"],
+                    smtp_candidate["port"],
+                    timeout=self.timeout,
+                )
+            else:
+                smtp_client = smtplib.SMTP(
+                    smtp_candidate["host"],
+                    smtp_candidate["port"],
+                    timeout=self.timeout,
+                )
+                smtp_client.ehlo()
+                if smtp_candidate["use_tls"]:
+                    smtp_client.starttls()
+                    smtp_client.ehlo()
+
+            if self.smtp_auth:
+                smtp_client.login(sender_email, smtp_token)
+        except Exception:
+            if smtp_client is not None:
+                try:
+                    smtp_client.quit()
+                except Exception:
+                    pass
+            raise
+
+        self._smtp_client = smtp_client
+        self._smtp_key = smtp_key
+        self._smtp_last_used = time.monotonic()
+        return smtp_client
+
+    def _close_smtp_locked(self):
+        if self._smtp_client is not None:
+            try:
+                self._smtp_client.quit()
+            except Exception:
+                pass
+        self._smtp_client = None
+        self._smtp_key = None
+
+    def _describe_smtp_failure(self, exc, resolved, resend_error=None):
+        smtp_settings = resolved["smtp"]
+        host = str(smtp_settings.get("host") or "").strip()
+        port = int(smtp_settings.get("port") or 587)
+        sender_email = resolved["sender_email"]
+
+        if isinstance(exc, ValueError):
+            return exc
+
+        if not host:
+            if resend_error is not None:
+                error = RuntimeError(
+                    "Falha no envio via Resend e nenhum servidor SMTP foi configurado."
+                )
+                error.__cause__ = resend_error
+                return error
+            return exc
+
+        if isinstance(exc, smtplib.SMTPAuthenticationError):
+            domain = sender_email.split("@", 1)[1].lower() if "@" in sender_email else ""
+            if domain in {"gmail.com", "googlemail.com"}:
+                error = RuntimeError(
+                    "Gmail rejeitou a autenticação SMTP. Verifique se o App Password está correto e se a conta usa verificação em duas etapas."
+                )
+            else:
+                error = RuntimeError("Credenciais SMTP rejeitadas pelo provedor de email.")
+            error.__cause__ = exc
+            return error
+
+        if resend_error is not None:
+            error = RuntimeError(
+                f"Falha no envio por SMTP ({host}:{port}) e tambem no fallback Resend."
+            )
+            error.__cause__ = resend_error
+            return error
+
+        error = RuntimeError(f"Falha ao conectar ao servidor SMTP ({host}:{port}).")
+        error.__cause__ = exc
+        return error
+
+
+mail_transport = MailTransport(
+    config_ttl_seconds=int(os.environ.get("ESI_MAIL_CONFIG_TTL_SECONDS", "300") or 300),
+    idle_seconds=int(os.environ.get("ESI_MAIL_IDLE_SECONDS", "120") or 120),
+)
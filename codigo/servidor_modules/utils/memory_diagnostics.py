@@ -0,0 +1,228 @@
+"""Diagnostico de memoria do processo com tracemalloc."""
+
+from __future__ import annotations
+
+import gc
+import os
+import sys
+import threading
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime
+from uuid import uuid4
+
+GROUP_BY_OPTIONS = {"lineno", "filename", "traceback"}
+
+
+def read_rss_bytes():
+    """RSS atual do processo; usa o pico do getrusage fora do Linux."""
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as file_obj:
+            for line in file_obj:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reporta bytes, Linux reporta KB.
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def _format_stat(stat):
+    frame = stat.traceback[0]
+    return {
+        "file": frame.filename,
+        "line": frame.lineno,
+        "size_bytes": stat.size,
+        "count": stat.count,
+        "traceback": [f"{item.filename}:{item.lineno}" for item in stat.traceback],
+    }
+
+
+def _format_diff(stat):
+    return {
+        **_format_stat(stat),
+        "size_diff_bytes": stat.size_diff,
+        "count_diff": stat.count_diff,
+    }
+
+
+class MemoryDiagnostics:
+    def __init__(self, max_snapshots=10, default_frames=1):
+        self.max_snapshots = max(int(max_snapshots), 1)
+        self.default_frames = max(int(default_frames), 1)
+        self.lock = threading.Lock()
+        self.snapshots = OrderedDict()
+        self.cache_size_providers = OrderedDict()
+        self.started_at = None
+        self.frames = None
+
+    def start(self, frames=None):
+        frames = min(max(int(frames or self.default_frames), 1), 25)
+        with self.lock:
+            if tracemalloc.is_tracing():
+                return False
+            tracemalloc.start(frames)
+            self.started_at = datetime.now().isoformat()
+            self.frames = frames
+        print(f" tracemalloc iniciado ({frames} frame(s))")
+        return True
+
+    def stop(self):
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                return False
+            tracemalloc.stop()
+            # Snapshots antigos ficam para comparacao, mas nao ha como tirar novos.
+            self.started_at = None
+            self.frames = None
+        print(" tracemalloc parado")
+        return True
+
+    def take_snapshot(self, label=None, limit=15):
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc nao esta ativo")
+
+        snapshot = self._filtered(tracemalloc.take_snapshot())
+        current, peak = tracemalloc.get_traced_memory()
+        entry = {
+            "id": uuid4().hex[:12],
+            "label": str(label or "").strip() or None,
+            "created_at": datetime.now().isoformat(),
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "rss_bytes": read_rss_bytes(),
+            "snapshot": snapshot,
+        }
+        with self.lock:
+            self.snapshots[entry["id"]] = entry
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+
+        return {
+            **self._public_snapshot(entry),
+            "top": [
+                _format_stat(stat)
+                for stat in snapshot.statistics("lineno")[: self._limit(limit)]
+            ],
+        }
+
+    def diff(self, from_id, to_id=None, group_by="lineno", limit=25):
+        group_by = str(group_by or "lineno").strip().lower()
+        if group_by not in GROUP_BY_OPTIONS:
+            raise ValueError("Agrupamento invalido (use 'lineno', 'filename' ou 'traceback')")
+
+        with self.lock:
+            base = self.snapshots.get(str(from_id or ""))
+            target = self.snapshots.get(str(to_id)) if to_id else None
+        if base is None:
+            raise KeyError("Snapshot inicial nao encontrado")
+        if to_id and target is None:
+            raise KeyError("Snapshot final nao encontrado")
+
+        if target is None:
+            # Sem snapshot final, compara com o estado atual sem guarda-lo.
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc nao esta ativo")
+            target_snapshot = self._filtered(tracemalloc.take_snapshot())
+            target_info = {"id": None, "label": "agora", "created_at": datetime.now().isoformat()}
+        else:
+            target_snapshot = target["snapshot"]
+            target_info = self._public_snapshot(target)
+
+        stats = target_snapshot.compare_to(base["snapshot"], group_by)
+        return {
+            "from": self._public_snapshot(base),
+            "to": target_info,
+            "group_by": group_by,
+            "size_diff_bytes": sum(stat.size_diff for stat in stats),
+            "count_diff": sum(stat.count_diff for stat in stats),
+            "top": [_format_diff(stat) for stat in stats[: self._limit(limit)]],
+        }
+
+    def status(self):
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        with self.lock:
+            snapshots = [self._public_snapshot(entry) for entry in self.snapshots.values()]
+
+        return {
+            "pid": os.getpid(),
+            "rss_bytes": read_rss_bytes(),
+            "tracemalloc": {
+                "tracing": tracing,
+                "started_at": self.started_at,
+                "frames": self.frames,
+                "traced_current_bytes": current,
+                "traced_peak_bytes": peak,
+                "overhead_bytes": tracemalloc.get_tracemalloc_memory() if tracing else 0,
+            },
+            "gc": {
+                "enabled": gc.isenabled(),
+                "thresholds": list(gc.get_threshold()),
+                "pending": list(gc.get_count()),
+                "generations": [
+                    {
+                        "objects": len(gc.get_objects(generation)),
+                        "collections": stats.get("collections", 0),
+                        "collected": stats.get("collected", 0),
+                        "uncollectable": stats.get("uncollectable", 0),
+                    }
+                    for generation, stats in enumerate(gc.get_stats())
+                ],
+                "garbage": len(gc.garbage),
+            },
+            "caches": self.cache_sizes(),
+            "threads": threading.active_count(),
+            "snapshots": snapshots,
+        }
+
+    def register_cache_size(self, name, provider):
+        """Registra uma funcao que devolve o tamanho de um cache em memoria.
+
+        Cada cache se registra ao ser importado, como em metrics_registry.register_collector.
+        """
+        with self.lock:
+            self.cache_size_providers[name] = provider
+
+    def cache_sizes(self):
+        with self.lock:
+            providers = list(self.cache_size_providers.items())
+
+        sizes = {}
+        for name, provider in providers:
+            try:
+                sizes[name] = provider()
+            except Exception as exc:
+                sizes[name] = {"error": str(exc)}
+        return sizes
+
+    def _filtered(self, snapshot):
+        # As alocacoes do proprio tracemalloc poluem o ranking.
+        return snapshot.filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+
+    def _limit(self, limit):
+        try:
+            return min(max(int(limit), 1), 200)
+        except (TypeError, ValueError):
+            return 25
+
+    def _public_snapshot(self, entry):
+        return {key: value for key, value in entry.items() if key != "snapshot"}
+
+
+memory_diagnostics = MemoryDiagnostics(
+    max_snapshots=int(os.environ.get("ESI_MEMORY_MAX_SNAPSHOTS", "10") or 10),
+    default_frames=int(os.environ.get("ESI_TRACEMALLOC_FRAMES", "1") or 1),
+)
@@ -0,0 +1,245 @@
+"""Metricas do processo expostas no formato texto do Prometheus."""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MAX_SERIES_PER_METRIC = 500
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.extend(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        # Um lock por metrica, segurado apenas para atualizar numeros.
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def _key(self, labels):
+        key = tuple(str(value) for value in labels)
+        if len(key) != len(self.label_names):
+            raise ValueError(f"Metrica {self.name} espera labels {self.label_names}")
+        if key not in self.series and len(self.series) >= MAX_SERIES_PER_METRIC:
+            return ("other",) * len(self.label_names)
+        return key
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        with self.lock:
+            snapshot = [(key, self._copy_value(value)) for key, value in self.series.items()]
+        for key, value in sorted(snapshot):
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _copy_value(self, value):
+        return value
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            key = self._key(labels)
+            self.series[key] = self.series.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.series[self._key(labels)] = value
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            key = self._key(labels)
+            self.series[key] = self.series.get(key, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(float(bucket) for bucket in buckets))
+
+    def observe(self, value, *labels):
+        value = float(value)
+        # O bucket e calculado fora do lock.
+        bucket_index = bisect_left(self.buckets, value)
+        with self.lock:
+            key = self._key(labels)
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bucket_index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels):
+        return _HistogramTimer(self, labels)
+
+    def _copy_value(self, value):
+        return [list(value[0]), value[1], value[2]]
+
+    def _render_series(self, key, value):
+        bucket_counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.label_names, key, [("le", _format_value(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class _HistogramTimer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.started_at = None
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started_at, *self.labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.collectors = []
+
+    def _register(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=()):
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def register_collector(self, collector):
+        """Registra uma funcao chamada a cada coleta.
+
+        A funcao retorna tuplas (nome, tipo, ajuda, [(labels_dict, valor), ...]).
+        """
+        with self.lock:
+            if collector not in self.collectors:
+                self.collectors.append(collector)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+            collectors = list(self.collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        for collector in collectors:
+            try:
+                families = collector() or []
+            except Exception as exc:
+                print(f" Erro ao coletar metricas: {exc}")
+                continue
+            for name, metric_type, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    label_items = sorted((labels or {}).items())
+                    label_text = _format_labels(
+                        [item[0] for item in label_items],
+                        [item[1] for item in label_items],
+                    )
+                    lines.append(f"{name}{label_text} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+http_requests_total = metrics_registry.counter(
+    "esi_http_requests_total",
+    "Requisicoes HTTP atendidas por rota e status.",
+    ("method", "route", "status"),
+)
+http_request_duration_seconds = metrics_registry.histogram(
+    "esi_http_request_duration_seconds",
+    "Latencia das requisicoes HTTP por rota.",
+    ("method", "route"),
+)
+http_requests_in_flight = metrics_registry.gauge(
+    "esi_http_requests_in_flight",
+    "Requisicoes HTTP em processamento.",
+)
+background_job_duration_seconds = metrics_registry.histogram(
+    "esi_background_job_duration_seconds",
+    "Duracao dos jobs em segundo plano por tipo e resultado.",
+    ("job_type", "status"),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+word_render_duration_seconds = metrics_registry.histogram(
+    "esi_word_render_duration_seconds",
+    "Tempo de geracao dos documentos Word por modelo.",
+    ("template", "status"),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+email_send_duration_seconds = metrics_registry.histogram(
+    "esi_email_send_duration_seconds",
+    "Tempo de envio de emails por transporte e resultado.",
+    ("transport", "status"),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
@@ -0,0 +1,149 @@
+"""Cache em memoria das paginas HTML e dos trechos de bootstrap embutidos nelas.
+
+As paginas ficam guardadas ja divididas em ``</head>`` e sao relidas apenas quando
+o arquivo muda (mtime/tamanho). Os trechos de bootstrap ficam ja codificados em
+bytes, por chave (pagina, papel, empresa) e versao dos dados; uma versao nova
+substitui a entrada antiga da mesma chave.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+
+from servidor_modules.utils.memory_diagnostics import memory_diagnostics
+from servidor_modules.utils.metrics import metrics_registry
+
+HEAD_CLOSE_TAG = "</head>"
+
+
+class PageCache:
+    def __init__(self, max_fragments=256):
+        self.max_fragments = max(int(max_fragments), 0)
+        self.lock = threading.Lock()
+        self._shells = {}
+        self._fragments = OrderedDict()
+        self.counters = {
+            "shell_hits": 0,
+            "shell_loads": 0,
+            "fragment_hits": 0,
+            "fragment_misses": 0,
+            "fragment_evicted": 0,
+        }
+
+    def get_shell(self, file_path):
+        """Retorna ``(antes, separador, depois)`` da pagina em bytes.
+
+        Com ``</head>`` o trecho injetado fica entre ``antes`` e ``</head>``;
+        sem a tag ele vai para o inicio do documento, como no fluxo original.
+        """
+        path_key = str(file_path)
+        stat = os.stat(path_key)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            cached = self._shells.get(path_key)
+            if cached is not None and cached[0] == signature:
+                self.counters["shell_hits"] += 1
+                return cached[1]
+
+        with open(path_key, "r", encoding="utf-8") as file_obj:
+            html_content = file_obj.read()
+        index = html_content.find(HEAD_CLOSE_TAG)
+        if index >= 0:
+            shell = (
+                html_content[:index].encode("utf-8"),
+                b"\n",
+                html_content[index:].encode("utf-8"),
+            )
+        else:
+            shell = (b"", b"", html_content.encode("utf-8"))
+
+        with self.lock:
+            self._shells[path_key] = (signature, shell)
+            self.counters["shell_loads"] += 1
+        return shell
+
+    def get_fragment(self, key, version, builder):
+        """Trecho em bytes para ``key``; ``builder()`` so roda quando a versao muda."""
+        with self.lock:
+            cached = self._fragments.get(key)
+            if cached is not None and cached[0] == version:
+                self._fragments.move_to_end(key)
+                self.counters["fragment_hits"] += 1
+                return cached[1]
+            self.counters["fragment_misses"] += 1
+
+        fragment = builder()
+        if isinstance(fragment, str):
+            fragment = fragment.encode("utf-8")
+        if self.max_fragments <= 0:
+            return fragment
+
+        with self.lock:
+            current = self._fragments.get(key)
+            if current is None or current[0] <= version:
+                self._fragments[key] = (version, fragment)
+                self._fragments.move_to_end(key)
+            while len(self._fragments) > self.max_fragments:
+                self._fragments.popitem(last=False)
+                self.counters["fragment_evicted"] += 1
+        return fragment
+
+    def clear(self):
+        with self.lock:
+            self._shells.clear()
+            self._fragments.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "shells": len(self._shells),
+                "fragments": len(self._fragments),
+                "fragment_bytes": sum(len(entry[1]) for entry in self._fragments.values()),
+                "max_fragments": self.max_fragments,
+                **self.counters,
+            }
+
+    def cache_size(self):
+        stats = self.stats()
+        return {
+            "shells": stats["shells"],
+            "fragments": stats["fragments"],
+            "fragment_bytes": stats["fragment_bytes"],
+        }
+
+    def collect_metrics(self):
+        stats = self.stats()
+        return [
+            (
+                "esi_page_fragments",
+                "gauge",
+                "Trechos de bootstrap de pagina mantidos em cache.",
+                [({}, stats["fragments"])],
+            ),
+            (
+                "esi_page_fragment_bytes",
+                "gauge",
+                "Bytes dos trechos de bootstrap de pagina em cache.",
+                [({}, stats["fragment_bytes"])],
+            ),
+            (
+                "esi_page_cache_lookups_total",
+                "counter",
+                "Consultas ao cache de paginas por tipo e resultado.",
+                [
+                    ({"kind": "shell", "result": "hit"}, stats["shell_hits"]),
+                    ({"kind": "shell", "result": "miss"}, stats["shell_loads"]),
+                    ({"kind": "fragment", "result": "hit"}, stats["fragment_hits"]),
+                    ({"kind": "fragment", "result": "miss"}, stats["fragment_misses"]),
+                ],
+            ),
+        ]
+
+
+page_cache = PageCache(
+    max_fragments=int(os.environ.get("ESI_PAGE_FRAGMENT_CACHE_SIZE", "256") or 256),
+)
+metrics_registry.register_collector(page_cache.collect_metrics)
+memory_diagnostics.register_cache_size("page_cache", page_cache.cache_size)
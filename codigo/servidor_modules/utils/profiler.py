@@ -0,0 +1,236 @@
+"""Profiler sob demanda para requisicoes e jobs em producao."""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+
+from servidor_modules.utils.memory_diagnostics import memory_diagnostics
+
+PROFILE_MODES = {"cprofile", "sample"}
+
+
+class _ProfileRun:
+    def __init__(self, profiler, target, label):
+        self.profiler = profiler
+        self.target = target
+        self.label = label
+        self.started_at = time.perf_counter()
+        self.thread_ident = threading.get_ident()
+        self.profile = None
+        self.samples = None
+        self.sampler = None
+        self.stop_event = threading.Event()
+
+        if target["mode"] == "sample":
+            self.samples = Counter()
+            self.sampler = threading.Thread(
+                target=self._sample_loop,
+                name="profiler-sampler",
+                daemon=True,
+            )
+            self.sampler.start()
+        else:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def _sample_loop(self):
+        interval = self.profiler.sample_interval
+        while not self.stop_event.wait(interval):
+            frame = sys._current_frames().get(self.thread_ident)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self, keep=True):
+        duration_ms = (time.perf_counter() - self.started_at) * 1000
+        if self.profile is not None:
+            self.profile.disable()
+        if self.sampler is not None:
+            self.stop_event.set()
+            self.sampler.join(timeout=1)
+
+        if not keep:
+            return None
+        return self.profiler._store_result(self, duration_ms)
+
+
+class OnDemandProfiler:
+    def __init__(self, output_dir, max_results=20, sample_interval=0.005):
+        self.output_dir = Path(output_dir)
+        self.max_results = max(int(max_results), 1)
+        self.sample_interval = max(float(sample_interval), 0.001)
+        self.lock = threading.Lock()
+        self.targets = []
+        self.results = OrderedDict()
+        # Leitura sem lock no caminho quente: so e True com alvos armados.
+        self.armed = False
+
+    def arm(self, kind, match, count=1, mode="cprofile"):
+        kind = str(kind or "").strip().lower()
+        match = str(match or "").strip()
+        mode = str(mode or "cprofile").strip().lower()
+        if kind not in {"request", "job"}:
+            raise ValueError("Tipo de alvo invalido (use 'request' ou 'job')")
+        if not match:
+            raise ValueError("Informe a rota ou o tipo de job a perfilar")
+        if mode not in PROFILE_MODES:
+            raise ValueError("Modo invalido (use 'cprofile' ou 'sample')")
+
+        target = {
+            "id": uuid4().hex[:12],
+            "kind": kind,
+            "match": match,
+            "mode": mode,
+            "remaining": min(max(int(count or 1), 1), 50),
+            "armed_at": datetime.now().isoformat(),
+        }
+        with self.lock:
+            self.targets.append(target)
+            self.armed = True
+        return dict(target)
+
+    def disarm(self, target_id=None):
+        with self.lock:
+            before = len(self.targets)
+            self.targets = [
+                target
+                for target in self.targets
+                if target_id is not None and target["id"] != str(target_id)
+            ]
+            self.armed = bool(self.targets)
+            return before - len(self.targets)
+
+    def claim(self, kind, name):
+        """Consome uma execucao do primeiro alvo que corresponder a rota ou job."""
+        if not self.armed:
+            return None
+
+        with self.lock:
+            for target in self.targets:
+                if target["kind"] != kind or not self._matches(target["match"], name):
+                    continue
+                target["remaining"] -= 1
+                if target["remaining"] <= 0:
+                    self.targets.remove(target)
+                self.armed = bool(self.targets)
+                return dict(target)
+        return None
+
+    def adhoc_target(self, mode="cprofile"):
+        mode = str(mode or "").strip().lower()
+        return {
+            "id": uuid4().hex[:12],
+            "kind": "request",
+            "match": "header",
+            "mode": mode if mode in PROFILE_MODES else "cprofile",
+            "remaining": 0,
+            "armed_at": datetime.now().isoformat(),
+        }
+
+    def start(self, target, label):
+        return _ProfileRun(self, target, label)
+
+    def cache_size(self):
+        with self.lock:
+            return len(self.results)
+
+    def status(self):
+        with self.lock:
+            return {
+                "armed": [dict(target) for target in self.targets],
+                "results": [self._public_result(result) for result in reversed(self.results.values())],
+            }
+
+    def get_result(self, result_id):
+        with self.lock:
+            result = self.results.get(str(result_id))
+            return dict(result) if result else None
+
+    def _matches(self, pattern, name):
+        if pattern.endswith("*"):
+            return str(name).startswith(pattern[:-1])
+        return str(name) == pattern
+
+    def _public_result(self, result):
+        return {
+            key: value
+            for key, value in result.items()
+            if key not in {"file_path"}
+        }
+
+    def _store_result(self, run, duration_ms):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        result_id = uuid4().hex[:12]
+        summary = ""
+
+        if run.profile is not None:
+            file_path = self.output_dir / f"{result_id}.pstats"
+            run.profile.dump_stats(str(file_path))
+            stream = io.StringIO()
+            stats = pstats.Stats(run.profile, stream=stream)
+            stats.sort_stats("cumulative").print_stats(25)
+            summary = stream.getvalue()
+            filename = f"profile_{result_id}.pstats"
+        else:
+            file_path = self.output_dir / f"{result_id}.collapsed.txt"
+            with open(file_path, "w", encoding="utf-8") as file_obj:
+                for stack, count in run.samples.most_common():
+                    file_obj.write(f"{stack} {count}\n")
+            summary = "\n".join(
+                f"{count:6d} {stack.rsplit(';', 1)[-1]}"
+                for stack, count in run.samples.most_common(25)
+            )
+            filename = f"profile_{result_id}.collapsed.txt"
+
+        result = {
+            "id": result_id,
+            "target_id": run.target["id"],
+            "kind": run.target["kind"],
+            "mode": run.target["mode"],
+            "label": run.label,
+            "duration_ms": round(duration_ms, 1),
+            "created_at": datetime.now().isoformat(),
+            "file_path": str(file_path),
+            "filename": filename,
+            "size": file_path.stat().st_size,
+            "summary": summary,
+        }
+
+        removed_paths = []
+        with self.lock:
+            self.results[result_id] = result
+            while len(self.results) > self.max_results:
+                _, oldest = self.results.popitem(last=False)
+                removed_paths.append(oldest["file_path"])
+
+        for path in removed_paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+        print(f" Perfil salvo: {run.label} ({duration_ms:.0f} ms) -> {filename}")
+        return self._public_result(result)
+
+
+request_profiler = OnDemandProfiler(
+    output_dir=os.environ.get("ESI_PROFILE_DIR")
+    or Path(tempfile.gettempdir()) / "esi_profiles",
+    max_results=int(os.environ.get("ESI_PROFILE_MAX_RESULTS", "20") or 20),
+)
+memory_diagnostics.register_cache_size("profiler_results", request_profiler.cache_size)
@@ -14,11 +14,14 @@ import os
 import tempfile
 from pathlib import Path
 
-os.environ.setdefault('PYTHONDONTWRITEBYTECODE', '1')
-os.environ.setdefault('PYTHONPYCACHEPREFIX', str(Path(tempfile.gettempdir()) / 'esi_python_cache'))
-sys.dont_write_bytecode = True
-if hasattr(sys, 'pycache_prefix'):
-    sys.pycache_prefix = os.environ['PYTHONPYCACHEPREFIX']
+from servidor_modules import is_fast_start_enabled
+
+if not is_fast_start_enabled():
+    os.environ.setdefault('PYTHONDONTWRITEBYTECODE', '1')
+    os.environ.setdefault('PYTHONPYCACHEPREFIX', str(Path(tempfile.gettempdir()) / 'esi_python_cache'))
+    sys.dont_write_bytecode = True
+    if hasattr(sys, 'pycache_prefix'):
+        sys.pycache_prefix = os.environ['PYTHONPYCACHEPREFIX']
 
 class ServerUtils:
     """Utilitários do servidor - Mantido para compatibilidade"""
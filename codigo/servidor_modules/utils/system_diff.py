@@ -0,0 +1,191 @@
+"""Diferencas entre o JSON do sistema proposto e o catalogo gravado.
+
+O servidor guarda, por versao dos dados (``conn.data_version``), o hash do JSON
+canonico de cada item de cada secao. Uma comparacao serializa cada item proposto
+uma unica vez e so detalha campo a campo os itens cujo hash mudou.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+
+from servidor_modules.database.storage import normalize_empresa
+from servidor_modules.utils.memory_diagnostics import memory_diagnostics
+from servidor_modules.utils.metrics import metrics_registry
+
+# Secao -> campo que identifica o item em listas; ``None`` para secoes em dicionario.
+SECTION_KEYS = {
+    "constants": None,
+    "machines": "type",
+    "materials": None,
+    "empresas": "codigo",
+    "banco_acessorios": None,
+    "dutos": "type",
+    "tubos": "polegadas",
+}
+_MISSING = object()
+
+
+def canonical_json(value):
+    return json.dumps(
+        value, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str
+    )
+
+
+def item_hash(value):
+    return hashlib.blake2b(
+        canonical_json(value).encode("utf-8"), digest_size=16
+    ).digest()
+
+
+def section_items(section, value):
+    """``{chave: item}`` da secao, na ordem recebida (a ultima repeticao vence)."""
+    key_field = SECTION_KEYS[section]
+    if key_field is None:
+        return dict(value) if isinstance(value, dict) else {}
+
+    items = {}
+    for item in value if isinstance(value, list) else []:
+        if section == "empresas":
+            item = normalize_empresa(item)
+        if isinstance(item, dict):
+            items[item.get(key_field, "")] = item
+    return items
+
+
+def hash_section(section, value):
+    return {
+        key: (item_hash(item), item)
+        for key, item in section_items(section, value).items()
+    }
+
+
+def field_changes(current, proposed, path=""):
+    """Campos alterados como ``{"field", "current", "proposed"}``; dicionarios viram caminhos com ponto."""
+    if isinstance(current, dict) and isinstance(proposed, dict):
+        changes = []
+        for key in list(current) + [key for key in proposed if key not in current]:
+            field = f"{path}.{key}" if path else str(key)
+            changes.extend(
+                field_changes(current.get(key, _MISSING), proposed.get(key, _MISSING), field)
+            )
+        return changes
+
+    if current is not _MISSING and proposed is not _MISSING:
+        if canonical_json(current) == canonical_json(proposed):
+            return []
+    return [
+        {
+            "field": path,
+            "current": None if current is _MISSING else current,
+            "proposed": None if proposed is _MISSING else proposed,
+        }
+    ]
+
+
+class SystemDiffIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._version = None
+        self._sections = {}
+        self.counters = {
+            "diffs": 0,
+            "refreshes": 0,
+            "items_hashed": 0,
+        }
+
+    def _stored_sections(self, version, loader):
+        if self._version == version:
+            return self._sections
+        with self.lock:
+            if self._version != version:
+                payload = loader() or {}
+                self._sections = {
+                    section: hash_section(section, payload.get(section))
+                    for section in SECTION_KEYS
+                }
+                self._version = version
+                self.counters["refreshes"] += 1
+                self.counters["items_hashed"] += sum(
+                    len(entries) for entries in self._sections.values()
+                )
+            return self._sections
+
+    def diff(self, proposed, version, loader, current=None):
+        """Compara ``proposed`` com o catalogo gravado (ou com ``current``, se enviado).
+
+        ``version`` deve ser lida antes de ``loader()``, como em ``catalog_search``.
+        """
+        if current is None:
+            stored = self._stored_sections(version, loader)
+        else:
+            stored = {
+                section: hash_section(section, current.get(section))
+                for section in SECTION_KEYS
+            }
+
+        diffs = {}
+        for section in SECTION_KEYS:
+            stored_entries = stored.get(section) or {}
+            proposed_items = section_items(section, proposed.get(section))
+            section_diff = {"added": [], "modified": [], "removed": [], "changes": {}}
+            for key, item in proposed_items.items():
+                stored_entry = stored_entries.get(key)
+                if stored_entry is None:
+                    section_diff["added"].append(key)
+                elif stored_entry[0] != item_hash(item):
+                    section_diff["modified"].append(key)
+                    section_diff["changes"][key] = field_changes(stored_entry[1], item)
+            section_diff["removed"] = [
+                key for key in stored_entries if key not in proposed_items
+            ]
+            diffs[section] = section_diff
+
+        self.counters["diffs"] += 1
+        return diffs
+
+    def clear(self):
+        with self.lock:
+            self._sections = {}
+            self._version = None
+
+    def stats(self):
+        sections = self._sections
+        return {
+            "version": self._version,
+            "items": {section: len(entries) for section, entries in sections.items()},
+            **self.counters,
+        }
+
+    def cache_size(self):
+        return self.stats()["items"]
+
+    def collect_metrics(self):
+        stats = self.stats()
+        return [
+            (
+                "esi_system_diff_items",
+                "gauge",
+                "Itens do sistema com hash mantido para a comparacao de JSON.",
+                [({"section": section}, count) for section, count in stats["items"].items()],
+            ),
+            (
+                "esi_system_diff_total",
+                "counter",
+                "Comparacoes de JSON do sistema atendidas.",
+                [({}, stats["diffs"])],
+            ),
+            (
+                "esi_system_diff_refreshes_total",
+                "counter",
+                "Recalculos dos hashes do sistema apos mudanca nos dados.",
+                [({}, stats["refreshes"])],
+            ),
+        ]
+
+
+system_diff_index = SystemDiffIndex()
+metrics_registry.register_collector(system_diff_index.collect_metrics)
+memory_diagnostics.register_cache_size("system_diff", system_diff_index.cache_size)
@@ -40,5 +40,18 @@ def _cleanup_local_pycache_dirs():
                 pass
 
 
-_apply_python_cache_policy()
-_cleanup_local_pycache_dirs()
+# Mesmo criterio de servidor_modules.is_fast_start_enabled(); roda na partida
+# do interpretador, antes da politica de cache, e por isso nao importa o pacote.
+def _fast_start_enabled():
+    return str(os.environ.get("ESI_FAST_START", "") or "").strip().lower() in {
+        "1",
+        "true",
+        "yes",
+        "on",
+    }
+
+
+# No modo de inicio rapido o bytecode compilado e mantido entre reinicios.
+if not _fast_start_enabled():
+    _apply_python_cache_policy()
+    _cleanup_local_pycache_dirs()
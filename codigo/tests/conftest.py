@@ -0,0 +1,53 @@
+"""Fixtures dos testes de integracao.
+
+Os testes usam o PostgreSQL de ``DATABASE_URL`` (de preferencia local) e sao
+ignorados quando ele nao esta configurado. Cada teste remove o que criar.
+"""
+
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+TEST_EMPRESA = {"codigo": "TSTQA", "nome": "Teste QA Ltda"}
+
+
+@pytest.fixture(scope="session")
+def project_root():
+    if not os.environ.get("DATABASE_URL"):
+        pytest.skip("DATABASE_URL nao configurada")
+    return PROJECT_ROOT
+
+
+@pytest.fixture(scope="session")
+def http_client(project_root):
+    from servidor_modules.benchmarks.suite import BenchmarkClient
+
+    client = BenchmarkClient(project_root, TEST_EMPRESA)
+    yield client
+    client.close()
+
+
+def http_request(client, path, role, method="GET", body=None, headers=None):
+    """Retorna ``(status, headers, corpo_json_ou_None)`` sem tratar 3xx/4xx como erro."""
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(
+        client.base_url + path,
+        data=data,
+        method=method,
+        headers={"Cookie": client.cookies[role], **(headers or {})},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            status, response_headers, raw = response.status, response.headers, response.read()
+    except urllib.error.HTTPError as exc:
+        status, response_headers, raw = exc.code, exc.headers, exc.read()
+    return status, response_headers, json.loads(raw) if raw else None
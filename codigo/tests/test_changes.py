@@ -0,0 +1,105 @@
+import pytest
+
+from conftest import TEST_EMPRESA, http_request
+
+MOVED_OBRA = {"id": "qa-changes-move", "nome": "QA mudanca de empresa", "projetos": []}
+DELETED_OBRA = {"id": "qa-changes-delete", "nome": "QA exclusao", "projetos": []}
+BENCH_OBRA = {"id": "bench-qa-changes", "nome": "QA benchmark", "projetos": []}
+
+# Escopo da obra -> (empresa do cliente de teste, duas empresas seguintes).
+SCOPES = {
+    "sigla": ("empresaSigla", TEST_EMPRESA["codigo"], "QAOUTRA", "QATERCEIRA"),
+    "alias": ("empresaCodigo", TEST_EMPRESA["codigo"].lower(), "qaoutra", "qaterceira"),
+    "nome": ("nomeEmpresa", TEST_EMPRESA["nome"], "Outra QA Ltda", "Terceira QA Ltda"),
+}
+
+
+def _forget_changes(project_root, *obra_ids):
+    """Remove o historico das obras de teste, para um caso nao herdar a empresa de outro."""
+    from servidor_modules.database.storage import get_storage
+
+    conn = get_storage(project_root).conn
+    for obra_id in obra_ids:
+        conn.execute(
+            "DELETE FROM change_log WHERE entity = 'obra' AND entity_id = ?", (obra_id,)
+        )
+    conn.commit()
+
+
+def _client_changes(http_client, since):
+    status, _, body = http_request(http_client, f"/api/changes?since={since}", "client")
+    assert status == 200
+    return {obra["id"] for obra in body["obras"]["upserted"]}, set(body["obras"]["deleted"])
+
+
+@pytest.mark.parametrize("scope", sorted(SCOPES))
+def test_client_gets_tombstone_when_obra_changes_empresa(project_root, http_client, scope):
+    from servidor_modules.database.repositories.change_log_repository import ChangeLogRepository
+    from servidor_modules.database.repositories.empresa_repository import EmpresaRepository
+    from servidor_modules.database.repositories.obra_repository import ObraRepository
+
+    change_log = ChangeLogRepository(project_root)
+    obra_repository = ObraRepository(project_root)
+    empresa_repository = EmpresaRepository(project_root)
+    empresas_originais = empresa_repository.get_all()
+    obra = {**MOVED_OBRA, "id": f"{MOVED_OBRA['id']}-{scope}"}
+    _forget_changes(project_root, obra["id"])
+    try:
+        before = change_log.get_current_version()
+        key, own, *others = SCOPES[scope]
+        obra_repository.save({**obra, key: own})
+        upserted, _ = _client_changes(http_client, before)
+        assert obra["id"] in upserted
+
+        synced = change_log.get_current_version()
+        for other in others:
+            obra_repository.save({**obra, key: other})
+        for since in (before, synced):
+            upserted, deleted = _client_changes(http_client, since)
+            assert obra["id"] not in upserted
+            assert obra["id"] in deleted
+    finally:
+        obra_repository.delete(obra["id"])
+        _forget_changes(project_root, obra["id"])
+        empresa_repository.replace_all(empresas_originais)
+
+
+@pytest.mark.parametrize("scope", ["alias", "nome"])
+def test_client_gets_tombstone_for_obra_scoped_by_alias_or_nome(project_root, http_client, scope):
+    from servidor_modules.database.repositories.change_log_repository import ChangeLogRepository
+    from servidor_modules.database.repositories.obra_repository import ObraRepository
+
+    obra_repository = ObraRepository(project_root)
+    obra = {**DELETED_OBRA, "id": f"{DELETED_OBRA['id']}-{scope}"}
+    _forget_changes(project_root, obra["id"])
+    key, own, *_ = SCOPES[scope]
+    try:
+        obra_repository.save({**obra, key: own})
+        synced = ChangeLogRepository(project_root).get_current_version()
+
+        obra_repository.delete(obra["id"])
+
+        _, deleted = _client_changes(http_client, synced)
+        assert obra["id"] in deleted
+    finally:
+        obra_repository.delete(obra["id"])
+        _forget_changes(project_root, obra["id"])
+
+
+def test_clear_synthetic_data_records_tombstones(project_root, http_client):
+    from servidor_modules.benchmarks.dataset import clear_synthetic_data
+    from servidor_modules.database.repositories.change_log_repository import ChangeLogRepository
+    from servidor_modules.database.repositories.obra_repository import ObraRepository
+
+    obra_repository = ObraRepository(project_root)
+    _forget_changes(project_root, BENCH_OBRA["id"])
+    try:
+        obra_repository.save({**BENCH_OBRA, "empresaSigla": TEST_EMPRESA["codigo"]})
+        synced = ChangeLogRepository(project_root).get_current_version()
+
+        clear_synthetic_data(project_root)
+
+        _, deleted = _client_changes(http_client, synced)
+        assert BENCH_OBRA["id"] in deleted
+    finally:
+        _forget_changes(project_root, BENCH_OBRA["id"])
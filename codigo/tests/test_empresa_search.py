@@ -0,0 +1,30 @@
+import pytest
+
+ACCENTED = ("São Tomé", "ação", "JOÃO", "Crème Brûlée", "Ÿvonne ÿ")
+EMPRESA = {"codigo": "QAFOLD", "nome": "São Tomé Refrigeração Ltda", "credenciais": None}
+
+
+@pytest.mark.parametrize("collation", ["C", "default"])
+def test_sql_and_python_fold_the_same_on_any_locale(project_root, collation):
+    from servidor_modules.database.connection import fold_search_text
+    from servidor_modules.database.storage import get_storage
+
+    conn = get_storage(project_root).conn
+    for value in ACCENTED:
+        row = conn.execute(
+            f'SELECT esi_fold_text(?::text COLLATE "{collation}") AS folded', (value,)
+        ).fetchone()
+        assert row["folded"] == fold_search_text(value)
+
+
+def test_search_matches_accented_names_without_accents(project_root):
+    from servidor_modules.database.repositories.empresa_repository import EmpresaRepository
+
+    repository = EmpresaRepository(project_root)
+    empresas_originais = repository.get_all()
+    try:
+        repository.replace_all(empresas_originais + [EMPRESA])
+        for termo in ("sao tome", "SÃO", "refrigeracao", "qafold"):
+            assert EMPRESA["codigo"] in [empresa["codigo"] for empresa in repository.search(termo)]
+    finally:
+        repository.replace_all(empresas_originais)
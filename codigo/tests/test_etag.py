@@ -0,0 +1,27 @@
+from conftest import http_request
+
+
+def test_admin_system_bootstrap_revalidates_after_empresas_replace_all(project_root, http_client):
+    from servidor_modules.database.repositories.empresa_repository import EmpresaRepository
+
+    path = "/api/runtime/system-bootstrap"
+    status, headers, _ = http_request(http_client, path, "admin")
+    assert status == 200
+    etag = headers["ETag"]
+
+    status, _, _ = http_request(http_client, path, "admin", headers={"If-None-Match": etag})
+    assert status == 304
+
+    repository = EmpresaRepository(project_root)
+    original = repository.get_all()
+    try:
+        repository.replace_all(original + [{"codigo": "ETAGQA", "nome": "Etag QA"}])
+
+        status, headers, body = http_request(
+            http_client, path, "admin", headers={"If-None-Match": etag}
+        )
+        assert status == 200
+        assert headers["ETag"] != etag
+        assert "ETAGQA" in {empresa.get("codigo") for empresa in body["empresas"]}
+    finally:
+        repository.replace_all(original)
@@ -0,0 +1,198 @@
+import base64
+import socketserver
+import threading
+
+import pytest
+
+from servidor_modules.utils.mail_transport import MailTransport
+
+SENDER = "adm@example.com"
+TOKEN = "segredo-smtp"
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    """Servidor SMTP minimo, no estilo do aiosmtpd, que registra conexoes, logins e mensagens."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, advertise_auth=True, reject_data=False):
+        super().__init__(("127.0.0.1", 0), StandInSMTPHandler)
+        self.advertise_auth = advertise_auth
+        self.reject_data = reject_data
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.logins = []
+        self.messages = []
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost ESMTP stand-in")
+        while True:
+            line = self.rfile.readline().decode("utf-8").rstrip("\r\n")
+            if not line:
+                return
+            command = line.split(" ", 1)[0].upper()
+            if command in {"EHLO", "HELO"}:
+                if server.advertise_auth:
+                    self.reply("250-localhost")
+                    self.reply("250 AUTH PLAIN")
+                else:
+                    self.reply("250 localhost")
+            elif command == "AUTH" and server.advertise_auth:
+                _, usuario, senha = base64.b64decode(line.split()[2]).decode("utf-8").split("\0")
+                with server.lock:
+                    server.logins.append((usuario, senha))
+                self.reply("235 2.7.0 Authentication successful")
+            elif command in {"MAIL", "RCPT", "NOOP", "RSET"}:
+                self.reply("250 OK")
+            elif command == "DATA" and server.reject_data:
+                self.reply("554 5.3.0 Transaction failed")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in {b".\r\n", b""}:
+                        break
+                    lines.append(data_line)
+                with server.lock:
+                    server.messages.append(b"".join(lines))
+                self.reply("250 OK queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class StandInConfigStore:
+    def __init__(self, port):
+        self.port = port
+
+    def load(self):
+        return {"email": SENDER, "token": TOKEN, "nome": "ADM"}
+
+    def is_configured(self, config):
+        return True
+
+    def resolve_smtp_settings(self, config):
+        return {"host": "127.0.0.1", "port": self.port, "use_tls": False}
+
+
+@pytest.fixture
+def smtp_server(request, monkeypatch):
+    for name in ("resend_API", "RESEND_API", "RESEND_API_KEY"):
+        monkeypatch.delenv(name, raising=False)
+    server = start_server(advertise_auth=getattr(request, "param", True))
+    yield server
+    stop_server(server)
+
+
+def start_server(**kwargs):
+    server = StandInSMTPServer(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop_server(server):
+    server.shutdown()
+    server.server_close()
+
+
+def build_transport(server, **kwargs):
+    port = server.server_address[1]
+    return MailTransport(config_store_factory=lambda: StandInConfigStore(port), **kwargs)
+
+
+def test_batch_logs_in_once_and_reuses_the_connection(smtp_server):
+    transport = build_transport(smtp_server)
+    try:
+        results = transport.send_batch(
+            [
+                {"destino": f"cliente{index}@example.com", "assunto": "Teste", "mensagem": "Oi"}
+                for index in range(3)
+            ]
+        )
+        transport.send("cliente3@example.com", "Teste", "Oi")
+    finally:
+        transport.close()
+
+    assert [result["success"] for result in results] == [True, True, True]
+    assert smtp_server.connections == 1
+    assert smtp_server.logins == [(SENDER, TOKEN)]
+    assert len(smtp_server.messages) == 4
+
+
+def test_queued_sends_share_batches(smtp_server):
+    transport = build_transport(smtp_server)
+    errors = []
+
+    def send(index):
+        try:
+            transport.send_queued(f"cliente{index}@example.com", "Notificacao", "Oi")
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=send, args=(index,)) for index in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+    finally:
+        transport.close()
+
+    assert errors == []
+    assert len(smtp_server.messages) == 8
+    assert smtp_server.connections == 1
+    assert len(smtp_server.logins) == 1
+
+
+@pytest.mark.parametrize("smtp_server", [False], indirect=True)
+def test_login_is_required_unless_explicitly_disabled(smtp_server):
+    transport = build_transport(smtp_server)
+    try:
+        with pytest.raises(RuntimeError):
+            transport.send("cliente@example.com", "Teste", "Oi")
+    finally:
+        transport.close()
+    assert smtp_server.messages == []
+
+    transport = build_transport(smtp_server, smtp_auth=False)
+    try:
+        transport.send("cliente@example.com", "Teste", "Oi")
+    finally:
+        transport.close()
+    assert len(smtp_server.messages) == 1
+
+
+def test_send_failure_on_primary_falls_back_to_next_candidate(smtp_server, monkeypatch):
+    from servidor_modules.utils import mail_transport
+
+    primary = start_server(reject_data=True)
+    candidates = [
+        {"host": "127.0.0.1", "port": server.server_address[1], "use_tls": False,
+         "use_ssl": False, "label": label}
+        for label, server in (("primary", primary), ("fallback", smtp_server))
+    ]
+    monkeypatch.setattr(
+        mail_transport, "build_smtp_connection_candidates", lambda *args: candidates
+    )
+    transport = build_transport(primary)
+    try:
+        transport.send("cliente@example.com", "Teste", "Oi")
+    finally:
+        transport.close()
+        stop_server(primary)
+
+    assert primary.logins == [(SENDER, TOKEN)]
+    assert primary.messages == []
+    assert len(smtp_server.messages) == 1
@@ -0,0 +1,28 @@
+import pytest
+
+from servidor_modules.handlers.http_handler import UniversalHTTPRequestHandler
+
+
+def _route_label(path):
+    handler = object.__new__(UniversalHTTPRequestHandler)
+    handler.path = path
+    return handler._metrics_route_label()
+
+
+@pytest.mark.parametrize(
+    "path, label",
+    [
+        ("/api/obras/catalog?x=1", "/api/obras/catalog"),
+        ("/codigo/api/jobs/status?id=abc", "/api/jobs/status"),
+        ("/obras/create", "/obras/create"),
+        ("/api/dados/empresas/buscar/abc", "/api/dados/empresas/buscar/:termo"),
+        ("/api/dados/empresas/buscar/xyz", "/api/dados/empresas/buscar/:termo"),
+        ("/obras/obra-sem-digitos", "/obras/:id"),
+        ("/api/machines/type/Fancoil", "/api/machines/type/:tipo"),
+        ("/public/scripts/app.js", "static"),
+        ("/wp-login.php", "unmatched"),
+        ("/api/nao-existe", "unmatched"),
+    ],
+)
+def test_metrics_route_label(path, label):
+    assert _route_label(path) == label
@@ -0,0 +1,46 @@
+from conftest import TEST_EMPRESA, http_request
+
+SCOPED_OBRAS = (
+    {"id": "qa-scope-sigla", "nome": "QA sigla", "empresaSigla": TEST_EMPRESA["codigo"]},
+    # Chave alternativa e caixa diferente, aceitas por _matches_empresa_context.
+    {"id": "qa-scope-alias", "nome": "QA alias", "empresaCodigo": TEST_EMPRESA["codigo"].lower()},
+    {"id": "qa-scope-nome", "nome": "QA nome", "nomeEmpresa": TEST_EMPRESA["nome"]},
+)
+
+
+def _client_obra_ids(http_client):
+    """Ids visiveis ao cliente no catalogo e nas obras completas (devem coincidir)."""
+    visible = []
+    for path in ("/api/obras/catalog", "/api/backup-completo"):
+        status, _, body = http_request(http_client, path, "client")
+        assert status == 200
+        visible.append({obra["id"] for obra in body["obras"]})
+    assert visible[0] == visible[1]
+    return visible[0]
+
+
+def test_client_keeps_its_obras_after_dados_json_save(project_root, http_client):
+    from servidor_modules.database.repositories.empresa_repository import EmpresaRepository
+    from servidor_modules.database.repositories.obra_repository import ObraRepository
+
+    obra_repository = ObraRepository(project_root)
+    empresa_repository = EmpresaRepository(project_root)
+    empresas_originais = empresa_repository.get_all()
+    expected = {obra["id"] for obra in SCOPED_OBRAS}
+    try:
+        for obra in SCOPED_OBRAS:
+            obra_repository.save({**obra, "projetos": []})
+        assert expected <= _client_obra_ids(http_client)
+
+        # Regravar o dados.json recria as empresas; obras.empresa_codigo vira NULL.
+        storage = obra_repository.storage
+        storage.save_document(
+            "dados.json",
+            storage.load_document("dados.json", storage.default_document("dados.json")),
+        )
+
+        assert expected <= _client_obra_ids(http_client)
+    finally:
+        for obra in SCOPED_OBRAS:
+            obra_repository.delete(obra["id"])
+        empresa_repository.replace_all(empresas_originais)